@@ -2,6 +2,9 @@
 ASGI config for barberia_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections (ws/...) are routed to the
+channels consumers in usuarios/routing.py, authenticated with the JWT
+access token passed as ``?token=``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +16,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'barberia_backend.settings')
 
-application = get_asgi_application()
+# Django debe inicializarse antes de importar los consumidores (usan los modelos)
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from usuarios.canales import JWTAuthMiddleware  # noqa: E402
+from usuarios.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+})
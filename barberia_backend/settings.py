@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'channels',
     'core',
     'usuarios',
 ]
@@ -55,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'usuarios.presupuesto.PresupuestoConsultasMiddleware',
 ]
 
 ROOT_URLCONF = 'barberia_backend.urls'
@@ -76,6 +78,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'barberia_backend.wsgi.application'
+ASGI_APPLICATION = 'barberia_backend.asgi.application'
 
 # ============================================
 # BASE DE DATOS POSTGRESQL (PRODUCCIÓN)
@@ -125,9 +128,10 @@ CORS_ALLOW_METHODS = [
 CORS_ALLOW_HEADERS = [
     'accept', 'accept-encoding', 'authorization', 'content-type',
     'dnt', 'origin', 'user-agent', 'x-csrftoken', 'x-requested-with',
+    'idempotency-key',
 ]
 
-CORS_EXPOSE_HEADERS = ['content-type', 'authorization']
+CORS_EXPOSE_HEADERS = ['content-type', 'authorization', 'idempotent-replayed']
 CORS_PREFLIGHT_MAX_AGE = 86400
 
 # ============================================
@@ -168,5 +172,64 @@ MEDIA_ROOT = '/var/www/barber/Media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ============================================
+# CACHÉ
+# ============================================
+# Las invalidaciones usan contadores de versión (usuarios/versiones.py, usuarios/series.py)
+# que todos los workers deben compartir y que se incrementan con incr/add. En producción
+# se usan por Redis definiendo CACHE_REDIS_URL: incr y add son atómicos y los contadores
+# no caducan (con maxmemory-policy volatile-lru Redis sólo desaloja entradas con TIMEOUT).
+# Sin Redis queda el caché en disco: se comparte entre workers de un mismo servidor, pero
+# incr/add no son atómicos y al superar MAX_ENTRIES borra entradas al azar, contadores
+# incluidos; `manage.py check --deploy` lo advierte (ver usuarios/checks.py).
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache',
+            'TIMEOUT': 300,
+            # Una serie de estadísticas escribe hasta 400 periodos más sus versiones
+            'OPTIONS': {'MAX_ENTRIES': 20000, 'CULL_FREQUENCY': 10},
+        }
+    }
+
+# ============================================
+# PRESUPUESTO DE CONSULTAS
+# ============================================
+# Con DEBUG se informa en las cabeceras X-Consultas-SQL / X-Presupuesto-Consultas.
+# En modo estricto (pruebas) exceder el presupuesto de una vista lanza una excepción.
+PRESUPUESTO_CONSULTAS_ESTRICTO = False
+
+# ============================================
+# WEBSOCKET (CHANNELS)
+# ============================================
+# En memoria basta con un único proceso ASGI que atienda HTTP y WebSocket.
+# Con Gunicorn + Daphne, varios workers o varios servidores la capa se comparte
+# por Redis definiendo CHANNEL_LAYER_REDIS_URL; `manage.py check --deploy`
+# avisa si sigue en memoria (ver usuarios/checks.py).
+CHANNEL_LAYER_REDIS_URL = os.environ.get('CHANNEL_LAYER_REDIS_URL', '')
+if CHANNEL_LAYER_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [CHANNEL_LAYER_REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
 # Seguridad adicional para producción
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -1,6 +1,6 @@
 ﻿'use client'
 
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import Link from 'next/link'
 import {
   Calendar,
@@ -68,6 +68,16 @@ interface BarberStats {
   }>
 }
 
+const AGENDA_SOCKET_URL = 'wss://barberrock.es/ws/barbero/agenda/'
+const AGENDA_EXPAND = 'cliente,servicio,productos'
+const MAX_RECONNECT_DELAY_MS = 60000
+
+// Reemplaza por id las citas cambiadas y quita las borradas
+const mergeAppointments = (current: Appointment[], changed: Appointment[], deletedIds: number[]) => {
+  const removed = new Set([...deletedIds, ...changed.map((apt) => apt.id)])
+  return [...current.filter((apt) => !removed.has(apt.id)), ...changed]
+}
+
 export default function BarberoDashboard() {
   const [currentDate, setCurrentDate] = useState(new Date())
   const [appointments, setAppointments] = useState<Appointment[]>([])
@@ -76,6 +86,7 @@ export default function BarberoDashboard() {
   const [activeTab, setActiveTab] = useState('agenda')
   const [surveyConfig, setSurveyConfig] = useState<{ token: string; appointmentId: number } | null>(null)
   const [barberProfile, setBarberProfile] = useState<{ qr_token?: string; qr_url?: string } | null>(null)
+  const syncCursor = useRef<string | null>(null)
 
   const handleLogout = () => {
     localStorage.clear()
@@ -114,7 +125,15 @@ export default function BarberoDashboard() {
         console.error('Error al cargar perfil del barbero:', error)
       }
 
-      const appointmentsResponse = await fetch('https://barberrock.es/api/citas/', {
+      // Cursor de sincronización antes del listado: citas/cambios/ recupera lo que cambie después
+      const cursorResponse = await fetch('https://barberrock.es/api/citas/cambios/', {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      })
+      syncCursor.current = cursorResponse.ok ? (await cursorResponse.json()).cursor : null
+
+      const appointmentsResponse = await fetch(`https://barberrock.es/api/citas/?expand=${AGENDA_EXPAND}`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -175,9 +194,84 @@ export default function BarberoDashboard() {
     loadBarberData()
   }, [loadBarberData])
 
+  // Trae sólo las citas creadas, modificadas o borradas desde la última sincronización
+  const syncAgenda = useCallback(async () => {
+    const token = localStorage.getItem('access_token')
+    let cursor = syncCursor.current
+    if (!token || !cursor) {
+      await loadBarberData()
+      return
+    }
+
+    let hasMore = true
+    while (hasMore) {
+      const params = new URLSearchParams({ desde: cursor, expand: AGENDA_EXPAND })
+      const response = await fetch(`https://barberrock.es/api/citas/cambios/?${params}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      })
+      if (!response.ok) {
+        // 410: la última sincronización es demasiado antigua
+        await loadBarberData()
+        return
+      }
+
+      const data = await response.json()
+      setAppointments((current) => mergeAppointments(current, data.citas || [], data.eliminadas || []))
+      cursor = data.cursor as string
+      syncCursor.current = cursor
+      hasMore = Boolean(data.hay_mas)
+    }
+  }, [loadBarberData])
+
+  // Agenda en vivo: el servidor avisa de cada cita creada, modificada, cancelada o borrada
   useEffect(() => {
-    loadBarberData()
-  }, [currentDate, loadBarberData])
+    let socket: WebSocket | null = null
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined
+    let reconnectDelay = 1000
+    let connectedBefore = false
+    let closed = false
+
+    const connect = () => {
+      const token = localStorage.getItem('access_token')
+      if (!token || closed) {
+        return
+      }
+
+      socket = new WebSocket(`${AGENDA_SOCKET_URL}?token=${encodeURIComponent(token)}`)
+      socket.onopen = () => {
+        reconnectDelay = 1000
+        // Tras una reconexión se recuperan los avisos perdidos mientras no hubo conexión
+        if (connectedBefore) {
+          syncAgenda()
+        }
+        connectedBefore = true
+      }
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data)
+        if (data.tipo === 'cita_eliminada') {
+          setAppointments((current) => mergeAppointments(current, [], [data.id]))
+        } else if (data.cita) {
+          setAppointments((current) => mergeAppointments(current, [data.cita], []))
+        }
+      }
+      socket.onclose = (event) => {
+        if (!closed && event.code !== 4403) {
+          reconnectTimer = setTimeout(connect, reconnectDelay)
+          reconnectDelay = Math.min(reconnectDelay * 2, MAX_RECONNECT_DELAY_MS)
+        }
+      }
+    }
+
+    connect()
+
+    return () => {
+      closed = true
+      clearTimeout(reconnectTimer)
+      socket?.close()
+    }
+  }, [syncAgenda])
 
   const handleMarkAsCompleted = async (appointmentId: number) => {
     try {
@@ -195,7 +289,7 @@ export default function BarberoDashboard() {
 
       if (response.ok) {
         const updatedAppointment: Appointment = await response.json()
-        await loadBarberData()
+        await syncAgenda()
         if (updatedAppointment?.survey_token) {
           setSurveyConfig({ token: updatedAppointment.survey_token, appointmentId })
         }
@@ -228,7 +322,7 @@ export default function BarberoDashboard() {
       })
 
       if (response.ok) {
-        await loadBarberData()
+        await syncAgenda()
         alert('Cita cancelada exitosamente')
       } else {
         alert('Error al cancelar la cita')
@@ -833,7 +927,7 @@ export default function BarberoDashboard() {
         )}
 
         {activeTab === 'crear-cita' && (
-          <BarberCreateAppointment onCreated={loadBarberData} />
+          <BarberCreateAppointment onCreated={syncAgenda} />
         )}
       </div>
 
@@ -844,7 +938,7 @@ export default function BarberoDashboard() {
           onClose={() => setSurveyConfig(null)}
           onSubmitted={() => {
             setSurveyConfig(null)
-            loadBarberData()
+            syncAgenda()
           }}
         />
       )}
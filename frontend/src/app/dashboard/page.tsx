@@ -91,7 +91,7 @@ export default function ClientDashboard() {
         setLoading(true)
 
         // Cargar citas del cliente
-        const appointmentsResponse = await fetch('https://barberrock.es/api/citas/', {
+        const appointmentsResponse = await fetch('https://barberrock.es/api/citas/?expand=barbero,servicio', {
           headers: {
             'Authorization': `Bearer ${token}`
           }
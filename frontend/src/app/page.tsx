@@ -24,11 +24,15 @@ interface Testimonial {
   fecha_creacion?: string
 }
 
+// Variantes redimensionadas generadas por el backend: {webp: 'url 320w, url 800w, ...', jpeg: ...}
+type ImageSrcset = { webp?: string; jpeg?: string }
+
 interface WebsiteContentItem {
   id: number
   tipo_contenido: string
   contenido: string
   imagen?: string | null
+  imagen_srcset?: ImageSrcset
   activo?: boolean
 }
 
@@ -37,6 +41,7 @@ interface GalleryItem {
   titulo: string
   descripcion?: string
   imagen?: string | null
+  imagen_srcset?: ImageSrcset
   video_url?: string | null
   video_file?: string | null
   tipo_video?: 'url' | 'file' | null
@@ -50,6 +55,7 @@ interface Product {
   precio: number
   precio_desde?: boolean
   imagen?: string | null
+  imagen_srcset?: ImageSrcset
 }
 
 interface Package {
@@ -58,6 +64,7 @@ interface Package {
   descripcion: string
   precio: number
   imagen?: string | null
+  imagen_srcset?: ImageSrcset
   activo: boolean
   servicios?: Service[]
   productos?: Product[]
@@ -82,6 +89,11 @@ const hexToRGBA = (hex: string, alpha = 1) => {
   return `rgba(${r}, ${g}, ${b}, ${alpha})`
 }
 
+const mediaUrl = (url: string) => (url.startsWith('http') ? url : `https://barberrock.es${url}`)
+
+// Las entradas del srcset llegan como 'url ancho'; se completa la url igual que `imagen`
+const mediaSrcset = (srcset: string) => srcset.split(', ').map(mediaUrl).join(', ')
+
 export default function HomePage() {
   const [featuredServices, setFeaturedServices] = useState<Service[]>([])
   const [testimonials, setTestimonials] = useState<Testimonial[]>([])
@@ -105,81 +117,19 @@ export default function HomePage() {
   useEffect(() => {
     const loadHomeData = async () => {
       try {
-        // Cargar servicios destacados (primeros 3)
-        const servicesResponse = await fetch('https://barberrock.es/api/servicios/', { cache: 'no-store' })
-        const servicesData = await servicesResponse.json()
-        const services = (servicesData.results || servicesData).slice(0, 3)
-        setFeaturedServices(services)
-
-        // Cargar contenido del sitio (texto e imágenes configurables)
-        // Cargar todas las páginas si hay paginación
-        let allContentData: WebsiteContentItem[] = []
-        let nextUrl: string | null = 'https://barberrock.es/api/contenido/'
-        
-        while (nextUrl) {
-          const contentResponse: Response = await fetch(nextUrl, { cache: 'no-store' })
-          const contentDataRaw: any = await contentResponse.json()
-          const pageData: WebsiteContentItem[] = contentDataRaw.results || contentDataRaw || []
-          allContentData = [...allContentData, ...pageData]
-          nextUrl = contentDataRaw.next || null
-        }
-        
-        console.log('API pública - Total elementos cargados (todas las páginas):', allContentData.length)
-        
-        // Buscar específicamente ubicacion_maps_url en la respuesta
-        const mapsItem = allContentData.find((item: WebsiteContentItem) => item.tipo_contenido === 'ubicacion_maps_url')
-        console.log('API pública - ubicacion_maps_url encontrado:', mapsItem)
-        if (mapsItem) {
-          console.log('API pública - Detalles:', {
-            id: mapsItem.id,
-            activo: mapsItem.activo,
-            contenido: mapsItem.contenido?.substring(0, 100) + '...'
-          })
-        } else {
-          console.warn('⚠️ API pública: ubicacion_maps_url NO encontrado en los', allContentData.length, 'elementos activos')
-        }
-        
-        const byKey: Record<string, WebsiteContentItem> = {}
-        allContentData.forEach((item: WebsiteContentItem) => {
-          byKey[item.tipo_contenido] = item
-        })
-        console.log('Contenido cargado - ubicacion_maps_url:', byKey['ubicacion_maps_url'])
-        console.log('Contenido cargado - ubicacion_direccion:', byKey['ubicacion_direccion'])
-        console.log('Contenido cargado - contacto_direccion:', byKey['contacto_direccion'])
-        if (byKey['ubicacion_direccion']) {
-          console.log('Detalles ubicacion_direccion:', {
-            id: byKey['ubicacion_direccion'].id,
-            activo: byKey['ubicacion_direccion'].activo,
-            contenido: byKey['ubicacion_direccion'].contenido
-          })
-        }
-        console.log('Todos los tipos de contenido cargados:', Object.keys(byKey))
-        setContentMap(byKey)
+        // Todo el contenido público en una sola llamada (el servidor responde 304 si no cambió)
+        const siteResponse = await fetch('https://barberrock.es/api/publico/sitio/', { cache: 'no-cache' })
+        const site = await siteResponse.json()
 
-        // Cargar galería
-        const galleryResponse = await fetch('https://barberrock.es/api/galeria/', { cache: 'no-store' })
-        const galleryData = await galleryResponse.json()
-        setGallery(galleryData.results || galleryData)
-
-        // Cargar productos
-        const productsResponse = await fetch('https://barberrock.es/api/productos/', { cache: 'no-store' })
-        const productsData = await productsResponse.json()
-        const normalizedProducts = (productsData.results || productsData || []).map((product: any) => ({
+        setFeaturedServices((site.servicios || []).slice(0, 3))
+        setContentMap(site.contenido || {})
+        setGallery(site.galeria || [])
+        setProducts((site.productos || []).map((product: any) => ({
           ...product,
           precio: typeof product.precio === 'number' ? product.precio : parseFloat(product.precio || '0'),
-        }))
-        setProducts(normalizedProducts)
-
-        // Cargar paquetes
-        const packagesResponse = await fetch('https://barberrock.es/api/paquetes/', { cache: 'no-store' })
-        const packagesData = await packagesResponse.json()
-        const packagesList = (packagesData.results || packagesData || []).filter((pkg: Package) => pkg.activo !== false)
-        setPackages(packagesList)
-
-        // Cargar testimonios
-        const testimonialsResponse = await fetch('https://barberrock.es/api/testimonios/', { cache: 'no-store' })
-        const testimonialsData = await testimonialsResponse.json()
-        setTestimonials(testimonialsData.results || testimonialsData)
+        })))
+        setPackages(site.paquetes || [])
+        setTestimonials(site.testimonios || [])
 
         setLoading(false)
       } catch (error) {
@@ -701,11 +651,20 @@ export default function HomePage() {
                   <div className="relative mb-4">
                     {pkg.imagen ? (
                       <div className="w-full h-48 relative rounded-lg overflow-hidden">
-                        <img
-                          src={pkg.imagen.startsWith('http') ? pkg.imagen : `https://barberrock.es${pkg.imagen}`}
-                          alt={pkg.nombre}
-                          className="w-full h-full object-cover"
-                        />
+                        <picture>
+                          {pkg.imagen_srcset?.webp && (
+                            <source type="image/webp" srcSet={mediaSrcset(pkg.imagen_srcset.webp)} sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw" />
+                          )}
+                          {pkg.imagen_srcset?.jpeg && (
+                            <source type="image/jpeg" srcSet={mediaSrcset(pkg.imagen_srcset.jpeg)} sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw" />
+                          )}
+                          <img
+                            src={mediaUrl(pkg.imagen)}
+                            alt={pkg.nombre}
+                            loading="lazy"
+                            className="w-full h-full object-cover"
+                          />
+                        </picture>
                       </div>
                     ) : (
                       <div className="w-full h-48 bg-gradient-to-br from-primary-100 to-primary-200 rounded-lg flex items-center justify-center">
@@ -770,11 +729,20 @@ export default function HomePage() {
               {products.map((product) => (
                 <div key={product.id} className="border rounded-xl shadow-sm hover:shadow-md transition-shadow bg-white">
                   {product.imagen ? (
-                    <img
-                      src={product.imagen.startsWith('http') ? product.imagen : `https://barberrock.es${product.imagen}`}
-                      alt={product.nombre}
-                      className="w-full h-40 sm:h-48 object-cover rounded-t-xl"
-                    />
+                    <picture>
+                      {product.imagen_srcset?.webp && (
+                        <source type="image/webp" srcSet={mediaSrcset(product.imagen_srcset.webp)} sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw" />
+                      )}
+                      {product.imagen_srcset?.jpeg && (
+                        <source type="image/jpeg" srcSet={mediaSrcset(product.imagen_srcset.jpeg)} sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw" />
+                      )}
+                      <img
+                        src={mediaUrl(product.imagen)}
+                        alt={product.nombre}
+                        loading="lazy"
+                        className="w-full h-40 sm:h-48 object-cover rounded-t-xl"
+                      />
+                    </picture>
                   ) : (
                     <div className="w-full h-40 sm:h-48 bg-gray-100 rounded-t-xl flex items-center justify-center text-gray-400">
                       <Package className="w-10 h-10 md:w-12 md:h-12" />
@@ -953,17 +921,27 @@ export default function HomePage() {
               {gallery.map((item) => (
                 <div key={item.id} className="relative aspect-square bg-gray-200 rounded-lg overflow-hidden">
                   {item.imagen ? (
-                    <img
-                      src={item.imagen.startsWith('http') ? item.imagen : `https://barberrock.es${item.imagen}`}
-                      alt={item.titulo || 'Trabajo de la barbería'}
-                      className="w-full h-full object-cover"
-                      onError={(e) => {
-                        e.currentTarget.style.display = 'none'
-                        if (e.currentTarget.nextElementSibling) {
-                          ;(e.currentTarget.nextElementSibling as HTMLElement).style.display = 'flex'
-                        }
-                      }}
-                    />
+                    <picture>
+                      {item.imagen_srcset?.webp && (
+                        <source type="image/webp" srcSet={mediaSrcset(item.imagen_srcset.webp)} sizes="(min-width: 768px) 25vw, (min-width: 640px) 33vw, 50vw" />
+                      )}
+                      {item.imagen_srcset?.jpeg && (
+                        <source type="image/jpeg" srcSet={mediaSrcset(item.imagen_srcset.jpeg)} sizes="(min-width: 768px) 25vw, (min-width: 640px) 33vw, 50vw" />
+                      )}
+                      <img
+                        src={mediaUrl(item.imagen)}
+                        alt={item.titulo || 'Trabajo de la barbería'}
+                        loading="lazy"
+                        className="w-full h-full object-cover"
+                        onError={(e) => {
+                          const picture = e.currentTarget.parentElement as HTMLElement
+                          picture.style.display = 'none'
+                          if (picture.nextElementSibling) {
+                            ;(picture.nextElementSibling as HTMLElement).style.display = 'flex'
+                          }
+                        }}
+                      />
+                    </picture>
                   ) : null}
                   <div
                     className={`w-full h-full bg-gradient-to-br from-primary-100 to-primary-200 flex items-center justify-center ${
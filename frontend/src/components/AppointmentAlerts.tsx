@@ -1,6 +1,6 @@
 ﻿'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Bell, MessageCircle, Clock, User, Scissors, X, CheckCircle } from 'lucide-react'
 
 interface AppointmentAlert {
@@ -15,16 +15,77 @@ interface AppointmentAlert {
   fecha_creacion: string
 }
 
+const ALERTS_SOCKET_URL = 'wss://barberrock.es/ws/admin/alertas/'
+const POLLING_INTERVAL_MS = 30000
+// Con el WebSocket abierto se consulta igual de vez en cuando: si la capa de canales
+// no comparte los avisos entre procesos, el socket conecta pero nunca recibe nada
+const CONNECTED_POLLING_INTERVAL_MS = 300000
+const MAX_RECONNECT_DELAY_MS = 60000
+
 export default function AppointmentAlerts() {
   const [alerts, setAlerts] = useState<AppointmentAlert[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const socketConnected = useRef(false)
+  const lastSync = useRef(0)
 
   useEffect(() => {
     loadAlerts()
-    // Recargar alertas cada 30 segundos
-    const interval = setInterval(loadAlerts, 30000)
-    return () => clearInterval(interval)
+
+    // Las alertas llegan por WebSocket; sin conexión se consulta cada 30 s y con ella cada 5 min
+    const interval = setInterval(() => {
+      const elapsed = Date.now() - lastSync.current
+      if (!socketConnected.current || elapsed >= CONNECTED_POLLING_INTERVAL_MS) {
+        loadAlerts()
+      }
+    }, POLLING_INTERVAL_MS)
+
+    let socket: WebSocket | null = null
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined
+    let reconnectDelay = 1000
+    let closed = false
+
+    const connect = () => {
+      const token = localStorage.getItem('access_token')
+      if (!token || closed) {
+        return
+      }
+
+      socket = new WebSocket(`${ALERTS_SOCKET_URL}?token=${encodeURIComponent(token)}`)
+      socket.onopen = () => {
+        socketConnected.current = true
+        reconnectDelay = 1000
+      }
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data)
+        if (data.tipo === 'alertas') {
+          setAlerts(data.alertas)
+          setLoading(false)
+          lastSync.current = Date.now()
+        } else if (data.tipo === 'alerta') {
+          setAlerts((prev) => [data.alerta, ...prev.filter((a) => a.id !== data.alerta.id)])
+        } else if (data.tipo === 'alerta_retirada') {
+          setAlerts((prev) => prev.filter((a) => a.id !== data.id))
+        }
+      }
+      socket.onclose = (event) => {
+        socketConnected.current = false
+        // 4403: el usuario no es administrador o el token expiró; se sigue consultando la API
+        if (!closed && event.code !== 4403) {
+          reconnectTimer = setTimeout(connect, reconnectDelay)
+          reconnectDelay = Math.min(reconnectDelay * 2, MAX_RECONNECT_DELAY_MS)
+        }
+      }
+    }
+
+    connect()
+
+    return () => {
+      closed = true
+      clearInterval(interval)
+      clearTimeout(reconnectTimer)
+      socket?.close()
+    }
   }, [])
 
   const loadAlerts = async () => {
@@ -54,6 +115,7 @@ export default function AppointmentAlerts() {
 
       const data = await response.json()
       setAlerts(data)
+      lastSync.current = Date.now()
     } catch (err: any) {
       setError(err.message || 'Error al cargar las alertas')
     } finally {
@@ -1,6 +1,6 @@
 ﻿'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Calendar, Clock, User, Scissors, CheckCircle, XCircle, Eye, Search } from 'lucide-react'
 
 interface Appointment {
@@ -20,6 +20,42 @@ interface Appointment {
   notas?: string
 }
 
+const mapAppointment = (apt: any): Appointment => {
+  const clienteNombre = (apt.cliente_nombre || 'Cliente').toString()
+  const barberoNombre = (apt.barbero_nombre || 'Barbero').toString()
+  const servicioNombre = (apt.servicio_nombre || apt.paquete_nombre || 'Servicio').toString()
+
+  const precio = Number(apt.precio ?? 0)
+  const duracion = apt.duracion
+    ?? (apt.fecha_hora_fin ? (new Date(apt.fecha_hora_fin).getTime() - new Date(apt.fecha_hora).getTime()) / 60000 : 0)
+
+  return {
+    id: apt.id,
+    cliente_nombre: clienteNombre,
+    barbero_nombre: barberoNombre,
+    servicio_nombre: servicioNombre,
+    productos: Array.isArray(apt.productos)
+      ? apt.productos.map((producto: any) => ({
+          id: producto.id,
+          nombre: producto.nombre || 'Producto',
+          precio: typeof producto.precio === 'number' ? producto.precio : parseFloat(producto.precio ?? 0),
+        }))
+      : [],
+    fecha_hora: apt.fecha_hora,
+    estado: apt.estado,
+    precio: Number.isNaN(precio) ? 0 : precio,
+    duracion: Number.isNaN(duracion) ? 0 : duracion,
+    notas: apt.notas || '',
+  }
+}
+
+// Reemplaza por id las citas cambiadas y quita las borradas (las respuestas de citas/cambios/ se solapan)
+const mergeChanges = (current: Appointment[], changed: Appointment[], deletedIds: number[]) => {
+  const removed = new Set([...deletedIds, ...changed.map((apt) => apt.id)])
+  return [...current.filter((apt) => !removed.has(apt.id)), ...changed]
+    .sort((a, b) => new Date(a.fecha_hora).getTime() - new Date(b.fecha_hora).getTime())
+}
+
 export default function AppointmentsManager() {
   const [appointments, setAppointments] = useState<Appointment[]>([])
   const [loading, setLoading] = useState(true)
@@ -27,6 +63,7 @@ export default function AppointmentsManager() {
   const [searchTerm, setSearchTerm] = useState('')
   const [selectedAppointment, setSelectedAppointment] = useState<Appointment | null>(null)
   const [errorMessage, setErrorMessage] = useState('')
+  const syncCursor = useRef<string | null>(null)
 
   useEffect(() => {
     loadAppointments()
@@ -44,7 +81,16 @@ export default function AppointmentsManager() {
         return
       }
 
-      const response = await fetch('https://barberrock.es/api/citas/', {
+      // El cursor se pide antes del listado para no perder cambios hechos entre ambas consultas
+      const cursorResponse = await fetch('https://barberrock.es/api/citas/cambios/', {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+        cache: 'no-store',
+      })
+      syncCursor.current = cursorResponse.ok ? (await cursorResponse.json()).cursor : null
+
+      const response = await fetch('https://barberrock.es/api/citas/?expand=productos', {
         headers: {
           Authorization: `Bearer ${token}`,
         },
@@ -53,48 +99,7 @@ export default function AppointmentsManager() {
       if (response.ok) {
         const data = await response.json()
         const rawList = Array.isArray(data) ? data : data.results || []
-        const mapped: Appointment[] = rawList.map((apt: any) => {
-          const clienteNombre = (apt.nombre_cliente || apt.cliente?.user?.first_name || '')
-            .toString()
-            .trim()
-          const clienteApellido = (apt.cliente?.user?.last_name || '').toString().trim()
-          const clienteDisplay = [clienteNombre, clienteApellido]
-            .filter(Boolean)
-            .join(' ') || apt.cliente?.user?.username || 'Cliente'
-
-          const barberoNombre = [
-            (apt.barbero?.user?.first_name || '').toString().trim(),
-            (apt.barbero?.user?.last_name || '').toString().trim(),
-          ]
-            .filter(Boolean)
-            .join(' ') || apt.barbero?.user?.username || 'Barbero'
-
-          const servicioNombre = (apt.servicio?.nombre || 'Servicio').toString()
-
-          const precio = Number(apt.servicio?.precio ?? apt.precio ?? 0)
-          const duracion = Number(apt.servicio?.duracion ?? apt.duracion ?? 0)
-
-          return {
-            id: apt.id,
-            cliente_nombre: clienteDisplay,
-            barbero_nombre: barberoNombre,
-            servicio_nombre: servicioNombre,
-            productos: Array.isArray(apt.productos)
-              ? apt.productos.map((producto: any) => ({
-                  id: producto.id,
-                  nombre: producto.nombre || 'Producto',
-                  precio: typeof producto.precio === 'number' ? producto.precio : parseFloat(producto.precio ?? 0),
-                }))
-              : [],
-            fecha_hora: apt.fecha_hora,
-            estado: apt.estado,
-            precio: Number.isNaN(precio) ? 0 : precio,
-            duracion: Number.isNaN(duracion) ? 0 : duracion,
-            notas: apt.notas || '',
-          }
-        })
-
-        setAppointments(mapped)
+        setAppointments(rawList.map(mapAppointment))
       } else if (response.status === 401) {
         setAppointments([])
         window.location.href = '/login'
@@ -109,6 +114,37 @@ export default function AppointmentsManager() {
     }
   }
 
+  const syncAppointments = async (token: string) => {
+    let cursor = syncCursor.current
+    if (!cursor) {
+      await loadAppointments()
+      return
+    }
+
+    let hasMore = true
+    while (hasMore) {
+      const params = new URLSearchParams({ desde: cursor, expand: 'productos' })
+      const response = await fetch(`https://barberrock.es/api/citas/cambios/?${params}`, {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+        cache: 'no-store',
+      })
+      if (!response.ok) {
+        // 410: la última sincronización es demasiado antigua
+        await loadAppointments()
+        return
+      }
+
+      const data = await response.json()
+      const changed: Appointment[] = (data.citas || []).map(mapAppointment)
+      setAppointments((current) => mergeChanges(current, changed, data.eliminadas || []))
+      cursor = data.cursor as string
+      syncCursor.current = cursor
+      hasMore = Boolean(data.hay_mas)
+    }
+  }
+
   const updateAppointmentStatus = async (id: number, newStatus: string) => {
     try {
       const token = localStorage.getItem('access_token')
@@ -127,7 +163,7 @@ export default function AppointmentsManager() {
       })
 
       if (response.ok) {
-        await loadAppointments()
+        await syncAppointments(token)
         alert('Estado actualizado correctamente')
       } else if (response.status === 401) {
         localStorage.clear()
@@ -233,6 +233,18 @@ system_settings = [
         'valor': '24',
         'descripcion': 'Horas mínimas para cancelar una cita'
     },
+    {
+        'tipo_configuracion': 'booking',
+        'clave': 'reservas_paso_minutos',
+        'valor': '30',
+        'descripcion': 'Minutos entre horarios disponibles'
+    },
+    {
+        'tipo_configuracion': 'booking',
+        'clave': 'reservas_apartado_minutos',
+        'valor': '5',
+        'descripcion': 'Minutos que un horario queda apartado mientras el cliente agenda'
+    },
 ]
 
 print("\nCreando configuración del sistema...")
@@ -0,0 +1,43 @@
+"""
+Agenda en vivo de cada barbero (WebSocket ws/barbero/agenda/).
+
+Las señales de Appointment publican en el grupo del barbero, después del
+commit, un aviso por cada cita creada, modificada, cancelada o borrada:
+
+    {'tipo': 'cita_creada' | 'cita_actualizada' | 'cita_cancelada', 'cita': {...}}
+    {'tipo': 'cita_eliminada', 'id': n}
+
+`cita` usa la representación del listado con EXPANSION_AGENDA, la misma que
+pide el panel del barbero. Si una cita cambia de barbero, el anterior recibe
+'cita_eliminada' y el nuevo 'cita_creada'. Al reconectarse, el cliente
+recupera lo que se perdió con citas/cambios/ (ver sincronizacion.py).
+"""
+
+from .canales import publicar, publicar_con
+from .models import Appointment
+from .serializers import AppointmentListSerializer
+
+EXPANSION_AGENDA = ('cliente', 'servicio', 'productos')
+
+
+def grupo_agenda(barbero_id):
+    return f'agenda_barbero_{barbero_id}'
+
+
+def _mensaje_de_cita(tipo, cita_id):
+    cita = Appointment.objects.select_related(
+        'cliente__user', 'barbero__user', 'servicio', 'paquete', 'survey'
+    ).prefetch_related('productos').filter(pk=cita_id).first()
+    if cita is None:
+        # Borrada antes de confirmar la transacción: avisa su post_delete
+        return None
+    return {'tipo': tipo, 'cita': AppointmentListSerializer(cita, context={'expand': EXPANSION_AGENDA}).data}
+
+
+def publicar_cita(barbero_id, tipo, cita_id):
+    """Publica la cita en la agenda del barbero al confirmar la transacción"""
+    publicar_con(grupo_agenda(barbero_id), lambda: _mensaje_de_cita(tipo, cita_id))
+
+
+def publicar_cita_eliminada(barbero_id, cita_id):
+    publicar(grupo_agenda(barbero_id), {'tipo': 'cita_eliminada', 'id': cita_id})
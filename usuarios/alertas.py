@@ -0,0 +1,89 @@
+"""
+Alertas de nuevas citas para el panel de administración.
+
+GET admin/alertas/ y el WebSocket ws/admin/alertas/ (consumers.AlertasConsumer)
+comparten la misma selección y representación de las alertas. Los cambios se
+publican al grupo GRUPO_ALERTAS:
+
+    {'tipo': 'alertas', 'alertas': [...]}   al conectarse: alertas pendientes
+    {'tipo': 'alerta', 'alerta': {...}}     alerta nueva o modificada (reemplazar por id)
+    {'tipo': 'alerta_retirada', 'id': n}    enviada, cita cancelada/completada o borrada
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .canales import publicar, publicar_con
+from .models import AppointmentAlert
+from .serializers import nombre_de_usuario
+
+GRUPO_ALERTAS = 'alertas_admin'
+
+ESTADOS_CON_ALERTA = ['pendiente', 'agendada', 'confirmada', 'en_progreso']
+
+# Las alertas de citas pasadas dejan de mostrarse tras este margen
+ANTIGUEDAD_MAXIMA = timedelta(days=1)
+
+
+def alertas_pendientes():
+    """Alertas sin enviar de citas activas (futuras o del último día)"""
+    return AppointmentAlert.objects.filter(
+        mensaje_enviado=False,
+        appointment__estado__in=ESTADOS_CON_ALERTA,
+        appointment__fecha_hora__gte=timezone.now() - ANTIGUEDAD_MAXIMA
+    ).select_related(
+        'appointment__cliente__user',
+        'appointment__barbero__user',
+        'appointment__servicio',
+        'appointment__paquete'
+    ).order_by('-fecha_creacion')
+
+
+def datos_alerta(alert):
+    appointment = alert.appointment
+    if appointment.cliente and appointment.cliente.user:
+        cliente_nombre = appointment.cliente.user.get_full_name() or appointment.cliente.user.username
+    else:
+        cliente_nombre = appointment.nombre_cliente or 'Cliente'
+
+    if appointment.servicio:
+        servicio = appointment.servicio.nombre
+    else:
+        servicio = appointment.paquete.nombre if appointment.paquete else ''
+
+    return {
+        'id': alert.id,
+        'appointment_id': appointment.id,
+        'cliente_nombre': cliente_nombre,
+        'cliente_telefono': appointment.telefono_cliente,
+        'barbero': nombre_de_usuario(appointment.barbero.user),
+        'servicio': servicio,
+        'fecha_hora': appointment.fecha_hora,
+        'whatsapp_url': alert.whatsapp_url,
+        'fecha_creacion': alert.fecha_creacion
+    }
+
+
+def _mensaje_de_alerta(alerta_id):
+    alert = alertas_pendientes().filter(pk=alerta_id).first()
+    if alert is None:
+        return {'tipo': 'alerta_retirada', 'id': alerta_id}
+    return {'tipo': 'alerta', 'alerta': datos_alerta(alert)}
+
+
+def publicar_alerta(alerta_id):
+    """Publica el estado actual de la alerta (o su retiro) al confirmar la transacción"""
+    publicar_con(GRUPO_ALERTAS, lambda: _mensaje_de_alerta(alerta_id))
+
+
+def publicar_alerta_de_cita(appointment_id):
+    """Publica la alerta de la cita, si tiene, al confirmar la transacción"""
+    def construir():
+        alerta_id = AppointmentAlert.objects.filter(appointment_id=appointment_id).values_list('id', flat=True).first()
+        return _mensaje_de_alerta(alerta_id) if alerta_id else None
+    publicar_con(GRUPO_ALERTAS, construir)
+
+
+def publicar_alerta_retirada(alerta_id):
+    publicar(GRUPO_ALERTAS, {'tipo': 'alerta_retirada', 'id': alerta_id})
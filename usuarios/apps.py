@@ -21,3 +21,5 @@ class UsuariosConfig(AppConfig):
                     ClientProfile.objects.create(user=instance)
                 elif instance.rol == 'barbero':
                     BarberProfile.objects.create(user=instance)
+
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,78 @@
+"""
+Infraestructura común de los WebSocket (channels).
+
+Los navegadores no pueden enviar la cabecera Authorization al abrir un
+WebSocket, así que JWTAuthMiddleware lee el token de acceso de `?token=` y deja
+el usuario en scope['user'] (AnonymousUser si falta o no es válido).
+
+Los avisos se publican en grupos de la capa de canales con `publicar`, que
+espera a que la transacción se confirme: un cliente nunca recibe un cambio que
+después se revierte. CHANNEL_LAYERS en settings decide si la capa es en memoria
+(un solo proceso ASGI) o compartida entre procesos y servidores.
+"""
+
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+logger = logging.getLogger(__name__)
+
+# Cierre de la conexión cuando el usuario no puede suscribirse
+CODIGO_NO_AUTORIZADO = 4403
+
+
+@database_sync_to_async
+def _usuario_del_token(token):
+    autenticacion = JWTAuthentication()
+    try:
+        return autenticacion.get_user(autenticacion.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Autentica la conexión con el token de acceso JWT de `?token=`"""
+
+    async def __call__(self, scope, receive, send):
+        parametros = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        token = parametros.get('token', [''])[0]
+        scope = dict(scope, user=await _usuario_del_token(token) if token else AnonymousUser())
+        return await super().__call__(scope, receive, send)
+
+
+def _enviar(grupo, mensaje):
+    capa = get_channel_layer()
+    if capa is None:
+        return
+    # Fechas y decimales como texto: la capa de Redis serializa con msgpack
+    mensaje = json.loads(json.dumps(mensaje, cls=DjangoJSONEncoder))
+    try:
+        async_to_sync(capa.group_send)(grupo, {'type': 'aviso', 'mensaje': mensaje})
+    except Exception:
+        # Un fallo de la capa (p. ej. Redis caído) no debe romper la solicitud;
+        # los clientes vuelven a consultar la API al reconectarse
+        logger.exception('No se pudo publicar en el grupo %s', grupo)
+
+
+def publicar(grupo, mensaje):
+    """Envía `mensaje` (dict JSON) a los consumidores del grupo al confirmar la transacción"""
+    transaction.on_commit(lambda: _enviar(grupo, mensaje))
+
+
+def publicar_con(grupo, construir):
+    """Como `publicar`, pero el mensaje se construye (y consulta) después de confirmar; None no envía nada"""
+    def enviar():
+        mensaje = construir()
+        if mensaje is not None:
+            _enviar(grupo, mensaje)
+    transaction.on_commit(enviar)
@@ -0,0 +1,59 @@
+"""
+Comprobaciones de despliegue (`python manage.py check --deploy`).
+"""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+CAPA_EN_MEMORIA = 'channels.layers.InMemoryChannelLayer'
+
+# Backends de caché con incr/add atómicos y compartidos entre procesos
+CACHES_ATOMICAS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+@register(Tags.compatibility, deploy=True)
+def revisar_capa_de_canales(app_configs, **kwargs):
+    """
+    Con Gunicorn para la API y Daphne para los WebSocket (DEPLOY_PRODUCTION.md
+    8.4) la capa en memoria no comparte los avisos entre procesos: los sockets
+    conectan pero nunca reciben eventos.
+    """
+    backend = getattr(settings, 'CHANNEL_LAYERS', {}).get('default', {}).get('BACKEND')
+    if backend != CAPA_EN_MEMORIA:
+        return []
+    return [
+        Warning(
+            'CHANNEL_LAYERS usa la capa en memoria.',
+            hint=(
+                'Si la API y los WebSocket corren en procesos distintos (Gunicorn + Daphne), define '
+                'CHANNEL_LAYER_REDIS_URL; la capa en memoria sólo sirve con un único proceso ASGI.'
+            ),
+            id='usuarios.W001',
+        )
+    ]
+
+
+@register(Tags.caches, deploy=True)
+def revisar_cache(app_configs, **kwargs):
+    """
+    Los contadores de versión (versiones.py, series.py) necesitan incr/add
+    atómicos y que la caché no los borre para hacer sitio; el caché en disco o
+    en memoria no cumple ninguna de las dos cosas.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in CACHES_ATOMICAS:
+        return []
+    return [
+        Warning(
+            f'CACHES usa {backend}.',
+            hint=(
+                'Define CACHE_REDIS_URL: con este backend los contadores de versión no son atómicos y '
+                'la caché puede borrarlos, así que una invalidación puede perderse.'
+            ),
+            id='usuarios.W002',
+        )
+    ]
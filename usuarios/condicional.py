@@ -0,0 +1,61 @@
+"""
+GET condicional (ETag / Last-Modified) para listados públicos.
+
+El validador de un listado se obtiene con una sola consulta agregada sobre el
+queryset filtrado: la fecha de actualización más reciente y el número de filas.
+Si el cliente ya tiene esa versión se responde 304 sin serializar nada.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def respuesta_no_modificada(request, etag, ultima_modificacion):
+    """304 si el cliente ya tiene la versión indicada; None en otro caso"""
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if response is not None:
+        agregar_validadores(response, etag, ultima_modificacion)
+    return response
+
+
+def agregar_validadores(response, etag, ultima_modificacion):
+    response['ETag'] = etag
+    if ultima_modificacion is not None:
+        response['Last-Modified'] = http_date(ultima_modificacion)
+    # Anónimos y administradores ven querysets distintos en la misma URL
+    patch_vary_headers(response, ['Authorization'])
+
+
+class ListaCondicionalMixin:
+    """
+    Responde 304 a `If-None-Match` / `If-Modified-Since` en el listado de un ViewSet.
+
+    `campos_actualizacion` son los campos de fecha cuyo máximo forma el validador;
+    pueden cruzar relaciones (p. ej. los servicios anidados de un paquete).
+    """
+    campos_actualizacion = ('fecha_actualizacion',)
+
+    def validador_lista(self, queryset):
+        """(etag, timestamp de la última modificación o None) del queryset"""
+        agregados = {f'ultima_{i}': Max(campo) for i, campo in enumerate(self.campos_actualizacion)}
+        resumen = queryset.order_by().aggregate(total=Count('pk', distinct=True), **agregados)
+        fechas = [resumen[clave] for clave in agregados if resumen[clave] is not None]
+        ultima = max(fechas) if fechas else None
+
+        firma = f'{queryset.model._meta.label_lower}:{resumen["total"]}:{ultima.isoformat() if ultima else ""}'
+        etag = f'"{hashlib.md5(firma.encode("utf-8")).hexdigest()}"'
+        return etag, int(ultima.timestamp()) if ultima else None
+
+    def list(self, request, *args, **kwargs):
+        etag, ultima = self.validador_lista(self.filter_queryset(self.get_queryset()))
+        no_modificado = respuesta_no_modificada(request, etag, ultima)
+        if no_modificado is not None:
+            return no_modificado
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            agregar_validadores(response, etag, ultima)
+        return response
@@ -0,0 +1,86 @@
+"""
+Lectura tipada de SystemSettings sin consultas en el camino caliente.
+
+Todas las filas se cargan una vez por proceso en una instantánea en memoria
+(clave -> texto). Igual que el contenido del sitio (ver contenido.py), cada
+lectura compara la versión de SystemSettings en la caché compartida y sólo
+recarga cuando un guardado o borrado la renovó. Los valores convertidos se
+memorizan por (clave, tipo).
+
+    configuracion.obtener('reservas_paso_minutos', int, 30)
+"""
+
+import json
+import logging
+import threading
+from decimal import InvalidOperation
+
+from .models import SystemSettings
+from .versiones import versiones
+
+logger = logging.getLogger(__name__)
+
+VALORES_VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'on'}
+VALORES_FALSOS = {'0', 'false', 'no', 'off', ''}
+
+# Marca de un valor que no se pudo convertir (se devuelve el default de cada llamada)
+_INVALIDO = object()
+
+
+def _convertir(valor, tipo):
+    texto = valor.strip()
+    if tipo is bool:
+        if texto.lower() in VALORES_VERDADEROS:
+            return True
+        if texto.lower() in VALORES_FALSOS:
+            return False
+        raise ValueError(f'valor booleano inválido: {valor!r}')
+    if tipo in (dict, list):
+        convertido = json.loads(texto)
+        if not isinstance(convertido, tipo):
+            raise ValueError(f'se esperaba {tipo.__name__}')
+        return convertido
+    return tipo(texto)
+
+
+class AlmacenConfiguracion:
+    """Instantánea tipada de SystemSettings, recargada cuando cambia su versión"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._valores = {}
+        self._convertidos = {}
+
+    def _instantanea(self):
+        version = versiones(SystemSettings)[0]
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._valores = dict(SystemSettings.objects.values_list('clave', 'valor'))
+                    self._convertidos = {}
+                    self._version = version
+        return self._valores, self._convertidos
+
+    def obtener(self, clave, tipo=str, default=None):
+        """
+        Valor de `clave` convertido a `tipo` (str, int, float, bool, Decimal, dict o list).
+
+        Devuelve `default` si la clave no existe o su valor no se puede convertir.
+        """
+        valores, convertidos = self._instantanea()
+        if clave not in valores:
+            return default
+
+        convertido = convertidos.get((clave, tipo))
+        if convertido is None:
+            try:
+                convertido = _convertir(valores[clave], tipo)
+            except (ValueError, TypeError, InvalidOperation):
+                logger.warning('Configuración %s inválida para %s: %r', clave, tipo.__name__, valores[clave])
+                convertido = _INVALIDO
+            convertidos[(clave, tipo)] = convertido
+        return default if convertido is _INVALIDO else convertido
+
+
+configuracion = AlmacenConfiguracion()
@@ -0,0 +1,88 @@
+"""
+Consumidores WebSocket (ver routing.py y canales.py).
+"""
+
+import json
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .agenda import grupo_agenda
+from .alertas import GRUPO_ALERTAS, alertas_pendientes, datos_alerta
+from .canales import CODIGO_NO_AUTORIZADO
+from .models import BarberProfile
+
+
+class ConsumidorDeGrupo(AsyncJsonWebsocketConsumer):
+    """
+    Suscribe la conexión a un grupo y reenvía sus avisos como JSON.
+
+    Las subclases definen `puede_suscribirse(user)`, `grupo_de(user)` (puede
+    consultar la base de datos; None rechaza la conexión) y, opcionalmente,
+    `estado_inicial(user)`: el mensaje que se envía al conectarse, después de
+    unirse al grupo para no perder avisos entre ambos pasos.
+    """
+    grupo = None
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user and user.is_authenticated and self.puede_suscribirse(user):
+            self.grupo = await database_sync_to_async(self.grupo_de)(user)
+        if not self.grupo:
+            await self.close(code=CODIGO_NO_AUTORIZADO)
+            return
+
+        await self.channel_layer.group_add(self.grupo, self.channel_name)
+        await self.accept()
+        inicial = await database_sync_to_async(self.estado_inicial)(user)
+        if inicial is not None:
+            await self.send_json(inicial)
+
+    async def disconnect(self, code):
+        if self.grupo:
+            await self.channel_layer.group_discard(self.grupo, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Canal de sólo lectura: los cambios se hacen por la API REST
+        pass
+
+    async def aviso(self, event):
+        await self.send_json(event['mensaje'])
+
+    @classmethod
+    async def encode_json(cls, content):
+        return json.dumps(content, cls=DjangoJSONEncoder)
+
+    def puede_suscribirse(self, user):
+        raise NotImplementedError
+
+    def grupo_de(self, user):
+        raise NotImplementedError
+
+    def estado_inicial(self, user):
+        return None
+
+
+class AlertasConsumer(ConsumidorDeGrupo):
+    """ws/admin/alertas/: alertas de nuevas citas para los administradores"""
+
+    def puede_suscribirse(self, user):
+        return user.rol == 'admin'
+
+    def grupo_de(self, user):
+        return GRUPO_ALERTAS
+
+    def estado_inicial(self, user):
+        return {'tipo': 'alertas', 'alertas': [datos_alerta(alert) for alert in alertas_pendientes()]}
+
+
+class AgendaBarberoConsumer(ConsumidorDeGrupo):
+    """ws/barbero/agenda/: citas del barbero conectado a medida que se confirman (ver agenda.py)"""
+
+    def puede_suscribirse(self, user):
+        return user.rol == 'barbero'
+
+    def grupo_de(self, user):
+        barbero_id = BarberProfile.objects.filter(user=user).values_list('id', flat=True).first()
+        return grupo_agenda(barbero_id) if barbero_id else None
@@ -0,0 +1,33 @@
+"""
+Contenido del sitio (WebsiteContent) en memoria del proceso.
+
+Todas las claves activas se cargan en un diccionario la primera vez que se
+piden. Cada worker compara la versión de WebsiteContent guardada en la caché
+compartida (ver versiones.py) con la de su copia y la recarga sólo si cambió,
+así que leer el contenido no consulta la base de datos.
+"""
+
+import threading
+
+from .models import WebsiteContent
+from .versiones import versiones
+
+_lock = threading.Lock()
+_cargado = {'version': None, 'contenido': {}}
+
+
+def contenido_sitio():
+    """Diccionario tipo_contenido -> WebsiteContent con las claves activas (no modificar)"""
+    version = versiones(WebsiteContent)[0]
+    if _cargado['version'] == version:
+        return _cargado['contenido']
+
+    with _lock:
+        if _cargado['version'] != version:
+            _cargado['contenido'] = {
+                item.tipo_contenido: item
+                for item in WebsiteContent.objects.filter(activo=True).order_by('tipo_contenido')
+            }
+            _cargado['version'] = version
+    return _cargado['contenido']
+
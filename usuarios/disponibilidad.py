@@ -0,0 +1,328 @@
+"""
+Motor de disponibilidad basado en intervalos.
+
+Las citas de un barbero se cargan una sola vez como intervalos ocupados
+(minutos desde la medianoche, en hora local), se ordenan y fusionan, y los
+horarios libres se obtienen con un solo barrido sobre la lista fusionada.
+
+Los intervalos fusionados de cada barbero/día se materializan en
+BarberDayOccupancy (actualizado por señales al guardar o borrar citas), de modo
+que las lecturas de disponibilidad no recorren la tabla de citas.
+
+Las reservas temporales (SlotHold) vigentes también cuentan como ocupadas; al
+vencer dejan de contar sin necesidad de tareas programadas.
+"""
+
+import json
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .configuracion import configuracion
+from .fechas import filtro_rango, rango_de_dias, rango_del_dia
+from .models import DURACION_CITA_POR_DEFECTO, RESTRICCION_SOLAPAMIENTO_CITAS, Appointment, BarberDayOccupancy, SlotHold
+
+DURACION_POR_DEFECTO = DURACION_CITA_POR_DEFECTO
+PASO_POR_DEFECTO = 30
+
+# Tiempo que un horario queda apartado mientras el cliente termina de agendar
+DURACION_RESERVA_TEMPORAL = timedelta(minutes=5)
+
+# Claves de SystemSettings que ajustan los valores anteriores
+CLAVE_PASO_HORARIOS = 'reservas_paso_minutos'
+CLAVE_MINUTOS_RESERVA_TEMPORAL = 'reservas_apartado_minutos'
+
+# Estados de cita que ocupan el horario del barbero
+ESTADOS_ACTIVOS = Appointment.ESTADOS_ACTIVOS
+
+
+def _minutos(hora):
+    """Convierte un objeto time (o 'HH:MM') a minutos desde la medianoche"""
+    if isinstance(hora, str):
+        hora = time.fromisoformat(hora)
+    return hora.hour * 60 + hora.minute
+
+
+def _formatear(minutos):
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def trabaja_el_dia(barbero, fecha):
+    """Indica si la fecha cae en un día laboral del barbero (0=Domingo, 1=Lunes, ...)"""
+    dia_semana_num = str((fecha.weekday() + 1) % 7)
+
+    dias_laborales = barbero.dias_laborales or []
+    if isinstance(dias_laborales, str):
+        try:
+            dias_laborales = json.loads(dias_laborales)
+        except json.JSONDecodeError:
+            dias_laborales = []
+
+    return dia_semana_num in [str(d) for d in dias_laborales]
+
+
+def _intervalo(fecha_hora, fecha_hora_fin):
+    """Intervalo (fecha local, inicio, fin) en minutos a partir de la hora de inicio y fin de una cita"""
+    local = timezone.localtime(fecha_hora)
+    inicio = _minutos(local.time())
+    if fecha_hora_fin:
+        duracion = int((fecha_hora_fin - fecha_hora).total_seconds() // 60)
+    else:
+        duracion = DURACION_POR_DEFECTO
+    return local.date(), inicio, inicio + duracion
+
+
+def intervalos_de_citas(citas):
+    """
+    Convierte citas en intervalos (inicio, fin) en minutos locales.
+
+    Si recibe un QuerySet, obtiene las horas de inicio y fin en una sola consulta.
+    """
+    if isinstance(citas, QuerySet):
+        filas = citas.values_list('fecha_hora', 'fecha_hora_fin')
+    else:
+        filas = ((cita.fecha_hora, cita.fecha_hora_fin) for cita in citas)
+
+    intervalos = []
+    for fecha_hora, fecha_hora_fin in filas:
+        _, inicio, fin = _intervalo(fecha_hora, fecha_hora_fin)
+        intervalos.append((inicio, fin))
+    return intervalos
+
+
+def intervalos_por_barbero_y_dia(citas):
+    """
+    Agrupa en memoria los intervalos ocupados por (barbero_id, fecha local).
+
+    Recibe un QuerySet de citas (o de reservas temporales) que puede abarcar
+    varios barberos y días; se resuelve con una sola consulta.
+    """
+    grupos = defaultdict(list)
+    for barbero_id, fecha_hora, fecha_hora_fin in citas.values_list('barbero_id', 'fecha_hora', 'fecha_hora_fin'):
+        fecha, inicio, fin = _intervalo(fecha_hora, fecha_hora_fin)
+        grupos[(barbero_id, fecha)].append((inicio, fin))
+    return grupos
+
+
+def fusionar_intervalos(intervalos):
+    """Ordena y fusiona intervalos que se solapan o se tocan"""
+    fusionados = []
+    for inicio, fin in sorted(intervalos):
+        if fusionados and inicio <= fusionados[-1][1]:
+            if fin > fusionados[-1][1]:
+                fusionados[-1][1] = fin
+        else:
+            fusionados.append([inicio, fin])
+    return [tuple(intervalo) for intervalo in fusionados]
+
+
+def calcular_slots_libres(inicio_jornada, fin_jornada, ocupados, duracion=PASO_POR_DEFECTO, paso=PASO_POR_DEFECTO):
+    """
+    Genera los horarios libres de una jornada.
+
+    `ocupados` debe estar ordenado y fusionado (ver fusionar_intervalos). Como los
+    candidatos avanzan en orden, basta un índice que sólo avanza sobre la lista.
+    """
+    horarios = []
+    indice = 0
+    total = len(ocupados)
+    inicio = inicio_jornada
+
+    while inicio + duracion <= fin_jornada:
+        fin = inicio + duracion
+        # Descartar intervalos que terminan antes de que empiece el candidato
+        while indice < total and ocupados[indice][1] <= inicio:
+            indice += 1
+        if indice == total or ocupados[indice][0] >= fin:
+            horarios.append({
+                'hora': _formatear(inicio),
+                'hora_fin': _formatear(fin),
+                'disponible': True
+            })
+        inicio += paso
+
+    return horarios
+
+
+def paso_de_horarios():
+    """Minutos entre horarios candidatos (configurable, sin consultas)"""
+    paso = configuracion.obtener(CLAVE_PASO_HORARIOS, int, PASO_POR_DEFECTO)
+    return paso if paso > 0 else PASO_POR_DEFECTO
+
+
+def duracion_reserva_temporal():
+    """Tiempo que dura una reserva temporal (configurable, sin consultas)"""
+    minutos = configuracion.obtener(CLAVE_MINUTOS_RESERVA_TEMPORAL, int)
+    return timedelta(minutes=minutos) if minutos and minutos > 0 else DURACION_RESERVA_TEMPORAL
+
+
+def ocupacion_por_barbero_y_dia(barbero_ids, desde, hasta):
+    """Intervalos ocupados materializados por (barbero_id, fecha) en una sola consulta"""
+    filas = BarberDayOccupancy.objects.filter(
+        barbero_id__in=barbero_ids,
+        fecha__range=(desde, hasta)
+    ).values_list('barbero_id', 'fecha', 'intervalos')
+    return {
+        (barbero_id, fecha): [tuple(intervalo) for intervalo in intervalos]
+        for barbero_id, fecha, intervalos in filas
+    }
+
+
+def reservas_por_barbero_y_dia(barbero_ids, desde, hasta, excluir_token=None):
+    """Intervalos de las reservas temporales vigentes por (barbero_id, fecha) en una sola consulta"""
+    reservas = SlotHold.objects.filter(
+        barbero_id__in=barbero_ids,
+        expira__gt=timezone.now(),
+        **filtro_rango(rango_de_dias(desde, hasta))
+    )
+    if excluir_token:
+        reservas = reservas.exclude(token=excluir_token)
+    return intervalos_por_barbero_y_dia(reservas)
+
+
+def _con_reservas(ocupados, reservas):
+    """Añade a los intervalos ocupados (ya fusionados) los de las reservas temporales"""
+    if not reservas:
+        return ocupados
+    return fusionar_intervalos(list(ocupados) + reservas)
+
+
+def ocupados_del_dia(barbero_id, fecha, intervalos, excluir_token=None):
+    """Intervalos ocupados de un día: la ocupación materializada más las reservas temporales vigentes"""
+    reservas = reservas_por_barbero_y_dia([barbero_id], fecha, fecha, excluir_token)
+    return _con_reservas([tuple(intervalo) for intervalo in intervalos], reservas.get((barbero_id, fecha)))
+
+
+def limpiar_reservas_vencidas():
+    """Elimina las reservas temporales vencidas (recorre el índice sobre `expira`)"""
+    eliminadas, _ = SlotHold.objects.filter(expira__lte=timezone.now()).delete()
+    return eliminadas
+
+
+def horarios_libres(barbero, ocupados, duracion=PASO_POR_DEFECTO, paso=None):
+    """
+    Horarios libres dentro de la jornada del barbero dados sus intervalos ocupados (ya fusionados).
+
+    Sin `paso` se usa el configurado, el mismo al listar horarios y al validar una reserva.
+    """
+    return calcular_slots_libres(
+        _minutos(barbero.horario_inicio),
+        _minutos(barbero.horario_fin),
+        ocupados,
+        int(duracion),
+        int(paso or paso_de_horarios()),
+    )
+
+
+def horarios_del_dia(barbero, fecha, duracion=PASO_POR_DEFECTO, paso=None, excluir_reserva=None):
+    """Horarios libres de un barbero en un día a partir de su ocupación materializada y sus reservas temporales"""
+    ocupados = ocupacion_por_barbero_y_dia([barbero.id], fecha, fecha).get((barbero.id, fecha), [])
+    reservas = reservas_por_barbero_y_dia([barbero.id], fecha, fecha, excluir_reserva)
+    return horarios_libres(barbero, _con_reservas(ocupados, reservas.get((barbero.id, fecha))), duracion, paso)
+
+
+def horarios_por_rango(barberos, desde, hasta, duracion=PASO_POR_DEFECTO, paso=None, excluir_reserva=None):
+    """
+    Horarios libres por día para varios barberos entre `desde` y `hasta` (inclusive).
+
+    La ocupación de todos los barberos y días se lee en una sola consulta, y
+    las reservas temporales vigentes en otra.
+    """
+    paso = int(paso or paso_de_horarios())
+    barbero_ids = [barbero.id for barbero in barberos]
+    ocupacion = ocupacion_por_barbero_y_dia(barbero_ids, desde, hasta)
+    reservas = reservas_por_barbero_y_dia(barbero_ids, desde, hasta, excluir_reserva)
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+
+    resultado = []
+    for barbero in barberos:
+        inicio_jornada = _minutos(barbero.horario_inicio)
+        fin_jornada = _minutos(barbero.horario_fin)
+        por_dia = []
+        for dia in dias:
+            if not trabaja_el_dia(barbero, dia):
+                horarios = []
+            else:
+                ocupados = _con_reservas(ocupacion.get((barbero.id, dia), []), reservas.get((barbero.id, dia)))
+                horarios = calcular_slots_libres(inicio_jornada, fin_jornada, ocupados, int(duracion), paso)
+            por_dia.append({
+                'fecha': dia.isoformat(),
+                'horarios_disponibles': horarios,
+            })
+        resultado.append({
+            'barbero': {
+                'id': barbero.id,
+                'nombre': f"{barbero.user.first_name} {barbero.user.last_name}".strip() or barbero.user.username
+            },
+            'dias': por_dia,
+        })
+    return resultado
+
+
+def bloquear_dia(barbero_id, fecha):
+    """
+    Bloquea la fila de ocupación del barbero/día (SELECT ... FOR UPDATE).
+
+    Debe llamarse dentro de transaction.atomic(); serializa las reservas del
+    mismo barbero y día hasta que la transacción termina. Si la fila no existe
+    se crea, y la restricción única resuelve la carrera entre creadores.
+    """
+    ocupacion, _ = BarberDayOccupancy.objects.select_for_update().get_or_create(
+        barbero_id=barbero_id,
+        fecha=fecha
+    )
+    return ocupacion
+
+
+def es_solapamiento(error):
+    """Indica si un IntegrityError proviene de la restricción de exclusión de citas solapadas"""
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None and getattr(diag, 'constraint_name', None):
+        return diag.constraint_name == RESTRICCION_SOLAPAMIENTO_CITAS
+    return RESTRICCION_SOLAPAMIENTO_CITAS in str(error)
+
+
+def recalcular_ocupacion(barbero_id, fecha):
+    """
+    Recalcula la ocupación materializada de un barbero en un día.
+
+    La fila del día se bloquea antes de leer las citas: dos escrituras
+    simultáneas del mismo barbero y día se recalculan una tras otra y la
+    segunda ve la cita de la primera en lugar de sobrescribirla.
+    """
+    with transaction.atomic():
+        ocupacion = bloquear_dia(barbero_id, fecha)
+        citas = Appointment.objects.filter(
+            barbero_id=barbero_id,
+            estado__in=ESTADOS_ACTIVOS,
+            **filtro_rango(rango_del_dia(fecha))
+        )
+        intervalos = fusionar_intervalos(intervalos_de_citas(citas))
+        ocupacion.intervalos = [list(intervalo) for intervalo in intervalos]
+        ocupacion.save(update_fields=['intervalos', 'fecha_actualizacion'])
+
+
+def reconstruir_ocupacion(desde=None):
+    """Reconstruye desde cero la ocupación materializada (opcionalmente a partir de una fecha)"""
+    citas = Appointment.objects.filter(estado__in=ESTADOS_ACTIVOS)
+    existentes = BarberDayOccupancy.objects.all()
+    if desde:
+        citas = citas.filter(fecha_hora__gte=rango_del_dia(desde)[0])
+        existentes = existentes.filter(fecha__gte=desde)
+
+    filas = [
+        BarberDayOccupancy(
+            barbero_id=barbero_id,
+            fecha=fecha,
+            intervalos=[list(intervalo) for intervalo in fusionar_intervalos(intervalos)]
+        )
+        for (barbero_id, fecha), intervalos in intervalos_por_barbero_y_dia(citas).items()
+    ]
+
+    with transaction.atomic():
+        existentes.delete()
+        BarberDayOccupancy.objects.bulk_create(filas, batch_size=500)
+    return len(filas)
@@ -0,0 +1,174 @@
+"""
+Resumen diario por barbero (BarberDailyStats).
+
+Los cortes completados, la comisión, los ingresos y las calificaciones se
+agregan por barbero y día local cuando una cita entra o sale del estado
+'completada' o cuando cambia su encuesta (ver signals.py). Los paneles leen las
+cifras del día y del mes con una sola consulta agrupada sobre este resumen en
+lugar de agregar la tabla de citas barbero por barbero.
+
+La instantánea de estadísticas generales del panel se guarda en caché y se
+invalida desde signals.py cuando cambian citas, usuarios, servicios o encuestas.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .disponibilidad import bloquear_dia
+from .fechas import dias_del_mes, filtro_rango, rango_del_dia
+from .models import Appointment, BarberDailyStats, Survey
+
+ESTADO_COMPLETADA = 'completada'
+
+# Lo cobrado por una cita: el precio del servicio o, si se reservó un paquete, el del paquete
+PRECIO_CITA = Coalesce('servicio__precio', 'paquete__precio')
+
+CLAVE_CACHE_ESTADISTICAS_GENERALES = 'usuarios:estadisticas_generales'
+# Respaldo: las cifras del mes dependen de la fecha actual aunque nada cambie
+TIEMPO_CACHE_ESTADISTICAS_GENERALES = 300
+
+
+def _valores_vacios():
+    return {
+        'cortes': 0,
+        'comision': Decimal('0'),
+        'ingresos': Decimal('0'),
+        'suma_calificaciones': 0,
+        'num_calificaciones': 0,
+    }
+
+
+def recalcular_estadisticas(barbero_id, fecha):
+    """
+    Recalcula el resumen de un barbero en un día; elimina la fila si ya no hay datos.
+
+    Toma el mismo bloqueo del día que las reservas (bloquear_dia) antes de
+    agregar, así dos cambios simultáneos del mismo día no se pisan el resumen.
+    """
+    with transaction.atomic():
+        bloquear_dia(barbero_id, fecha)
+        rango = rango_del_dia(fecha)
+        citas = Appointment.objects.filter(
+            barbero_id=barbero_id,
+            estado=ESTADO_COMPLETADA,
+            **filtro_rango(rango)
+        ).aggregate(
+            cortes=Count('id'),
+            comision=Sum('servicio__comision_barbero'),
+            ingresos=Sum(PRECIO_CITA),
+        )
+        encuestas = Survey.objects.filter(
+            appointment__barbero_id=barbero_id,
+            **filtro_rango(rango, 'appointment__fecha_hora')
+        ).aggregate(
+            suma_calificaciones=Sum('calificacion'),
+            num_calificaciones=Count('id'),
+        )
+
+        if not citas['cortes'] and not encuestas['num_calificaciones']:
+            BarberDailyStats.objects.filter(barbero_id=barbero_id, fecha=fecha).delete()
+            return
+
+        BarberDailyStats.objects.update_or_create(
+            barbero_id=barbero_id,
+            fecha=fecha,
+            defaults={
+                'cortes': citas['cortes'],
+                'comision': citas['comision'] or 0,
+                'ingresos': citas['ingresos'] or 0,
+                'suma_calificaciones': encuestas['suma_calificaciones'] or 0,
+                'num_calificaciones': encuestas['num_calificaciones'],
+            }
+        )
+
+
+def reconstruir_estadisticas(desde=None):
+    """Reconstruye desde cero el resumen diario (opcionalmente a partir de una fecha)"""
+    citas = Appointment.objects.filter(estado=ESTADO_COMPLETADA)
+    encuestas = Survey.objects.all()
+    existentes = BarberDailyStats.objects.all()
+    if desde:
+        inicio = rango_del_dia(desde)[0]
+        citas = citas.filter(fecha_hora__gte=inicio)
+        encuestas = encuestas.filter(appointment__fecha_hora__gte=inicio)
+        existentes = existentes.filter(fecha__gte=desde)
+
+    grupos = defaultdict(_valores_vacios)
+    for barbero_id, fecha_hora, comision, precio in citas.annotate(precio=PRECIO_CITA).values_list(
+        'barbero_id', 'fecha_hora', 'servicio__comision_barbero', 'precio'
+    ):
+        valores = grupos[(barbero_id, timezone.localtime(fecha_hora).date())]
+        valores['cortes'] += 1
+        valores['comision'] += comision or 0
+        valores['ingresos'] += precio or 0
+    for barbero_id, fecha_hora, calificacion in encuestas.values_list(
+        'appointment__barbero_id', 'appointment__fecha_hora', 'calificacion'
+    ):
+        valores = grupos[(barbero_id, timezone.localtime(fecha_hora).date())]
+        valores['suma_calificaciones'] += calificacion
+        valores['num_calificaciones'] += 1
+
+    filas = [
+        BarberDailyStats(barbero_id=barbero_id, fecha=fecha, **valores)
+        for (barbero_id, fecha), valores in grupos.items()
+    ]
+
+    with transaction.atomic():
+        existentes.delete()
+        BarberDailyStats.objects.bulk_create(filas, batch_size=500)
+    return len(filas)
+
+
+def resumen_por_barbero(hoy, barbero_ids=None):
+    """
+    Cortes, comisión e ingresos del día y del mes de `hoy` por barbero.
+
+    Devuelve {barbero_id: {...}} a partir de una sola consulta agrupada; los
+    barberos sin actividad en el mes no aparecen.
+    """
+    primer_dia, ultimo_dia = dias_del_mes(hoy)
+    filas = BarberDailyStats.objects.filter(fecha__range=(primer_dia, ultimo_dia))
+    if barbero_ids is not None:
+        filas = filas.filter(barbero_id__in=barbero_ids)
+
+    del_dia = Q(fecha=hoy)
+    filas = filas.values('barbero_id').annotate(
+        cortes_dia=Sum('cortes', filter=del_dia),
+        cortes_mes=Sum('cortes'),
+        comision_dia=Sum('comision', filter=del_dia),
+        comision_mes=Sum('comision'),
+        ingresos_dia=Sum('ingresos', filter=del_dia),
+        ingresos_mes=Sum('ingresos'),
+    ).order_by()
+
+    return {
+        fila.pop('barbero_id'): {campo: valor or 0 for campo, valor in fila.items()}
+        for fila in filas
+    }
+
+
+def totales_de_barbero(barbero_id, hoy):
+    """Cortes del mes, cortes totales y calificación promedio de un barbero en una sola consulta"""
+    primer_dia, ultimo_dia = dias_del_mes(hoy)
+    totales = BarberDailyStats.objects.filter(barbero_id=barbero_id).aggregate(
+        cortes_mes=Sum('cortes', filter=Q(fecha__range=(primer_dia, ultimo_dia))),
+        cortes_totales=Sum('cortes'),
+        suma_calificaciones=Sum('suma_calificaciones'),
+        num_calificaciones=Sum('num_calificaciones'),
+    )
+    num = totales['num_calificaciones'] or 0
+    return {
+        'cortes_mes': totales['cortes_mes'] or 0,
+        'cortes_totales': totales['cortes_totales'] or 0,
+        'calificacion_promedio': (totales['suma_calificaciones'] / num) if num else 0,
+    }
+
+
+def invalidar_estadisticas_generales():
+    cache.delete(CLAVE_CACHE_ESTADISTICAS_GENERALES)
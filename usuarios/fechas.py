@@ -0,0 +1,39 @@
+"""
+Rangos de fechas para consultas.
+
+Filtrar con `fecha_hora__date=...` obliga a PostgreSQL a convertir la zona
+horaria de cada fila, lo que impide usar el índice sobre `fecha_hora`. Estos
+helpers convierten días locales (TIME_ZONE, America/Mexico_City) en rangos
+conscientes de zona horaria [inicio, fin) que sí aprovechan el índice.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def _inicio_local(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min), timezone.get_default_timezone())
+
+
+def rango_de_dias(desde, hasta):
+    """Rango [inicio, fin) que cubre los días locales de `desde` a `hasta` (inclusive)"""
+    return _inicio_local(desde), _inicio_local(hasta + timedelta(days=1))
+
+
+def rango_del_dia(fecha):
+    """Rango [inicio, fin) de un día local"""
+    return rango_de_dias(fecha, fecha)
+
+
+def dias_del_mes(fecha):
+    """Primer y último día (fechas, inclusive) del mes que contiene `fecha`, para campos DateField"""
+    primer_dia = fecha.replace(day=1)
+    siguiente_mes = (primer_dia + timedelta(days=32)).replace(day=1)
+    return primer_dia, siguiente_mes - timedelta(days=1)
+
+
+def filtro_rango(rango, campo='fecha_hora'):
+    """Argumentos de filtro para un rango: queryset.filter(**filtro_rango(rango_del_dia(fecha)))"""
+    inicio, fin = rango
+    return {f'{campo}__gte': inicio, f'{campo}__lt': fin}
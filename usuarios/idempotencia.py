@@ -0,0 +1,130 @@
+"""
+Soporte de la cabecera Idempotency-Key para endpoints POST.
+
+La primera solicitud con una clave la reserva (fila única por clave, endpoint y
+usuario), ejecuta la vista y guarda su respuesta. Los reintentos con la misma
+clave reciben la respuesta guardada sin volver a ejecutar las escrituras. Una
+reserva que sigue en proceso tras IDEMPOTENCIA_EN_PROCESO_MAXIMO se da por
+abandonada (el proceso murió o agotó su tiempo) y el siguiente reintento la
+toma. Las claves expiran tras IDEMPOTENCIA_TTL y se eliminan de forma perezosa.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+CABECERA_IDEMPOTENCIA = 'Idempotency-Key'
+IDEMPOTENCIA_TTL = timedelta(hours=24)
+# Más que el timeout de los workers (gunicorn: 30 s por defecto)
+IDEMPOTENCIA_EN_PROCESO_MAXIMO = timedelta(seconds=60)
+LONGITUD_MAXIMA_CLAVE = 255
+
+
+def _huella(request):
+    """SHA-256 del cuerpo de la solicitud, para detectar claves reutilizadas con otros datos"""
+    cuerpo = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(cuerpo.encode('utf-8')).hexdigest()
+
+
+def _repetir(registro):
+    response = Response(registro.respuesta, status=registro.codigo_estado)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _de_esta_reserva(registro):
+    # fecha_creacion identifica la reserva: cambia si otro reintento la toma por abandonada
+    return IdempotencyKey.objects.filter(pk=registro.pk, fecha_creacion=registro.fecha_creacion)
+
+
+def _tomar_si_abandonada(registro, ahora):
+    """Reserva para esta solicitud una clave en proceso abandonada; sólo un reintento la obtiene"""
+    if registro.fecha_creacion > ahora - IDEMPOTENCIA_EN_PROCESO_MAXIMO:
+        return False
+    tomada = _de_esta_reserva(registro).filter(completada=False).update(
+        fecha_creacion=ahora,
+        expira=ahora + IDEMPOTENCIA_TTL
+    )
+    registro.fecha_creacion = ahora
+    return bool(tomada)
+
+
+def idempotente(vista):
+    """
+    Decorador para vistas de función de DRF (debajo de @api_view y @permission_classes).
+
+    Sin cabecera Idempotency-Key la vista se ejecuta con normalidad. Las respuestas
+    5xx y las excepciones liberan la clave para que el cliente pueda reintentar.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        clave = request.headers.get(CABECERA_IDEMPOTENCIA, '').strip()
+        if not clave:
+            return vista(request, *args, **kwargs)
+
+        if len(clave) > LONGITUD_MAXIMA_CLAVE:
+            return Response(
+                {'error': f'La cabecera {CABECERA_IDEMPOTENCIA} no puede superar {LONGITUD_MAXIMA_CLAVE} caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ahora = timezone.now()
+        usuario = request.user if request.user.is_authenticated else None
+        huella = _huella(request)
+
+        IdempotencyKey.objects.filter(expira__lte=ahora).delete()
+
+        try:
+            with transaction.atomic():
+                registro = IdempotencyKey.objects.create(
+                    clave=clave,
+                    endpoint=request.path,
+                    usuario=usuario,
+                    huella=huella,
+                    expira=ahora + IDEMPOTENCIA_TTL
+                )
+        except IntegrityError:
+            registro = IdempotencyKey.objects.filter(clave=clave, endpoint=request.path, usuario=usuario).first()
+            en_proceso = Response(
+                {'error': 'Una solicitud con esta clave de idempotencia sigue en proceso'},
+                status=status.HTTP_409_CONFLICT
+            )
+            if registro is None:
+                # La reserva que causó el conflicto ya se liberó; el cliente puede reintentar
+                return en_proceso
+            if registro.huella != huella:
+                return Response(
+                    {'error': 'La clave de idempotencia ya se usó con una solicitud distinta'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if registro.completada:
+                return _repetir(registro)
+            if not _tomar_si_abandonada(registro, ahora):
+                return en_proceso
+
+        try:
+            response = vista(request, *args, **kwargs)
+        except Exception:
+            _de_esta_reserva(registro).delete()
+            raise
+
+        if response.status_code >= 500:
+            _de_esta_reserva(registro).delete()
+            return response
+
+        _de_esta_reserva(registro).update(
+            completada=True,
+            codigo_estado=response.status_code,
+            respuesta=response.data
+        )
+        return response
+
+    return envoltura
@@ -0,0 +1,178 @@
+"""
+Variantes redimensionadas de las imágenes subidas (servicios, productos,
+paquetes, contenido del sitio y galería).
+
+Al guardar una imagen nueva se programa, después del commit y en un hilo de
+fondo, la generación de VARIANTES en WebP y JPEG bajo `variantes/`. El
+resultado se guarda en `imagen_variantes`:
+
+    {'card': {'ancho': 800, 'webp': 'variantes/productos/foto-card.webp',
+              'jpeg': 'variantes/productos/foto-card.jpg'}, ...}
+
+y los serializadores lo exponen como srcset (SrcsetField). Nunca se amplía una
+imagen: si el original es más angosto, la variante conserva su ancho. Las
+imágenes ya subidas se procesan con `python manage.py generar_variantes_imagenes`.
+"""
+
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_init, post_save
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import GalleryImage, Package, Product, Service, WebsiteContent
+from .versiones import renovar_version
+
+logger = logging.getLogger(__name__)
+
+MODELOS_CON_VARIANTES = (Service, Product, Package, WebsiteContent, GalleryImage)
+
+# Nombre -> ancho máximo en píxeles
+VARIANTES = {
+    'thumbnail': 320,
+    'card': 800,
+    'full': 1600,
+}
+
+# Formato -> (extensión, opciones de Image.save)
+FORMATOS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DIRECTORIO_VARIANTES = 'variantes'
+
+_lock = threading.Lock()
+_ejecutor = None
+
+
+def _ejecutor_de_fondo():
+    global _ejecutor
+    with _lock:
+        if _ejecutor is None:
+            # Un solo hilo: redimensionar usa CPU y memoria, no debe competir con las solicitudes
+            _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='variantes-imagen')
+    return _ejecutor
+
+
+def _abrir(archivo):
+    imagen = Image.open(archivo)
+    # Decodificar JPEG a menor resolución cuando el original es mucho más grande
+    imagen.draft('RGB', (max(VARIANTES.values()),) * 2)
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode != 'RGB':
+        fondo = Image.new('RGB', imagen.size, 'white')
+        fondo.paste(imagen, mask=imagen.convert('RGBA').getchannel('A'))
+        imagen = fondo
+    return imagen
+
+
+def _crear_variantes(nombre):
+    """Genera y guarda las variantes del archivo `nombre`; devuelve el diccionario para imagen_variantes"""
+    with default_storage.open(nombre, 'rb') as archivo:
+        original = _abrir(archivo)
+
+    directorio, base = posixpath.split(nombre)
+    raiz = posixpath.splitext(base)[0]
+    variantes = {}
+    for variante, ancho_maximo in VARIANTES.items():
+        imagen = original
+        if original.width > ancho_maximo:
+            alto = round(original.height * ancho_maximo / original.width)
+            imagen = original.resize((ancho_maximo, alto), Image.LANCZOS)
+
+        variantes[variante] = {'ancho': imagen.width}
+        for formato, (extension, opciones) in FORMATOS.items():
+            contenido = io.BytesIO()
+            imagen.save(contenido, **opciones)
+            ruta = posixpath.join(DIRECTORIO_VARIANTES, directorio, f'{raiz}-{variante}.{extension}')
+            variantes[variante][formato] = default_storage.save(ruta, ContentFile(contenido.getvalue()))
+    return variantes
+
+
+def _archivos(variantes):
+    return {
+        ruta
+        for datos in (variantes or {}).values()
+        for formato, ruta in datos.items()
+        if formato in FORMATOS
+    }
+
+
+def generar_variantes(modelo, pk):
+    """
+    Regenera las variantes de la imagen actual de la fila y borra las anteriores.
+
+    Si mientras tanto la imagen cambió, descarta el resultado (otra tarea se
+    encarga de la nueva). Devuelve el diccionario guardado o None.
+    """
+    fila = modelo.objects.filter(pk=pk).values('imagen', 'imagen_variantes').first()
+    if fila is None:
+        return None
+
+    nombre = fila['imagen'] or ''
+    variantes = {}
+    if nombre:
+        try:
+            variantes = _crear_variantes(nombre)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.exception('No se pudieron generar las variantes de %s', nombre)
+            return None
+
+    actualizadas = modelo.objects.filter(pk=pk, imagen=fila['imagen']).update(
+        imagen_variantes=variantes,
+        fecha_actualizacion=timezone.now(),
+    )
+    if not actualizadas:
+        obsoletas = _archivos(variantes)
+    else:
+        obsoletas = _archivos(fila['imagen_variantes']) - _archivos(variantes)
+        # update() no emite señales: se invalidan a mano los listados y el paquete del sitio
+        renovar_version(modelo)
+    for ruta in obsoletas:
+        default_storage.delete(ruta)
+    return variantes if actualizadas else None
+
+
+def _generar_en_segundo_plano(modelo, pk):
+    close_old_connections()
+    try:
+        generar_variantes(modelo, pk)
+    except Exception:
+        logger.exception('Error al generar variantes de %s %s', modelo._meta.label, pk)
+    finally:
+        close_old_connections()
+
+
+def programar_variantes(modelo, pk):
+    """Genera las variantes fuera de la solicitud, al confirmar la transacción"""
+    transaction.on_commit(lambda: _ejecutor_de_fondo().submit(_generar_en_segundo_plano, modelo, pk))
+
+
+def _nombre_imagen(instance):
+    return instance.__dict__.get('imagen') and instance.imagen.name or ''
+
+
+def registrar_modelo_con_variantes(modelo):
+    """Conecta las señales que programan las variantes cuando cambia `imagen`"""
+    def recordar_imagen(sender, instance, **kwargs):
+        instance._imagen_original = _nombre_imagen(instance)
+
+    def programar(sender, instance, **kwargs):
+        if kwargs.get('raw') or 'imagen' not in instance.__dict__:
+            return
+        nombre = _nombre_imagen(instance)
+        if nombre != instance._imagen_original or (nombre and not instance.__dict__.get('imagen_variantes')):
+            programar_variantes(modelo, instance.pk)
+        instance._imagen_original = nombre
+
+    uid = f'variantes_{modelo._meta.label_lower}'
+    post_init.connect(recordar_imagen, sender=modelo, weak=False, dispatch_uid=f'{uid}_iniciar')
+    post_save.connect(programar, sender=modelo, weak=False, dispatch_uid=f'{uid}_guardar')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from usuarios.imagenes import MODELOS_CON_VARIANTES, generar_variantes
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes WebP/JPEG de las imágenes ya subidas (servicios, productos, paquetes, contenido y galería)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Regenerar también las imágenes que ya tienen variantes',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for modelo in MODELOS_CON_VARIANTES:
+            filas = modelo.objects.exclude(imagen='').exclude(imagen__isnull=True)
+            if not options['todas']:
+                filas = filas.filter(imagen_variantes={})
+            for pk in filas.values_list('pk', flat=True).iterator():
+                if generar_variantes(modelo, pk) is not None:
+                    total += 1
+        self.stdout.write(self.style.SUCCESS(f'Variantes generadas: {total} imágenes'))
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios.estadisticas import reconstruir_estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el resumen diario de estadísticas de los barberos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Reconstruir sólo a partir de esta fecha (YYYY-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = datetime.strptime(options['desde'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido, usa YYYY-MM-DD')
+
+        total = reconstruir_estadisticas(desde)
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas reconstruidas: {total} días de barbero'))
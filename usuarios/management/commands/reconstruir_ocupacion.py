@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios.disponibilidad import reconstruir_ocupacion
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero la ocupación diaria materializada de los barberos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Reconstruir sólo a partir de esta fecha (YYYY-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = datetime.strptime(options['desde'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido, usa YYYY-MM-DD')
+
+        total = reconstruir_ocupacion(desde)
+        self.stdout.write(self.style.SUCCESS(f'Ocupación reconstruida: {total} días de barbero'))
@@ -0,0 +1,73 @@
+# Generated manually
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fusionar_intervalos(intervalos):
+    # Copia congelada de usuarios.disponibilidad.fusionar_intervalos: la migración no debe cambiar con la app
+    fusionados = []
+    for inicio, fin in sorted(intervalos):
+        if fusionados and inicio <= fusionados[-1][1]:
+            if fin > fusionados[-1][1]:
+                fusionados[-1][1] = fin
+        else:
+            fusionados.append([inicio, fin])
+    return fusionados
+
+
+def poblar_ocupacion(apps, schema_editor):
+    from collections import defaultdict
+
+    from django.utils import timezone
+
+    Appointment = apps.get_model('usuarios', 'Appointment')
+    BarberDayOccupancy = apps.get_model('usuarios', 'BarberDayOccupancy')
+
+    grupos = defaultdict(list)
+    citas = Appointment.objects.filter(
+        estado__in=['pendiente', 'agendada', 'confirmada', 'en_progreso']
+    ).values_list('barbero_id', 'fecha_hora', 'servicio__duracion')
+    for barbero_id, fecha_hora, duracion in citas:
+        local = timezone.localtime(fecha_hora)
+        inicio = local.hour * 60 + local.minute
+        grupos[(barbero_id, local.date())].append((inicio, inicio + (duracion or 60)))
+
+    BarberDayOccupancy.objects.bulk_create(
+        [
+            BarberDayOccupancy(
+                barbero_id=barbero_id,
+                fecha=fecha,
+                intervalos=fusionar_intervalos(intervalos)
+            )
+            for (barbero_id, fecha), intervalos in grupos.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0018_add_package_to_appointment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BarberDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha (hora local)')),
+                ('intervalos', models.JSONField(default=list, verbose_name='Intervalos ocupados [[inicio, fin], ...] en minutos desde la medianoche')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+                ('barbero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacion_diaria', to='usuarios.barberprofile', verbose_name='Barbero')),
+            ],
+            options={
+                'verbose_name': 'Ocupación diaria de barbero',
+                'verbose_name_plural': 'Ocupación diaria de barberos',
+                'ordering': ['fecha'],
+                'unique_together': {('barbero', 'fecha')},
+            },
+        ),
+        migrations.RunPython(poblar_ocupacion, migrations.RunPython.noop),
+    ]
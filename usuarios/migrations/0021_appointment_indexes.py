@@ -0,0 +1,25 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0019_barberdayoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['barbero', 'fecha_hora', 'estado'], name='cita_barbero_fecha_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['cliente', 'estado', 'encuesta_completada'], name='cita_cliente_encuesta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['survey_token'], name='cita_survey_token_idx'),
+        ),
+    ]
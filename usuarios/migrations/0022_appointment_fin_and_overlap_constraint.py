@@ -0,0 +1,132 @@
+# Generated manually
+
+from datetime import timedelta
+
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+ESTADOS_ACTIVOS = ('pendiente', 'agendada', 'confirmada', 'en_progreso')
+
+
+def calcular_fin(apps, schema_editor):
+    Appointment = apps.get_model('usuarios', 'Appointment')
+
+    citas = Appointment.objects.select_related('servicio').prefetch_related('paquete__servicios')
+    pendientes = []
+    for cita in citas.iterator(chunk_size=500):
+        duracion = cita.duracion
+        if not duracion and cita.servicio_id:
+            duracion = cita.servicio.duracion
+        if not duracion and cita.paquete_id:
+            duracion = sum(servicio.duracion for servicio in cita.paquete.servicios.all())
+        cita.fecha_hora_fin = cita.fecha_hora + timedelta(minutes=duracion or 60)
+        pendientes.append(cita)
+        if len(pendientes) >= 500:
+            Appointment.objects.bulk_update(pendientes, ['fecha_hora_fin'])
+            pendientes = []
+    if pendientes:
+        Appointment.objects.bulk_update(pendientes, ['fecha_hora_fin'])
+
+
+def reconstruir_ocupacion(apps, schema_editor):
+    """
+    Vuelve a materializar la ocupación a partir de fecha_hora_fin.
+
+    0019 la calculó con la duración del servicio o 60 minutos, así que las
+    citas de paquete quedaron con intervalos distintos de su hora de fin.
+    """
+    from collections import defaultdict
+
+    from django.utils import timezone
+
+    Appointment = apps.get_model('usuarios', 'Appointment')
+    BarberDayOccupancy = apps.get_model('usuarios', 'BarberDayOccupancy')
+
+    grupos = defaultdict(list)
+    citas = Appointment.objects.filter(estado__in=ESTADOS_ACTIVOS).values_list('barbero_id', 'fecha_hora', 'fecha_hora_fin')
+    for barbero_id, fecha_hora, fecha_hora_fin in citas:
+        local = timezone.localtime(fecha_hora)
+        inicio = local.hour * 60 + local.minute
+        duracion = int((fecha_hora_fin - fecha_hora).total_seconds() // 60)
+        grupos[(barbero_id, local.date())].append((inicio, inicio + duracion))
+
+    filas = []
+    for (barbero_id, fecha), intervalos in grupos.items():
+        fusionados = []
+        for inicio, fin in sorted(intervalos):
+            if fusionados and inicio <= fusionados[-1][1]:
+                fusionados[-1][1] = max(fusionados[-1][1], fin)
+            else:
+                fusionados.append([inicio, fin])
+        filas.append(BarberDayOccupancy(barbero_id=barbero_id, fecha=fecha, intervalos=fusionados))
+
+    BarberDayOccupancy.objects.all().delete()
+    BarberDayOccupancy.objects.bulk_create(filas, batch_size=500)
+
+
+def crear_restriccion(apps, schema_editor):
+    """Restricción de exclusión sólo en PostgreSQL (SQLite de desarrollo no la soporta)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT a.id, b.id
+            FROM usuarios_appointment a
+            JOIN usuarios_appointment b
+              ON a.barbero_id = b.barbero_id
+             AND a.id < b.id
+             AND tstzrange(a.fecha_hora, a.fecha_hora_fin, '[)') && tstzrange(b.fecha_hora, b.fecha_hora_fin, '[)')
+            WHERE a.estado IN %s AND b.estado IN %s
+            """,
+            [ESTADOS_ACTIVOS, ESTADOS_ACTIVOS]
+        )
+        conflictos = cursor.fetchall()
+    if conflictos:
+        raise RuntimeError(
+            'Existen citas activas solapadas del mismo barbero; cancela o reprograma una de cada par '
+            f'y vuelve a ejecutar migrate. Pares (id, id): {conflictos[:50]}'
+        )
+
+    schema_editor.execute(
+        """
+        ALTER TABLE usuarios_appointment
+        ADD CONSTRAINT cita_sin_solapamiento
+        EXCLUDE USING gist (
+            barbero_id WITH =,
+            tstzrange(fecha_hora, fecha_hora_fin, '[)') WITH &&
+        )
+        WHERE (estado IN ('pendiente', 'agendada', 'confirmada', 'en_progreso') AND fecha_hora_fin IS NOT NULL)
+        """
+    )
+
+
+def eliminar_restriccion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE usuarios_appointment DROP CONSTRAINT IF EXISTS cita_sin_solapamiento')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0021_appointment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='duracion',
+            field=models.PositiveIntegerField(blank=True, help_text='Si se omite se usa la del servicio o la de los servicios del paquete', null=True, verbose_name='Duración (minutos)'),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='fecha_hora_fin',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fecha y hora de fin de la cita'),
+        ),
+        migrations.RunPython(calcular_fin, migrations.RunPython.noop),
+        migrations.RunPython(reconstruir_ocupacion, migrations.RunPython.noop),
+        BtreeGistExtension(),
+        migrations.RunPython(crear_restriccion, eliminar_restriccion),
+    ]
@@ -0,0 +1,41 @@
+# Generated manually
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('usuarios', '0022_appointment_fin_and_overlap_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=255, verbose_name='Clave de idempotencia')),
+                ('endpoint', models.CharField(max_length=200, verbose_name='Endpoint')),
+                ('huella', models.CharField(max_length=64, verbose_name='Huella de la solicitud (SHA-256 del cuerpo)')),
+                ('completada', models.BooleanField(default=False, verbose_name='¿La solicitud original terminó?')),
+                ('codigo_estado', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Código de estado HTTP')),
+                ('respuesta', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Cuerpo de la respuesta')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('expira', models.DateTimeField(db_index=True, verbose_name='Fecha de expiración')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='claves_idempotencia', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Clave de idempotencia',
+                'verbose_name_plural': 'Claves de idempotencia',
+                'ordering': ['-fecha_creacion'],
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('usuario__isnull', False)), fields=('clave', 'endpoint', 'usuario'), name='idempotencia_clave_usuario_uniq'),
+                    models.UniqueConstraint(condition=models.Q(('usuario__isnull', True)), fields=('clave', 'endpoint'), name='idempotencia_clave_anonima_uniq'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated manually
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import usuarios.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('usuarios', '0023_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=usuarios.models.generar_token_reserva, editable=False, max_length=64, unique=True, verbose_name='Token de la reserva')),
+                ('fecha_hora', models.DateTimeField(verbose_name='Inicio del horario reservado')),
+                ('fecha_hora_fin', models.DateTimeField(verbose_name='Fin del horario reservado')),
+                ('expira', models.DateTimeField(db_index=True, verbose_name='Fecha de expiración')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('barbero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_temporales', to='usuarios.barberprofile', verbose_name='Barbero')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_temporales', to=settings.AUTH_USER_MODEL, verbose_name='Usuario que reserva')),
+            ],
+            options={
+                'verbose_name': 'Reserva temporal de horario',
+                'verbose_name_plural': 'Reservas temporales de horarios',
+                'ordering': ['expira'],
+                'indexes': [models.Index(fields=['barbero', 'fecha_hora'], name='reserva_barbero_fecha_idx')],
+            },
+        ),
+    ]
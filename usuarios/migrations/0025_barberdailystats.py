@@ -0,0 +1,81 @@
+# Generated manually
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def poblar_estadisticas(apps, schema_editor):
+    from collections import defaultdict
+    from decimal import Decimal
+
+    from django.utils import timezone
+
+    Appointment = apps.get_model('usuarios', 'Appointment')
+    Survey = apps.get_model('usuarios', 'Survey')
+    BarberDailyStats = apps.get_model('usuarios', 'BarberDailyStats')
+
+    def vacios():
+        return {
+            'cortes': 0,
+            'comision': Decimal('0'),
+            'ingresos': Decimal('0'),
+            'suma_calificaciones': 0,
+            'num_calificaciones': 0,
+        }
+
+    grupos = defaultdict(vacios)
+    citas = Appointment.objects.filter(estado='completada').values_list(
+        'barbero_id', 'fecha_hora', 'servicio__comision_barbero', 'servicio__precio', 'paquete__precio'
+    )
+    for barbero_id, fecha_hora, comision, precio_servicio, precio_paquete in citas:
+        # Lo cobrado: el precio del servicio o, si se reservó un paquete, el del paquete
+        precio = precio_servicio if precio_servicio is not None else precio_paquete
+        valores = grupos[(barbero_id, timezone.localtime(fecha_hora).date())]
+        valores['cortes'] += 1
+        valores['comision'] += comision or 0
+        valores['ingresos'] += precio or 0
+
+    encuestas = Survey.objects.values_list('appointment__barbero_id', 'appointment__fecha_hora', 'calificacion')
+    for barbero_id, fecha_hora, calificacion in encuestas:
+        valores = grupos[(barbero_id, timezone.localtime(fecha_hora).date())]
+        valores['suma_calificaciones'] += calificacion
+        valores['num_calificaciones'] += 1
+
+    BarberDailyStats.objects.bulk_create(
+        [
+            BarberDailyStats(barbero_id=barbero_id, fecha=fecha, **valores)
+            for (barbero_id, fecha), valores in grupos.items()
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0024_slothold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BarberDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha (hora local)')),
+                ('cortes', models.PositiveIntegerField(default=0, verbose_name='Citas completadas')),
+                ('comision', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Comisión del barbero')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Ingresos por servicios')),
+                ('suma_calificaciones', models.PositiveIntegerField(default=0, verbose_name='Suma de calificaciones')),
+                ('num_calificaciones', models.PositiveIntegerField(default=0, verbose_name='Número de calificaciones')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última actualización')),
+                ('barbero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas_diarias', to='usuarios.barberprofile', verbose_name='Barbero')),
+            ],
+            options={
+                'verbose_name': 'Estadística diaria de barbero',
+                'verbose_name_plural': 'Estadísticas diarias de barberos',
+                'ordering': ['fecha'],
+                'unique_together': {('barbero', 'fecha')},
+            },
+        ),
+        migrations.RunPython(poblar_estadisticas, migrations.RunPython.noop),
+    ]
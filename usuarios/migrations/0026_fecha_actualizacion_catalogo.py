@@ -0,0 +1,40 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copiar_fecha_creacion(apps, schema_editor):
+    """Los registros existentes se consideran sin cambios desde su creación"""
+    for nombre in ('GalleryImage', 'Testimonial'):
+        apps.get_model('usuarios', nombre).objects.update(fecha_actualizacion=F('fecha_creacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0025_barberdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última actualización'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última actualización'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_column='fecha_actualizacion', default=django.utils.timezone.now, verbose_name='Última actualización'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copiar_fecha_creacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0026_fecha_actualizacion_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['fecha_hora', 'id'], name='cita_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='encuesta_fecha_id_idx'),
+        ),
+    ]
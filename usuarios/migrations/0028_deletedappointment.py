@@ -0,0 +1,32 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0027_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedAppointment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cita_id', models.BigIntegerField(verbose_name='ID de la cita')),
+                ('barbero_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID del barbero')),
+                ('cliente_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID del cliente')),
+                ('fecha_eliminacion', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha de eliminación')),
+            ],
+            options={
+                'verbose_name': 'Cita eliminada',
+                'verbose_name_plural': 'Citas eliminadas',
+                'ordering': ['fecha_eliminacion'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='cita_actualizacion_id_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0028_deletedappointment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes redimensionadas de la imagen'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes redimensionadas de la imagen'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes redimensionadas de la imagen'),
+        ),
+        migrations.AddField(
+            model_name='websitecontent',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes redimensionadas de la imagen'),
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes redimensionadas de la imagen'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 import uuid
+from datetime import timedelta
 
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 class CustomUser(AbstractUser):
@@ -218,6 +220,18 @@ class Service(models.Model):
         verbose_name='Imagen del servicio'
     )
 
+    imagen_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Variantes redimensionadas de la imagen'
+    )
+
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última actualización'
+    )
+
     def __str__(self):
         return self.nombre
 
@@ -252,6 +266,13 @@ class Product(models.Model):
         verbose_name='Imagen del producto'
     )
 
+    imagen_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Variantes redimensionadas de la imagen'
+    )
+
     stock = models.PositiveIntegerField(
         default=0,
         verbose_name='Existencias disponibles'
@@ -325,6 +346,13 @@ class Package(models.Model):
         verbose_name='Imagen del paquete'
     )
 
+    imagen_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Variantes redimensionadas de la imagen'
+    )
+
     activo = models.BooleanField(
         default=True,
         verbose_name='¿Está activo?'
@@ -349,6 +377,17 @@ class Package(models.Model):
         ordering = ['-fecha_creacion']
 
 
+# Estados de cita que ocupan el horario del barbero ('pendiente' se conserva por datos antiguos)
+ESTADOS_CITA_ACTIVOS = ['pendiente', 'agendada', 'confirmada', 'en_progreso']
+
+# Duración usada cuando una cita no tiene duración, servicio ni paquete con servicios
+DURACION_CITA_POR_DEFECTO = 60
+
+# Restricción de exclusión (sólo PostgreSQL, ver migración 0022) que impide
+# citas activas solapadas del mismo barbero
+RESTRICCION_SOLAPAMIENTO_CITAS = 'cita_sin_solapamiento'
+
+
 class Appointment(models.Model):
     """Modelo para citas"""
     STATUS_CHOICES = [
@@ -360,6 +399,8 @@ class Appointment(models.Model):
         ('no_show', 'No se presentó'),
     ]
 
+    ESTADOS_ACTIVOS = ESTADOS_CITA_ACTIVOS
+
     cliente = models.ForeignKey(
         ClientProfile,
         on_delete=models.CASCADE,
@@ -398,6 +439,20 @@ class Appointment(models.Model):
         verbose_name='Fecha y hora de la cita'
     )
 
+    duracion = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text='Si se omite se usa la del servicio o la de los servicios del paquete',
+        verbose_name='Duración (minutos)'
+    )
+
+    fecha_hora_fin = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Fecha y hora de fin de la cita'
+    )
+
     estado = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -480,16 +535,236 @@ class Appointment(models.Model):
 
         return f"Cita de {cliente_nombre} con {self.barbero.user.username} - {self.fecha_hora}"
 
+    def calcular_duracion(self):
+        """Duración explícita, o la del servicio, o la suma de los servicios del paquete"""
+        if self.duracion:
+            return self.duracion
+        if self.servicio_id:
+            return self.servicio.duracion
+        if self.paquete_id:
+            total = sum(servicio.duracion for servicio in self.paquete.servicios.all())
+            if total:
+                return total
+        return DURACION_CITA_POR_DEFECTO
+
     def save(self, *args, **kwargs):
         if not self.survey_token:
             import uuid
             self.survey_token = uuid.uuid4().hex
+
+        # Mantener la hora de fin almacenada (la usa la restricción de solapamiento)
+        update_fields = kwargs.get('update_fields')
+        campos_duracion = {'fecha_hora', 'duracion', 'servicio', 'servicio_id', 'paquete', 'paquete_id'}
+        if update_fields is None or campos_duracion.intersection(update_fields):
+            self.fecha_hora_fin = self.fecha_hora + timedelta(minutes=self.calcular_duracion())
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'fecha_hora_fin'}
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = 'Cita'
         verbose_name_plural = 'Citas'
         ordering = ['fecha_hora']
+        indexes = [
+            # Disponibilidad y agenda por barbero
+            models.Index(fields=['barbero', 'fecha_hora', 'estado'], name='cita_barbero_fecha_estado_idx'),
+            # Bloqueo por encuestas pendientes al agendar
+            models.Index(fields=['cliente', 'estado', 'encuesta_completada'], name='cita_cliente_encuesta_idx'),
+            # Endpoints públicos de encuesta
+            models.Index(fields=['survey_token'], name='cita_survey_token_idx'),
+            # Paginación por cursor del listado de citas y rangos de fechas de todos los barberos
+            models.Index(fields=['fecha_hora', 'id'], name='cita_fecha_id_idx'),
+            # Sincronización incremental (citas/cambios/)
+            models.Index(fields=['fecha_actualizacion', 'id'], name='cita_actualizacion_id_idx'),
+        ]
+
+
+class DeletedAppointment(models.Model):
+    """
+    Registro de una cita borrada, o que pasó a otro barbero o cliente, para
+    que la sincronización incremental (citas/cambios/) pueda avisar a los
+    clientes que la tenían en pantalla.
+
+    Guarda los ids sin llaves foráneas: la cita, y a veces su barbero o
+    cliente, ya no existen.
+    """
+    cita_id = models.BigIntegerField(
+        verbose_name='ID de la cita'
+    )
+
+    barbero_id = models.BigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='ID del barbero'
+    )
+
+    cliente_id = models.BigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='ID del cliente'
+    )
+
+    fecha_eliminacion = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Fecha de eliminación'
+    )
+
+    def __str__(self):
+        return f"Cita {self.cita_id} eliminada el {self.fecha_eliminacion}"
+
+    class Meta:
+        verbose_name = 'Cita eliminada'
+        verbose_name_plural = 'Citas eliminadas'
+        ordering = ['fecha_eliminacion']
+
+
+class BarberDayOccupancy(models.Model):
+    """Ocupación materializada de un barbero en un día (intervalos de citas activas)"""
+    barbero = models.ForeignKey(
+        BarberProfile,
+        on_delete=models.CASCADE,
+        related_name='ocupacion_diaria',
+        verbose_name='Barbero'
+    )
+
+    fecha = models.DateField(
+        verbose_name='Fecha (hora local)'
+    )
+
+    intervalos = models.JSONField(
+        default=list,
+        verbose_name='Intervalos ocupados [[inicio, fin], ...] en minutos desde la medianoche'
+    )
+
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última actualización'
+    )
+
+    def __str__(self):
+        return f"Ocupación de {self.barbero_id} el {self.fecha}: {len(self.intervalos)} intervalos"
+
+    class Meta:
+        verbose_name = 'Ocupación diaria de barbero'
+        verbose_name_plural = 'Ocupación diaria de barberos'
+        unique_together = ('barbero', 'fecha')
+        ordering = ['fecha']
+
+
+def generar_token_reserva():
+    return str(uuid.uuid4())
+
+
+class SlotHold(models.Model):
+    """Reserva temporal de un horario mientras el cliente completa el agendado"""
+    token = models.CharField(
+        max_length=64,
+        unique=True,
+        default=generar_token_reserva,
+        editable=False,
+        verbose_name='Token de la reserva'
+    )
+
+    barbero = models.ForeignKey(
+        BarberProfile,
+        on_delete=models.CASCADE,
+        related_name='reservas_temporales',
+        verbose_name='Barbero'
+    )
+
+    usuario = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='reservas_temporales',
+        verbose_name='Usuario que reserva'
+    )
+
+    fecha_hora = models.DateTimeField(
+        verbose_name='Inicio del horario reservado'
+    )
+
+    fecha_hora_fin = models.DateTimeField(
+        verbose_name='Fin del horario reservado'
+    )
+
+    expira = models.DateTimeField(
+        db_index=True,
+        verbose_name='Fecha de expiración'
+    )
+
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+
+    def __str__(self):
+        return f"Reserva de {self.barbero_id} a las {self.fecha_hora} (expira {self.expira})"
+
+    class Meta:
+        verbose_name = 'Reserva temporal de horario'
+        verbose_name_plural = 'Reservas temporales de horarios'
+        ordering = ['expira']
+        indexes = [
+            models.Index(fields=['barbero', 'fecha_hora'], name='reserva_barbero_fecha_idx'),
+        ]
+
+
+class BarberDailyStats(models.Model):
+    """Resumen diario por barbero: cortes completados, comisión, ingresos y calificaciones"""
+    barbero = models.ForeignKey(
+        BarberProfile,
+        on_delete=models.CASCADE,
+        related_name='estadisticas_diarias',
+        verbose_name='Barbero'
+    )
+
+    fecha = models.DateField(
+        verbose_name='Fecha (hora local)'
+    )
+
+    cortes = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Citas completadas'
+    )
+
+    comision = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name='Comisión del barbero'
+    )
+
+    ingresos = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name='Ingresos por servicios'
+    )
+
+    suma_calificaciones = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Suma de calificaciones'
+    )
+
+    num_calificaciones = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Número de calificaciones'
+    )
+
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última actualización'
+    )
+
+    def __str__(self):
+        return f"Estadísticas de {self.barbero_id} el {self.fecha}: {self.cortes} cortes"
+
+    class Meta:
+        verbose_name = 'Estadística diaria de barbero'
+        verbose_name_plural = 'Estadísticas diarias de barberos'
+        unique_together = ('barbero', 'fecha')
+        ordering = ['fecha']
 
 
 class AppointmentProduct(models.Model):
@@ -586,6 +861,10 @@ class Survey(models.Model):
         verbose_name = 'Encuesta'
         verbose_name_plural = 'Encuestas'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Paginación por cursor del listado de encuestas
+            models.Index(fields=['fecha_creacion', 'id'], name='encuesta_fecha_id_idx'),
+        ]
 
 
 class WebsiteContent(models.Model):
@@ -695,6 +974,13 @@ class WebsiteContent(models.Model):
         verbose_name='Imagen relacionada'
     )
 
+    imagen_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Variantes redimensionadas de la imagen'
+    )
+
     activo = models.BooleanField(
         default=True,
         verbose_name='¿Está activo?'
@@ -773,6 +1059,12 @@ class Testimonial(models.Model):
         db_column='fecha_creacion'
     )
 
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última actualización',
+        db_column='fecha_actualizacion'
+    )
+
     appointment = models.OneToOneField(
         Appointment,
         on_delete=models.SET_NULL,
@@ -813,6 +1105,13 @@ class GalleryImage(models.Model):
         verbose_name='Imagen'
     )
 
+    imagen_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Variantes redimensionadas de la imagen'
+    )
+
     video_url = models.URLField(
         blank=True,
         null=True,
@@ -842,6 +1141,11 @@ class GalleryImage(models.Model):
         verbose_name='Fecha de creación'
     )
 
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Última actualización'
+    )
+
     def __str__(self):
         return self.titulo
 
@@ -1083,3 +1387,80 @@ class AppointmentAlert(models.Model):
         verbose_name = 'Alerta de cita'
         verbose_name_plural = 'Alertas de citas'
         ordering = ['-fecha_creacion']
+
+
+class IdempotencyKey(models.Model):
+    """Respuesta registrada para una clave Idempotency-Key de un endpoint POST"""
+    clave = models.CharField(
+        max_length=255,
+        verbose_name='Clave de idempotencia'
+    )
+
+    endpoint = models.CharField(
+        max_length=200,
+        verbose_name='Endpoint'
+    )
+
+    usuario = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='claves_idempotencia',
+        verbose_name='Usuario'
+    )
+
+    huella = models.CharField(
+        max_length=64,
+        verbose_name='Huella de la solicitud (SHA-256 del cuerpo)'
+    )
+
+    completada = models.BooleanField(
+        default=False,
+        verbose_name='¿La solicitud original terminó?'
+    )
+
+    codigo_estado = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Código de estado HTTP'
+    )
+
+    respuesta = models.JSONField(
+        blank=True,
+        null=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Cuerpo de la respuesta'
+    )
+
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+
+    expira = models.DateTimeField(
+        db_index=True,
+        verbose_name='Fecha de expiración'
+    )
+
+    def __str__(self):
+        return f"{self.endpoint} - {self.clave}"
+
+    class Meta:
+        verbose_name = 'Clave de idempotencia'
+        verbose_name_plural = 'Claves de idempotencia'
+        ordering = ['-fecha_creacion']
+        # Cada usuario tiene su propio espacio de claves; las anónimas comparten uno
+        # (NULL no cuenta como repetido en un índice único, por eso dos restricciones)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave', 'endpoint', 'usuario'],
+                condition=models.Q(usuario__isnull=False),
+                name='idempotencia_clave_usuario_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['clave', 'endpoint'],
+                condition=models.Q(usuario__isnull=True),
+                name='idempotencia_clave_anonima_uniq',
+            ),
+        ]
@@ -0,0 +1,110 @@
+"""
+Paginación por clave (keyset) para listados que crecen con el historial.
+
+En lugar de COUNT(*) y OFFSET, cada página filtra a partir de la última fila
+vista según (campo, id), así que una página profunda cuesta lo mismo que la
+primera. El cursor es opaco para el cliente: basta seguir los enlaces `next` y
+`previous`. Con `?page=N` se conserva la paginación numerada con `count` para
+las vistas de administración que necesitan el total.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PaginacionPorCursor(BasePagination):
+    """
+    Paginación por cursor sobre `orden` = (campo, 'id'), ambos ascendentes o
+    ambos descendentes ('-campo', '-id'). El campo no debe admitir nulos.
+    """
+    orden = ('id',)
+    page_size = 20
+    parametro_cursor = 'cursor'
+    parametro_paginas = PageNumberPagination.page_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.paginas = None
+        if self.parametro_paginas in request.query_params:
+            self.paginas = PageNumberPagination()
+            return self.paginas.paginate_queryset(queryset, request, view)
+
+        campo = self.orden[0].lstrip('-')
+        descendente = self.orden[0].startswith('-')
+        cursor = self._leer_cursor(queryset.model, campo)
+        hacia_atras = bool(cursor and cursor['atras'])
+
+        orden = self.orden
+        if hacia_atras:
+            orden = [c[1:] if c.startswith('-') else f'-{c}' for c in orden]
+        queryset = queryset.order_by(*orden)
+
+        if cursor:
+            op = 'lt' if descendente != hacia_atras else 'gt'
+            # El primer término permite recorrer el índice (campo, id) como rango
+            queryset = queryset.filter(
+                Q(**{f'{campo}__{op}e': cursor['valor']}),
+                Q(**{f'{campo}__{op}': cursor['valor']}) | Q(**{f'pk__{op}': cursor['id']}),
+            )
+
+        filas = list(queryset[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if hacia_atras:
+            filas.reverse()
+
+        self.siguiente = self.anterior = None
+        if filas:
+            if hacia_atras or hay_mas:
+                self.siguiente = self._enlace(filas[-1], campo, atras=False)
+            if (hay_mas if hacia_atras else cursor):
+                self.anterior = self._enlace(filas[0], campo, atras=True)
+        return filas
+
+    def get_paginated_response(self, data):
+        if self.paginas is not None:
+            return self.paginas.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.siguiente),
+            ('previous', self.anterior),
+            ('results', data),
+        ]))
+
+    def _leer_cursor(self, modelo, campo):
+        codificado = self.request.query_params.get(self.parametro_cursor)
+        if not codificado:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(codificado.encode('ascii')))
+            return {
+                'valor': modelo._meta.get_field(campo).to_python(datos['v']),
+                'id': int(datos['id']),
+                'atras': bool(datos.get('a')),
+            }
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound('Cursor inválido')
+
+    def _enlace(self, fila, campo, atras):
+        valor = getattr(fila, campo)
+        datos = {'v': valor.isoformat() if hasattr(valor, 'isoformat') else valor, 'id': fila.pk}
+        if atras:
+            datos['a'] = 1
+        codificado = base64.urlsafe_b64encode(json.dumps(datos).encode('utf-8')).decode('ascii')
+        url = remove_query_param(self.request.build_absolute_uri(), self.parametro_paginas)
+        return replace_query_param(url, self.parametro_cursor, codificado)
+
+
+class PaginacionCitas(PaginacionPorCursor):
+    orden = ('fecha_hora', 'id')
+
+
+class PaginacionEncuestas(PaginacionPorCursor):
+    orden = ('-fecha_creacion', '-id')
@@ -0,0 +1,89 @@
+"""
+Presupuesto de consultas SQL por endpoint.
+
+Cada vista declara cuántas consultas puede ejecutar por solicitud:
+
+    @presupuesto_consultas(3)                        # vistas de función (encima de @api_view)
+    @presupuesto_consultas(get=3)                    # vistas de función, por método HTTP
+    @presupuesto_consultas(list=3, retrieve=2)       # ViewSets, por acción
+
+Los presupuestos incluyen la consulta del usuario autenticado por JWT.
+
+PresupuestoConsultasMiddleware cuenta las consultas de cada solicitud. Con DEBUG
+añade las cabeceras X-Consultas-SQL y X-Presupuesto-Consultas; si una solicitud
+excede su presupuesto lo registra como advertencia, o lanza
+PresupuestoExcedido cuando PRESUPUESTO_CONSULTAS_ESTRICTO está activo (pruebas).
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+CABECERA_CONSULTAS = 'X-Consultas-SQL'
+CABECERA_PRESUPUESTO = 'X-Presupuesto-Consultas'
+
+
+class PresupuestoExcedido(Exception):
+    """Una solicitud ejecutó más consultas de las declaradas para su vista"""
+
+
+def presupuesto_consultas(maximo=None, **por_accion):
+    """Declara el máximo de consultas de una vista (o de cada método / acción de un ViewSet)"""
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo if maximo is not None else por_accion
+        return vista
+    return decorador
+
+
+def presupuesto_de_vista(vista, metodo):
+    """Presupuesto declarado para la vista resuelta y el método HTTP, o None"""
+    presupuesto = getattr(vista, 'presupuesto_consultas', None)
+    if presupuesto is None and hasattr(vista, 'cls'):
+        presupuesto = getattr(vista.cls, 'presupuesto_consultas', None)
+    if isinstance(presupuesto, dict):
+        # Vistas de router: `actions` relaciona el método HTTP con la acción
+        acciones = getattr(vista, 'actions', None)
+        presupuesto = presupuesto.get(acciones.get(metodo.lower()) if acciones else metodo.lower())
+    return presupuesto
+
+
+class _Contador:
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+class PresupuestoConsultasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        estricto = getattr(settings, 'PRESUPUESTO_CONSULTAS_ESTRICTO', False)
+        if not (settings.DEBUG or estricto):
+            return self.get_response(request)
+
+        contador = _Contador()
+        with connection.execute_wrapper(contador):
+            response = self.get_response(request)
+
+        presupuesto = getattr(request, '_presupuesto_consultas', None)
+        if settings.DEBUG:
+            response[CABECERA_CONSULTAS] = str(contador.total)
+            if presupuesto is not None:
+                response[CABECERA_PRESUPUESTO] = str(presupuesto)
+
+        if presupuesto is not None and contador.total > presupuesto:
+            mensaje = f'{request.method} {request.path}: {contador.total} consultas (presupuesto {presupuesto})'
+            if estricto:
+                raise PresupuestoExcedido(mensaje)
+            logger.warning(mensaje)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._presupuesto_consultas = presupuesto_de_vista(view_func, request.method)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/admin/alertas/', consumers.AlertasConsumer.as_asgi()),
+    path('ws/barbero/agenda/', consumers.AgendaBarberoConsumer.as_asgi()),
+]
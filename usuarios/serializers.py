@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from .models import (
     CustomUser,
     ClientProfile,
@@ -15,6 +16,7 @@ from .models import (
     SystemSettings,
     PageSection,
 )
+from .imagenes import FORMATOS
 
 
 class SystemSettingsSerializer(serializers.ModelSerializer):
@@ -86,15 +88,49 @@ class BarberProfileSerializer(serializers.ModelSerializer):
         return None
 
 
+class SrcsetField(serializers.ReadOnlyField):
+    """
+    `imagen_variantes` como atributo srcset por formato (ver imagenes.py):
+    {'webp': '<url> 320w, <url> 800w', 'jpeg': ...}. Vacío mientras no se generan.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'imagen_variantes')
+        super().__init__(**kwargs)
+
+    def to_representation(self, variantes):
+        request = self.context.get('request')
+        srcset = {}
+        for formato in FORMATOS:
+            # Una URL por ancho: si el original es angosto, varias variantes miden lo mismo
+            por_ancho = {}
+            for datos in (variantes or {}).values():
+                if formato in datos:
+                    por_ancho.setdefault(datos['ancho'], datos[formato])
+            candidatos = []
+            for ancho, ruta in sorted(por_ancho.items()):
+                url = default_storage.url(ruta)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                candidatos.append(f'{url} {ancho}w')
+            if candidatos:
+                srcset[formato] = ', '.join(candidatos)
+        return srcset
+
+
 class ServiceSerializer(serializers.ModelSerializer):
     """Serializador para servicios"""
+    imagen_srcset = SrcsetField()
+
     class Meta:
         model = Service
-        fields = ('id', 'nombre', 'descripcion', 'precio', 'precio_desde', 'comision_barbero', 'duracion', 'activo', 'imagen')
+        fields = ('id', 'nombre', 'descripcion', 'precio', 'precio_desde', 'comision_barbero', 'duracion', 'activo', 'imagen', 'imagen_srcset')
 
 
 class ProductSerializer(serializers.ModelSerializer):
     """Serializador para productos"""
+    imagen_srcset = SrcsetField()
+
     class Meta:
         model = Product
         fields = (
@@ -104,6 +140,7 @@ class ProductSerializer(serializers.ModelSerializer):
             'precio',
             'precio_desde',
             'imagen',
+            'imagen_srcset',
             'stock',
             'activo',
             'fecha_creacion',
@@ -127,6 +164,7 @@ class PackageSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
+    imagen_srcset = SrcsetField()
 
     class Meta:
         model = Package
@@ -140,6 +178,7 @@ class PackageSerializer(serializers.ModelSerializer):
             'servicio_ids',
             'producto_ids',
             'imagen',
+            'imagen_srcset',
             'activo',
             'fecha_creacion',
             'fecha_actualizacion',
@@ -198,13 +237,13 @@ class AppointmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ('id', 'cliente', 'barbero', 'servicio', 'paquete', 'productos', 'cliente_id',
-                 'barbero_id', 'servicio_id', 'paquete_id', 'producto_ids', 'fecha_hora', 'estado',
-                 'notas', 'nombre_cliente', 'telefono_cliente',
+                 'barbero_id', 'servicio_id', 'paquete_id', 'producto_ids', 'fecha_hora', 'duracion',
+                 'fecha_hora_fin', 'estado', 'notas', 'nombre_cliente', 'telefono_cliente',
                  'email_cliente', 'es_cliente_registrado', 'survey_token',
                  'encuesta_completada', 'fecha_creacion', 'fecha_actualizacion',
                  'tiene_encuesta', 'encuesta_token', 'encuesta_id')
 
-        read_only_fields = ('survey_token', 'encuesta_completada', 'fecha_creacion', 'fecha_actualizacion')
+        read_only_fields = ('survey_token', 'encuesta_completada', 'fecha_hora_fin', 'fecha_creacion', 'fecha_actualizacion')
 
     def get_tiene_encuesta(self, obj):
         return hasattr(obj, 'survey')
@@ -232,6 +271,91 @@ class AppointmentSerializer(serializers.ModelSerializer):
         return appointment
 
 
+def parametro_lista(request, nombre):
+    """Valores de un parámetro separado por comas (?fields=a,b) como conjunto"""
+    if request is None:
+        return set()
+    return {valor.strip() for valor in request.query_params.get(nombre, '').split(',') if valor.strip()}
+
+
+class CamposDinamicosMixin:
+    """
+    Campos a elección del cliente en serializadores de sólo lectura.
+
+    `?expand=a,b` añade los objetos anidados declarados en `expandibles`
+    (nombre -> (serializador, kwargs)) y `?fields=x,y` limita la respuesta a
+    esos campos (más los expandidos). Fuera de una solicitud se puede pasar
+    `expand` en el contexto.
+    """
+    expandibles = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+
+        expandir = (parametro_lista(request, 'expand') | set(self.context.get('expand', ()))) & set(self.expandibles)
+        for nombre in expandir:
+            serializador, opciones = self.expandibles[nombre]
+            self.fields[nombre] = serializador(read_only=True, **opciones)
+
+        campos = parametro_lista(request, 'fields')
+        if campos:
+            for nombre in set(self.fields) - campos - expandir:
+                self.fields.pop(nombre)
+
+
+def nombre_de_usuario(user):
+    return f"{user.first_name} {user.last_name}".strip() or user.username
+
+
+class AppointmentListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """Representación compacta de citas para listados: ids y nombres en lugar de objetos anidados"""
+    cliente_nombre = serializers.SerializerMethodField()
+    barbero_nombre = serializers.SerializerMethodField()
+    servicio_nombre = serializers.CharField(source='servicio.nombre', read_only=True, default=None)
+    paquete_nombre = serializers.CharField(source='paquete.nombre', read_only=True, default=None)
+    precio = serializers.SerializerMethodField()
+    producto_ids = serializers.SerializerMethodField()
+    tiene_encuesta = serializers.SerializerMethodField()
+
+    expandibles = {
+        'cliente': (ClientProfileSerializer, {}),
+        'barbero': (BarberProfileSerializer, {}),
+        'servicio': (ServiceSerializer, {}),
+        'paquete': (PackageSerializer, {}),
+        'productos': (ProductSerializer, {'many': True}),
+    }
+
+    class Meta:
+        model = Appointment
+        fields = ('id', 'cliente_id', 'cliente_nombre', 'barbero_id', 'barbero_nombre', 'servicio_id',
+                 'servicio_nombre', 'paquete_id', 'paquete_nombre', 'producto_ids', 'precio', 'fecha_hora',
+                 'duracion', 'fecha_hora_fin', 'estado', 'notas', 'nombre_cliente', 'telefono_cliente',
+                 'email_cliente', 'es_cliente_registrado', 'survey_token', 'encuesta_completada',
+                 'tiene_encuesta', 'fecha_creacion', 'fecha_actualizacion')
+        read_only_fields = fields
+
+    def get_cliente_nombre(self, obj):
+        if obj.nombre_cliente:
+            return obj.nombre_cliente
+        return nombre_de_usuario(obj.cliente.user) if obj.cliente_id else None
+
+    def get_barbero_nombre(self, obj):
+        return nombre_de_usuario(obj.barbero.user)
+
+    def get_precio(self, obj):
+        if obj.servicio_id:
+            return obj.servicio.precio
+        return obj.paquete.precio if obj.paquete_id else None
+
+    def get_producto_ids(self, obj):
+        # Usa los productos precargados con prefetch_related
+        return [producto.id for producto in obj.productos.all()]
+
+    def get_tiene_encuesta(self, obj):
+        return hasattr(obj, 'survey')
+
+
 class SurveySerializer(serializers.ModelSerializer):
     """Serializador para encuestas"""
     appointment = AppointmentSerializer(read_only=True)
@@ -293,19 +417,21 @@ class GalleryImageSerializer(serializers.ModelSerializer):
     """Serializador para imágenes y videos de galería"""
     es_video = serializers.ReadOnlyField()
     tipo_video = serializers.ReadOnlyField()
+    imagen_srcset = SrcsetField()
     
     class Meta:
         model = GalleryImage
-        fields = ('id', 'titulo', 'descripcion', 'imagen', 'video_url', 'video_file', 'es_video', 'tipo_video', 'orden', 'activo', 'fecha_creacion')
+        fields = ('id', 'titulo', 'descripcion', 'imagen', 'imagen_srcset', 'video_url', 'video_file', 'es_video', 'tipo_video', 'orden', 'activo', 'fecha_creacion')
 
 
 class WebsiteContentSerializer(serializers.ModelSerializer):
     """Serializador para contenido del sitio web"""
     contenido = serializers.CharField(required=False, allow_blank=True)
+    imagen_srcset = SrcsetField()
     
     class Meta:
         model = WebsiteContent
-        fields = ('id', 'tipo_contenido', 'contenido', 'imagen', 'activo', 'fecha_actualizacion')
+        fields = ('id', 'tipo_contenido', 'contenido', 'imagen', 'imagen_srcset', 'activo', 'fecha_actualizacion')
     
     def validate(self, data):
         # Si es creación, contenido es requerido
@@ -0,0 +1,197 @@
+"""
+Series de tiempo de citas para el panel de estadísticas.
+
+Cada periodo (día, semana o mes local) se calcula con una consulta agrupada por
+Trunc en la base de datos. Los periodos ya cerrados se guardan en caché y se
+invalidan cuando cambia una cita o encuesta de ese día (ver signals.py); el
+periodo en curso siempre se recalcula.
+
+Cada periodo tiene un contador de versión que forma parte de la clave, como en
+versiones.py: una solicitud que calculó el periodo antes de que otra
+transacción lo invalidara guarda su resultado bajo la versión anterior, que ya
+nadie lee, en lugar de dejar el valor viejo en la caché.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .estadisticas import PRECIO_CITA
+from .fechas import rango_de_dias
+from .models import Appointment
+
+# Periodo de la API -> tipo de Trunc
+PERIODOS = {
+    'dia': 'day',
+    'semana': 'week',
+    'mes': 'month',
+}
+
+MAX_PERIODOS_SERIE = 400
+
+# Respaldo: las entradas huérfanas de versiones anteriores expiran solas
+TIEMPO_CACHE_SERIES = 60 * 60 * 24 * 7
+
+
+def inicio_del_periodo(fecha, periodo):
+    """Primer día del periodo que contiene `fecha` (las semanas empiezan en lunes)"""
+    if periodo == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if periodo == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def siguiente_periodo(inicio, periodo):
+    if periodo == 'semana':
+        return inicio + timedelta(days=7)
+    if periodo == 'mes':
+        return (inicio + timedelta(days=32)).replace(day=1)
+    return inicio + timedelta(days=1)
+
+
+def periodos_entre(desde, hasta, periodo):
+    """Inicios de los periodos que cubren de `desde` a `hasta` (inclusive)"""
+    inicio = inicio_del_periodo(desde, periodo)
+    inicios = []
+    while inicio <= hasta:
+        inicios.append(inicio)
+        inicio = siguiente_periodo(inicio, periodo)
+    return inicios
+
+
+def _clave_version(periodo, inicio):
+    return f'usuarios:series:version:{periodo}:{inicio.isoformat()}'
+
+
+def _clave(periodo, inicio, version):
+    return f'usuarios:series:{periodo}:{inicio.isoformat()}:{version}'
+
+
+def _version_inicial():
+    # Si la caché pierde el contador, el nuevo valor nunca repite uno anterior
+    return time.time_ns() // 1000
+
+
+def _versiones(periodo, inicios):
+    """Versión actual de cada periodo (en una sola lectura de la caché)"""
+    claves = {inicio: _clave_version(periodo, inicio) for inicio in inicios}
+    actuales = cache.get_many(list(claves.values()))
+    resultado = {}
+    for inicio, clave in claves.items():
+        version = actuales.get(clave)
+        if version is None:
+            version = _version_inicial()
+            if not cache.add(clave, version, None):
+                version = cache.get(clave, version)
+        resultado[inicio] = version
+    return resultado
+
+
+def invalidar_series(fechas):
+    """Renueva la versión de los periodos (de cualquier tipo) que contienen las fechas dadas"""
+    claves = {
+        _clave_version(periodo, inicio_del_periodo(fecha, periodo))
+        for fecha in fechas
+        for periodo in PERIODOS
+    }
+    for clave in claves:
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, _version_inicial(), None)
+
+
+def _vacio(inicio):
+    return {
+        'inicio': inicio.isoformat(),
+        'reservas': 0,
+        'completadas': 0,
+        'canceladas': 0,
+        'no_show': 0,
+        'ingresos': 0.0,
+        'calificacion_promedio': None,
+    }
+
+
+def _calcular(periodo, inicios):
+    """Métricas de los periodos dados con una sola consulta agrupada"""
+    desde = inicios[0]
+    hasta = siguiente_periodo(inicios[-1], periodo) - timedelta(days=1)
+    inicio_rango, fin_rango = rango_de_dias(desde, hasta)
+
+    completada = Q(estado='completada')
+    filas = Appointment.objects.filter(
+        fecha_hora__gte=inicio_rango,
+        fecha_hora__lt=fin_rango,
+    ).annotate(
+        periodo=Trunc(
+            'fecha_hora',
+            PERIODOS[periodo],
+            output_field=DateField(),
+            tzinfo=timezone.get_default_timezone()
+        )
+    ).values('periodo').annotate(
+        reservas=Count('id'),
+        completadas=Count('id', filter=completada),
+        canceladas=Count('id', filter=Q(estado='cancelada')),
+        no_show=Count('id', filter=Q(estado='no_show')),
+        ingresos=Sum(PRECIO_CITA, filter=completada),
+        suma_calificaciones=Sum('survey__calificacion'),
+        num_calificaciones=Count('survey'),
+    ).order_by()
+
+    resultado = {inicio: _vacio(inicio) for inicio in inicios}
+    for fila in filas:
+        metricas = resultado.get(fila['periodo'])
+        if metricas is None:
+            continue
+        metricas.update({
+            'reservas': fila['reservas'],
+            'completadas': fila['completadas'],
+            'canceladas': fila['canceladas'],
+            'no_show': fila['no_show'],
+            'ingresos': float(fila['ingresos'] or 0),
+            'calificacion_promedio': (
+                round(fila['suma_calificaciones'] / fila['num_calificaciones'], 2)
+                if fila['num_calificaciones'] else None
+            ),
+        })
+    return resultado
+
+
+def serie(periodo, desde, hasta):
+    """
+    Métricas por periodo entre `desde` y `hasta`.
+
+    Los periodos completos que ya terminaron se leen de la caché; los que faltan
+    y el periodo en curso se calculan juntos en una sola consulta.
+    """
+    inicios = periodos_entre(desde, hasta, periodo)
+    hoy = timezone.localdate()
+    cerrados = {inicio for inicio in inicios if siguiente_periodo(inicio, periodo) <= hoy}
+
+    # Las versiones se leen antes de calcular: si un cambio las renueva mientras
+    # tanto, lo calculado queda bajo la versión anterior
+    claves = {inicio: _clave(periodo, inicio, version) for inicio, version in _versiones(periodo, cerrados).items()}
+    en_cache = cache.get_many(list(claves.values()))
+    metricas = {}
+    for inicio, clave in claves.items():
+        valor = en_cache.get(clave)
+        if valor is not None:
+            metricas[inicio] = valor
+
+    faltantes = [inicio for inicio in inicios if inicio not in metricas]
+    if faltantes:
+        calculadas = _calcular(periodo, faltantes)
+        metricas.update(calculadas)
+        cache.set_many(
+            {claves[inicio]: calculadas[inicio] for inicio in faltantes if inicio in cerrados},
+            timeout=TIEMPO_CACHE_SERIES
+        )
+
+    return [metricas[inicio] for inicio in inicios]
@@ -0,0 +1,258 @@
+"""
+Señales de la app usuarios.
+
+Mantienen actualizadas las tablas derivadas (la ocupación diaria y el resumen
+de estadísticas de los barberos) cuando cambian las citas o sus encuestas, e
+invalidan las cachés que dependen de ellas. Se importan desde
+UsuariosConfig.ready().
+"""
+
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .agenda import publicar_cita, publicar_cita_eliminada
+from .alertas import publicar_alerta, publicar_alerta_de_cita, publicar_alerta_retirada
+from .disponibilidad import recalcular_ocupacion
+from .estadisticas import ESTADO_COMPLETADA, invalidar_estadisticas_generales, recalcular_estadisticas
+from .imagenes import MODELOS_CON_VARIANTES, registrar_modelo_con_variantes
+from .models import Appointment, AppointmentAlert, BarberProfile, CustomUser, DeletedAppointment, Service, Survey, SystemSettings
+from .series import invalidar_series
+from .sincronizacion import purgar_eliminadas
+from .sitio import MODELOS_SITIO
+from .versiones import registrar_modelo_versionado
+
+# Campos de la cita que afectan la ocupación del barbero
+CAMPOS_OCUPACION = ('barbero_id', 'fecha_hora', 'fecha_hora_fin', 'estado')
+
+# Campos de la cita que afectan el resumen diario del barbero
+CAMPOS_ESTADISTICAS = ('barbero_id', 'fecha_hora', 'estado', 'servicio_id', 'paquete_id')
+
+# Campos de la cita que deciden en qué listados aparece (sincronización incremental)
+CAMPOS_SINCRONIZACION = ('barbero_id', 'cliente_id')
+
+# Campos de la cita que deciden a qué agenda y con qué evento se publica, seguidos de
+# los que muestra la agenda; otros cambios (p. ej. survey_token) no se publican
+CAMPOS_AGENDA = (
+    'barbero_id', 'estado',
+    'cliente_id', 'servicio_id', 'paquete_id', 'fecha_hora', 'duracion', 'fecha_hora_fin',
+    'notas', 'nombre_cliente', 'telefono_cliente', 'email_cliente', 'encuesta_completada',
+)
+
+# Campos de la cita que se muestran en su alerta (o la retiran)
+CAMPOS_ALERTA = (
+    'estado', 'fecha_hora', 'barbero_id', 'servicio_id', 'paquete_id',
+    'cliente_id', 'nombre_cliente', 'telefono_cliente',
+)
+
+
+def _dia_local(fecha_hora):
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return timezone.localtime(fecha_hora).date()
+
+
+def _valores(instance, campos):
+    # Se lee de __dict__ para no disparar consultas con campos diferidos
+    return tuple(instance.__dict__.get(campo) for campo in campos)
+
+
+def _se_borra_el_barbero(barbero_id, origin):
+    """
+    Indica si el borrado en cascada viene del propio barbero o de su usuario.
+
+    Sus filas derivadas se borran con él; recalcularlas en el post_delete de
+    cada cita las volvería a insertar apuntando a un barbero eliminado. El
+    barbero sigue en la base de datos mientras se borran sus citas (los padres
+    se borran al final), así que se consulta a partir de `origin`.
+    """
+    if isinstance(origin, models.Model):
+        origin = type(origin).objects.filter(pk=origin.pk)
+    if not isinstance(origin, models.QuerySet):
+        return False
+    if origin.model is BarberProfile:
+        return origin.filter(pk=barbero_id).exists()
+    if origin.model is CustomUser:
+        return BarberProfile.objects.filter(pk=barbero_id, user__in=origin).exists()
+    return False
+
+
+@receiver(post_init, sender=Appointment)
+def recordar_valores_originales(sender, instance, **kwargs):
+    instance._ocupacion_original = _valores(instance, CAMPOS_OCUPACION)
+    instance._estadisticas_original = _valores(instance, CAMPOS_ESTADISTICAS)
+    instance._alerta_original = _valores(instance, CAMPOS_ALERTA)
+    instance._agenda_original = _valores(instance, CAMPOS_AGENDA)
+    instance._sincronizacion_original = _valores(instance, CAMPOS_SINCRONIZACION)
+
+
+@receiver(post_save, sender=Appointment)
+def actualizar_ocupacion_al_guardar(sender, instance, created, **kwargs):
+    """Recalcula la ocupación de los días afectados por la cita"""
+    actual = _valores(instance, CAMPOS_OCUPACION)
+    original = getattr(instance, '_ocupacion_original', (None,) * len(CAMPOS_OCUPACION))
+
+    if created or actual != original:
+        afectados = {(instance.barbero_id, _dia_local(instance.fecha_hora))}
+        barbero_original, fecha_original = original[0], original[1]
+        if not created and barbero_original and fecha_original:
+            afectados.add((barbero_original, _dia_local(fecha_original)))
+        for barbero_id, fecha in afectados:
+            recalcular_ocupacion(barbero_id, fecha)
+
+    instance._ocupacion_original = actual
+
+
+@receiver(post_save, sender=Appointment)
+def actualizar_estadisticas_al_guardar(sender, instance, created, **kwargs):
+    """
+    Recalcula el resumen diario cuando la cita entra, sale o cambia estando
+    'completada', y descarta las series en caché de los días afectados.
+    """
+    actual = _valores(instance, CAMPOS_ESTADISTICAS)
+    original = getattr(instance, '_estadisticas_original', (None,) * len(CAMPOS_ESTADISTICAS))
+    barbero_original, fecha_original, estado_original = original[:3]
+
+    if created or actual != original:
+        dias = {_dia_local(instance.fecha_hora)}
+        if not created and fecha_original:
+            dias.add(_dia_local(fecha_original))
+        transaction.on_commit(lambda: invalidar_series(dias))
+
+        afectados = set()
+        if instance.estado == ESTADO_COMPLETADA:
+            afectados.add((instance.barbero_id, _dia_local(instance.fecha_hora)))
+        if not created and estado_original == ESTADO_COMPLETADA and barbero_original and fecha_original:
+            afectados.add((barbero_original, _dia_local(fecha_original)))
+        for barbero_id, fecha in afectados:
+            recalcular_estadisticas(barbero_id, fecha)
+
+    instance._estadisticas_original = actual
+
+
+@receiver(post_delete, sender=Appointment)
+def actualizar_al_borrar_cita(sender, instance, origin=None, **kwargs):
+    dia = _dia_local(instance.fecha_hora)
+    if not _se_borra_el_barbero(instance.barbero_id, origin):
+        recalcular_ocupacion(instance.barbero_id, dia)
+    transaction.on_commit(lambda: invalidar_series([dia]))
+    if instance.estado == ESTADO_COMPLETADA and not _se_borra_el_barbero(instance.barbero_id, origin):
+        recalcular_estadisticas(instance.barbero_id, dia)
+
+
+@receiver(post_delete, sender=Appointment)
+def registrar_cita_eliminada(sender, instance, **kwargs):
+    """Deja constancia del borrado para la sincronización incremental (citas/cambios/)"""
+    DeletedAppointment.objects.create(
+        cita_id=instance.pk,
+        barbero_id=instance.barbero_id,
+        cliente_id=instance.cliente_id,
+    )
+    purgar_eliminadas()
+
+
+@receiver(post_save, sender=Appointment)
+def registrar_cita_retirada(sender, instance, created, **kwargs):
+    """Una cita que pasa a otro barbero o cliente sale del listado del anterior (citas/cambios/)"""
+    actual = _valores(instance, CAMPOS_SINCRONIZACION)
+    original = getattr(instance, '_sincronizacion_original', actual)
+    if not created:
+        barbero_id, cliente_id = (
+            anterior if anterior != nuevo else None
+            for anterior, nuevo in zip(original, actual)
+        )
+        if barbero_id or cliente_id:
+            DeletedAppointment.objects.create(cita_id=instance.pk, barbero_id=barbero_id, cliente_id=cliente_id)
+    instance._sincronizacion_original = actual
+
+
+@receiver(post_save, sender=Appointment)
+def avisar_cambio_en_alerta(sender, instance, created, **kwargs):
+    """Los administradores conectados por WebSocket ven la alerta actualizada o retirada"""
+    actual = _valores(instance, CAMPOS_ALERTA)
+    if not created and actual != getattr(instance, '_alerta_original', actual):
+        publicar_alerta_de_cita(instance.pk)
+    instance._alerta_original = actual
+
+
+@receiver(post_save, sender=Appointment)
+def avisar_agenda_del_barbero(sender, instance, created, **kwargs):
+    """Publica la cita en la agenda en vivo de su barbero (y la retira de la del anterior)"""
+    actual = _valores(instance, CAMPOS_AGENDA)
+    original = getattr(instance, '_agenda_original', (None,) * len(CAMPOS_AGENDA))
+    barbero_original, estado_original = original[:2]
+    instance._agenda_original = actual
+
+    if created or barbero_original != instance.barbero_id:
+        if not created and barbero_original:
+            publicar_cita_eliminada(barbero_original, instance.pk)
+        tipo = 'cita_creada'
+    elif actual == original:
+        return
+    elif instance.estado == 'cancelada' and estado_original != 'cancelada':
+        tipo = 'cita_cancelada'
+    else:
+        tipo = 'cita_actualizada'
+    publicar_cita(instance.barbero_id, tipo, instance.pk)
+
+
+@receiver(post_delete, sender=Appointment)
+def avisar_cita_eliminada(sender, instance, **kwargs):
+    publicar_cita_eliminada(instance.barbero_id, instance.pk)
+
+
+@receiver(post_save, sender=AppointmentAlert)
+def avisar_alerta(sender, instance, **kwargs):
+    publicar_alerta(instance.pk)
+
+
+@receiver(post_delete, sender=AppointmentAlert)
+def avisar_alerta_eliminada(sender, instance, **kwargs):
+    publicar_alerta_retirada(instance.pk)
+
+
+@receiver(post_save, sender=Survey)
+@receiver(post_delete, sender=Survey)
+def actualizar_estadisticas_de_encuesta(sender, instance, origin=None, **kwargs):
+    """Las calificaciones cuentan en el día de la cita encuestada (resumen diario y series)"""
+    cita = Appointment.objects.filter(pk=instance.appointment_id).values_list('barbero_id', 'fecha_hora').first()
+    if cita:
+        barbero_id, fecha_hora = cita
+        dia = _dia_local(fecha_hora)
+        # Las encuestas se borran antes que su cita: el barbero en cascada también se detecta aquí
+        if not _se_borra_el_barbero(barbero_id, origin):
+            recalcular_estadisticas(barbero_id, dia)
+        transaction.on_commit(lambda: invalidar_series([dia]))
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Survey)
+@receiver(post_delete, sender=Survey)
+@receiver(m2m_changed, sender=Appointment.productos.through)
+def invalidar_cache_de_estadisticas(sender, **kwargs):
+    """La instantánea del panel se descarta al confirmar la transacción que cambió los datos"""
+    if kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        # Iniciar sesión no cambia las estadísticas
+        return
+    transaction.on_commit(invalidar_estadisticas_generales)
+
+
+# Catálogo público: el paquete del sitio y los listados en caché dependen de sus versiones
+for modelo in MODELOS_SITIO:
+    registrar_modelo_versionado(modelo)
+
+# Instantánea en memoria de la configuración (ver configuracion.py)
+registrar_modelo_versionado(SystemSettings)
+
+# Variantes WebP/JPEG de las imágenes subidas (ver imagenes.py)
+for modelo in MODELOS_CON_VARIANTES:
+    registrar_modelo_con_variantes(modelo)
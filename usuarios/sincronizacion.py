@@ -0,0 +1,123 @@
+"""
+Sincronización incremental del listado de citas (GET citas/cambios/).
+
+El cliente carga el listado una vez y después pide sólo lo que cambió:
+
+    GET citas/cambios/                      -> {'cursor': ...}  (punto de partida)
+    GET citas/cambios/?desde=<cursor>       -> citas creadas o modificadas,
+                                               ids de citas borradas y nuevo cursor
+
+Las citas cambiadas se detectan por `fecha_actualizacion` y los borrados por
+DeletedAppointment, que se purga tras RETENCION_ELIMINADAS (como mucho una vez
+cada INTERVALO_PURGA_ELIMINADAS, al registrar un borrado); un cursor más
+antiguo recibe 410 y el cliente debe recargar el listado completo. Una cita que
+pasa a otro barbero o cliente también deja un registro para el anterior, que
+deja de verla (se omite para quien todavía la ve).
+
+Si hay más de MAXIMO_CAMBIOS citas, el cursor de la página lleva también el id
+de la última (`fecha_id`) y la siguiente continúa por (fecha_actualizacion,
+id): muchas citas con la misma marca (p. ej. un update() masivo) no repiten
+página indefinidamente.
+
+`fecha_actualizacion` se fija al guardar, antes de confirmar la transacción,
+así que una fila puede hacerse visible con una marca algo anterior al momento
+de la consulta. Por eso el cursor devuelto se queda MARGEN_SINCRONIZACION por
+detrás del reloj: las respuestas se solapan un poco y el cliente debe
+reemplazar cada cita por id en lugar de añadirla.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import BarberProfile, ClientProfile, DeletedAppointment
+
+RETENCION_ELIMINADAS = timedelta(days=30)
+INTERVALO_PURGA_ELIMINADAS = RETENCION_ELIMINADAS / 30
+CLAVE_PURGA_ELIMINADAS = 'usuarios:purga_eliminadas'
+MARGEN_SINCRONIZACION = timedelta(seconds=60)
+MAXIMO_CAMBIOS = 200
+SEPARADOR_CURSOR = '_'
+
+
+class CursorInvalido(ValueError):
+    """El parámetro `desde` no es un cursor ni una fecha reconocible"""
+
+
+def _leer_fecha(valor):
+    try:
+        return datetime.fromtimestamp(float(valor), tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        pass
+    try:
+        fecha = parse_datetime(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise CursorInvalido(valor)
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def leer_desde(valor):
+    """
+    Fecha e id de un cursor de sincronización: ISO 8601 o segundos Unix,
+    seguidos de `_id` cuando el cursor continúa una página llena (si no, id None).
+    """
+    ultimo_id = None
+    if SEPARADOR_CURSOR in valor:
+        valor, _, ultimo_id = valor.rpartition(SEPARADOR_CURSOR)
+        try:
+            ultimo_id = int(ultimo_id)
+        except ValueError:
+            raise CursorInvalido(valor)
+    return _leer_fecha(valor), ultimo_id
+
+
+def cursor_desde(fecha, ultimo_id=None):
+    cursor = fecha.astimezone(dt_timezone.utc).isoformat()
+    return f'{cursor}{SEPARADOR_CURSOR}{ultimo_id}' if ultimo_id is not None else cursor
+
+
+def despues_del_cursor(fecha, ultimo_id=None):
+    """Filtro de las citas posteriores al cursor, en el orden (fecha_actualizacion, id)"""
+    if ultimo_id is None:
+        return Q(fecha_actualizacion__gte=fecha)
+    return Q(fecha_actualizacion__gt=fecha) | Q(fecha_actualizacion=fecha, id__gt=ultimo_id)
+
+
+def cursor_actual(desde=None):
+    """Cursor para la siguiente sincronización: el reloj menos el margen, nunca antes de `desde`"""
+    cursor = timezone.now() - MARGEN_SINCRONIZACION
+    if desde is not None and desde > cursor:
+        cursor = desde
+    return cursor
+
+
+def cursor_caducado(desde):
+    return desde < timezone.now() - RETENCION_ELIMINADAS
+
+
+def citas_eliminadas(user, desde, visibles):
+    """
+    Ids de las citas borradas (o retiradas) desde `desde` que `user` tenía en su
+    listado; `visibles` es ese listado y excluye las que todavía ve.
+    """
+    eliminadas = DeletedAppointment.objects.filter(fecha_eliminacion__gte=desde)
+    if user.rol == 'cliente':
+        eliminadas = eliminadas.filter(cliente_id__in=ClientProfile.objects.filter(user=user).values('id'))
+    elif user.rol == 'barbero':
+        eliminadas = eliminadas.filter(barbero_id__in=BarberProfile.objects.filter(user=user).values('id'))
+    eliminadas = eliminadas.exclude(cita_id__in=visibles.values('id'))
+    return list(eliminadas.values_list('cita_id', flat=True).distinct())
+
+
+def purgar_eliminadas():
+    """Borra los registros vencidos; las llamadas dentro de INTERVALO_PURGA_ELIMINADAS no hacen nada"""
+    if not cache.add(CLAVE_PURGA_ELIMINADAS, True, INTERVALO_PURGA_ELIMINADAS.total_seconds()):
+        return
+    DeletedAppointment.objects.filter(fecha_eliminacion__lt=timezone.now() - RETENCION_ELIMINADAS).delete()
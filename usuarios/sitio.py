@@ -0,0 +1,75 @@
+"""
+Paquete público del sitio en una sola respuesta.
+
+Reúne lo que la página de inicio pedía en varias llamadas (servicios, productos,
+paquetes, galería, testimonios, secciones y el mapa de contenido). El paquete se
+guarda en caché bajo la combinación de las versiones de esos modelos (ver
+versiones.py), que también sirve de ETag.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+
+from .contenido import contenido_sitio
+from .models import GalleryImage, Package, PageSection, Product, Service, Testimonial, WebsiteContent
+from .serializers import (
+    GalleryImageSerializer,
+    PackageSerializer,
+    PageSectionSerializer,
+    ProductSerializer,
+    ServiceSerializer,
+    TestimonialSerializer,
+    WebsiteContentSerializer,
+)
+from .versiones import versiones
+
+TIEMPO_CACHE_SITIO = 60 * 60 * 24
+
+# Modelos de los que depende el paquete público
+MODELOS_SITIO = (Service, Product, Package, GalleryImage, Testimonial, PageSection, WebsiteContent)
+
+
+def version_sitio():
+    """Versión del contenido público: cambia cuando cambia cualquiera de sus modelos"""
+    firma = '.'.join(str(version) for version in versiones(*MODELOS_SITIO))
+    return hashlib.md5(firma.encode('utf-8')).hexdigest()[:12]
+
+
+def _construir(request):
+    contexto = {'request': request}
+    paquetes = Package.objects.filter(activo=True).order_by('-fecha_creacion').prefetch_related('servicios', 'productos')
+    contenido = WebsiteContentSerializer(list(contenido_sitio().values()), many=True, context=contexto).data
+
+    return {
+        'servicios': ServiceSerializer(Service.objects.filter(activo=True), many=True, context=contexto).data,
+        'productos': ProductSerializer(
+            Product.objects.filter(activo=True).order_by('-fecha_creacion'), many=True, context=contexto
+        ).data,
+        'paquetes': PackageSerializer(paquetes, many=True, context=contexto).data,
+        'galeria': GalleryImageSerializer(
+            GalleryImage.objects.filter(activo=True).order_by('orden'), many=True, context=contexto
+        ).data,
+        'testimonios': TestimonialSerializer(
+            Testimonial.objects.filter(activo=True).order_by('-fecha_creacion'), many=True, context=contexto
+        ).data,
+        'secciones': PageSectionSerializer(
+            PageSection.objects.filter(activo=True).order_by('orden'), many=True, context=contexto
+        ).data,
+        'contenido': {item['tipo_contenido']: item for item in contenido},
+    }
+
+
+def paquete_sitio(request):
+    """
+    Devuelve (versión, datos) del paquete público.
+
+    Las URLs de imágenes son absolutas, así que la clave incluye el host.
+    """
+    version = version_sitio()
+    clave = f'usuarios:sitio:{version}:{request.get_host()}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _construir(request)
+        cache.set(clave, datos, TIEMPO_CACHE_SITIO)
+    return version, datos
@@ -1,3 +1,1274 @@
-from django.test import TestCase
+import importlib
+import json
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from barberia_backend.asgi import application
+
+from . import series
+from .checks import revisar_cache, revisar_capa_de_canales
+from .configuracion import configuracion
+from .disponibilidad import CLAVE_PASO_HORARIOS, paso_de_horarios
+from .fechas import dias_del_mes, filtro_rango, rango_de_dias, rango_del_dia
+from .idempotencia import IDEMPOTENCIA_EN_PROCESO_MAXIMO
+from .imagenes import generar_variantes
+from .models import Appointment, AppointmentAlert, BarberDailyStats, BarberDayOccupancy, BarberProfile, ClientProfile, CustomUser, DeletedAppointment, IdempotencyKey, Package, Product, Service, SlotHold, Survey, SystemSettings, WebsiteContent
+from .presupuesto import presupuesto_de_vista
+from .sincronizacion import CLAVE_PURGA_ELIMINADAS, RETENCION_ELIMINADAS
+
+
+def crear_barbero(username, **kwargs):
+    user = CustomUser.objects.create(username=username, first_name=username.title(), rol='barbero')
+    datos = {
+        'horario_inicio': time(9),
+        'horario_fin': time(18),
+        'dias_laborales': ['1', '2', '3', '4', '5', '6'],
+    }
+    datos.update(kwargs)
+    return BarberProfile.objects.create(user=user, **datos)
+
+
+def fecha_local(*args):
+    return timezone.make_aware(datetime(*args), timezone.get_current_timezone())
+
+
+def crear_cliente(username):
+    user = CustomUser.objects.create(username=username, first_name=username.title(), rol='cliente')
+    ClientProfile.objects.create(user=user)
+    return user
+
+
+def plan_sin_seqscan(queryset):
+    """EXPLAIN de la consulta; en PostgreSQL se deshabilitan los escaneos secuenciales (tablas de prueba pequeñas)"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+
+# Patrones de EXPLAIN que indican acceso por índice en PostgreSQL y SQLite
+PATRON_INDICE = r'Index (Only )?Scan|Bitmap Index Scan|USING (COVERING )?INDEX'
+
+
+class BarberAvailabilityTests(APITestCase):
+    """Pruebas de disponibilidad de todos los barberos para un día"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', rol='admin')
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=60)
+        cls.barberos = [crear_barbero(f'barbero{i}') for i in range(12)]
+        # Sábado 2026-03-07 con la agenda casi llena
+        for barbero in cls.barberos:
+            for hora in range(9, 17):
+                Appointment.objects.create(
+                    barbero=barbero,
+                    servicio=cls.servicio,
+                    fecha_hora=fecha_local(2026, 3, 7, hora),
+                    estado='agendada',
+                )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def test_consultas_constantes_con_muchos_barberos(self):
+        paso_de_horarios()  # la configuración se carga una vez por proceso
+
+        # Barberos (con usuario), ocupación del día y reservas temporales vigentes
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/disponibilidad/', {'fecha': '2026-03-07'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 12)
+        for item in response.data:
+            horas = [slot['hora'] for slot in item['horarios_disponibles']]
+            self.assertEqual(horas, ['17:00', '17:30'])
+
+    def test_omite_barberos_que_no_trabajan(self):
+        # Domingo: ningún barbero labora
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/disponibilidad/', {'fecha': '2026-03-08'})
+        self.assertEqual(response.data, [])
+
+    def test_duracion_del_servicio(self):
+        response = self.client.get('/api/disponibilidad/', {'fecha': '2026-03-07', 'servicio_id': self.servicio.id})
+        self.assertEqual(
+            [slot['hora'] for slot in response.data[0]['horarios_disponibles']],
+            ['17:00']
+        )
+
+
+class AvailableSlotsRangeTests(APITestCase):
+    """Pruebas de la disponibilidad por rango de fechas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+        cls.barberos = [crear_barbero('ana'), crear_barbero('luis', horario_inicio=time(12), dias_laborales=['1', '3', '5'])]
+        for barbero, dia, hora in ((cls.barberos[0], 2, 10), (cls.barberos[0], 4, 15), (cls.barberos[1], 4, 12)):
+            Appointment.objects.create(barbero=barbero, servicio=servicio, fecha_hora=fecha_local(2026, 3, dia, hora))
+
+    def rango(self, **params):
+        datos = {'desde': '2026-03-02', 'hasta': '2026-03-08', 'barbero_id': ','.join(str(b.id) for b in self.barberos)}
+        datos.update(params)
+        return self.client.get('/api/citas/horarios-disponibles/rango/', datos)
+
+    def test_coincide_con_la_consulta_por_dia(self):
+        response = self.rango()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['barbero']['id'] for item in response.data['barberos']], [b.id for b in self.barberos])
+        ana, luis = (item['dias'] for item in response.data['barberos'])
+        self.assertNotIn('10:00', [slot['hora'] for slot in ana[0]['horarios_disponibles']])
+        self.assertEqual(luis[1]['horarios_disponibles'], [])
+        self.assertEqual(luis[0]['horarios_disponibles'][0]['hora'], '12:00')
+
+        for item in response.data['barberos']:
+            self.assertEqual(len(item['dias']), 7)
+            for dia in item['dias']:
+                por_dia = self.client.get('/api/citas/horarios-disponibles/', {
+                    'fecha': dia['fecha'], 'barbero_id': item['barbero']['id'],
+                })
+                self.assertEqual(dia['horarios_disponibles'], por_dia.data['horarios_disponibles'], dia['fecha'])
+
+    def test_limite_de_31_dias(self):
+        self.assertEqual(self.rango(desde='2026-03-01', hasta='2026-03-31').status_code, 200)
+        self.assertEqual(self.rango(desde='2026-03-01', hasta='2026-04-01').status_code, 400)
+
+    def test_fechas_invalidas_o_invertidas(self):
+        self.assertEqual(self.rango(desde='ayer').status_code, 400)
+        self.assertEqual(self.rango(hasta='2026-02-30').status_code, 400)
+        self.assertEqual(self.rango(desde='2026-03-08', hasta='2026-03-02').status_code, 400)
+
+
+class SystemSettingsStoreTests(APITestCase):
+    """Pruebas de la configuración tipada en memoria"""
+
+    def setUp(self):
+        cache.clear()
+        # Renueva la versión para que otras pruebas no vean esta configuración (el rollback no emite señales)
+        self.addCleanup(cache.clear)
+
+    def test_valores_tipados_sin_consultas(self):
+        SystemSettings.objects.create(tipo_configuracion='booking', clave='max_citas_dia', valor=' 20 ')
+        SystemSettings.objects.create(tipo_configuracion='booking', clave='permite_invitados', valor='Sí')
+
+        self.assertEqual(configuracion.obtener('max_citas_dia', int), 20)
+        with self.assertNumQueries(0):
+            self.assertIs(configuracion.obtener('permite_invitados', bool), True)
+            self.assertEqual(configuracion.obtener('sitio_nombre', default='Barbería'), 'Barbería')
+        with self.assertLogs('usuarios.configuracion', 'WARNING'):
+            self.assertEqual(configuracion.obtener('permite_invitados', int, default=0), 0)
+
+    def test_paso_configurable_en_horarios(self):
+        barbero = crear_barbero('barbero', horario_inicio=time(9), horario_fin=time(10))
+        with self.captureOnCommitCallbacks(execute=True):
+            SystemSettings.objects.create(tipo_configuracion='booking', clave=CLAVE_PASO_HORARIOS, valor='15')
+
+        response = self.client.get(
+            '/api/citas/horarios-disponibles/', {'fecha': '2026-03-07', 'barbero_id': barbero.id, 'duracion': 30}
+        )
+        self.assertEqual([slot['hora'] for slot in response.data['horarios_disponibles']], ['09:00', '09:15', '09:30'])
+
+
+class BarberDayOccupancyTests(TestCase):
+    """Pruebas de la ocupación diaria materializada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+        cls.barbero = crear_barbero('barbero')
+
+    def ocupacion(self, dia):
+        return BarberDayOccupancy.objects.get(barbero=self.barbero, fecha=dia).intervalos
+
+    def test_se_actualiza_al_crear_mover_y_cancelar(self):
+        dia = fecha_local(2026, 3, 7, 10).date()
+        cita = Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10))
+        Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10, 30))
+        self.assertEqual(self.ocupacion(dia), [[600, 675]])
+
+        cita.fecha_hora = fecha_local(2026, 3, 9, 12)
+        cita.save()
+        self.assertEqual(self.ocupacion(dia), [[630, 675]])
+        self.assertEqual(self.ocupacion(cita.fecha_hora.date()), [[720, 765]])
+
+        cita.estado = 'cancelada'
+        cita.save()
+        self.assertEqual(self.ocupacion(cita.fecha_hora.date()), [])
+
+    def test_se_actualiza_al_borrar(self):
+        cita = Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10))
+        cita.delete()
+        self.assertEqual(self.ocupacion(fecha_local(2026, 3, 7, 10).date()), [])
+
+    def test_borrar_barbero_con_citas(self):
+        # Recalcular en el post_delete de cada cita volvía a insertar ocupación del barbero borrado
+        otro = crear_barbero('otro')
+        for barbero in (self.barbero, otro):
+            Appointment.objects.create(barbero=barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10))
+
+        self.barbero.user.delete()
+        otro.delete()
+
+        self.assertFalse(BarberDayOccupancy.objects.exists())
+        connection.check_constraints()
+
+    def test_comando_reconstruye_desde_cero(self):
+        Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10))
+        BarberDayOccupancy.objects.all().delete()
+
+        call_command('reconstruir_ocupacion', stdout=StringIO())
+
+        self.assertEqual(self.ocupacion(fecha_local(2026, 3, 7, 10).date()), [[600, 645]])
+
+
+class BarberDailyStatsTests(APITestCase):
+    """Pruebas del resumen diario de estadísticas por barbero"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', rol='admin')
+        cls.servicio = Service.objects.create(
+            nombre='Corte', descripcion='Corte clásico', precio=150, comision_barbero=60, duracion=45
+        )
+        cls.barbero = crear_barbero('barbero')
+
+    def resumen(self, dia):
+        return BarberDailyStats.objects.filter(barbero=self.barbero, fecha=dia).values(
+            'cortes', 'comision', 'ingresos', 'suma_calificaciones', 'num_calificaciones'
+        ).first()
+
+    def test_se_actualiza_al_completar_calificar_y_revertir(self):
+        dia = date(2026, 3, 7)
+        cita = Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10))
+        self.assertIsNone(self.resumen(dia))
+
+        cita.estado = 'completada'
+        cita.save()
+        Survey.objects.create(appointment=cita, calificacion=4)
+        self.assertEqual(self.resumen(dia), {
+            'cortes': 1, 'comision': 60, 'ingresos': 150, 'suma_calificaciones': 4, 'num_calificaciones': 1
+        })
+
+        cita.survey.delete()
+        cita.estado = 'cancelada'
+        cita.save()
+        self.assertIsNone(self.resumen(dia))
+
+    def test_borrar_barbero_con_citas_completadas(self):
+        cita = Appointment.objects.create(
+            barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10), estado='completada'
+        )
+        Survey.objects.create(appointment=cita, calificacion=5)
+
+        self.barbero.user.delete()
+
+        self.assertFalse(BarberDailyStats.objects.exists())
+        connection.check_constraints()
+
+    def test_comando_reconstruye_desde_cero(self):
+        cita = Appointment.objects.create(
+            barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 23, 30), estado='completada'
+        )
+        Survey.objects.create(appointment=cita, calificacion=5)
+        BarberDailyStats.objects.all().delete()
+
+        call_command('reconstruir_estadisticas', stdout=StringIO())
+
+        self.assertEqual(self.resumen(date(2026, 3, 7))['cortes'], 1)
+        self.assertEqual(self.resumen(date(2026, 3, 7))['suma_calificaciones'], 5)
+
+    def test_citas_de_paquete_suman_el_precio_del_paquete(self):
+        paquete = Package.objects.create(nombre='Combo', descripcion='Corte y barba', precio=250)
+        Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10), estado='completada')
+        Appointment.objects.create(barbero=self.barbero, paquete=paquete, fecha_hora=fecha_local(2026, 3, 7, 12), estado='completada')
+        self.assertEqual(self.resumen(date(2026, 3, 7))['ingresos'], 400)
+
+        BarberDailyStats.objects.all().delete()
+        call_command('reconstruir_estadisticas', stdout=StringIO())
+        self.assertEqual(self.resumen(date(2026, 3, 7))['ingresos'], 400)
+
+    def test_cambiar_el_paquete_de_una_cita_completada(self):
+        combo = Package.objects.create(nombre='Combo', descripcion='Corte y barba', precio=100)
+        premium = Package.objects.create(nombre='Premium', descripcion='Corte, barba y facial', precio=500)
+        cita = Appointment.objects.create(barbero=self.barbero, paquete=combo, fecha_hora=fecha_local(2026, 3, 7, 10), estado='completada')
+        self.assertEqual(self.resumen(date(2026, 3, 7))['ingresos'], 100)
+
+        cita.paquete = premium
+        with mock.patch('usuarios.signals.invalidar_series') as invalidar, self.captureOnCommitCallbacks(execute=True):
+            cita.save()
+
+        self.assertEqual(self.resumen(date(2026, 3, 7))['ingresos'], 500)
+        invalidar.assert_called_once_with({date(2026, 3, 7)})
+
+    def test_lista_de_usuarios_con_consultas_constantes(self):
+        hoy = timezone.localdate()
+        ahora = timezone.localtime()
+        barberos = [self.barbero] + [crear_barbero(f'barbero{i}') for i in range(5)]
+        for barbero in barberos:
+            Appointment.objects.create(barbero=barbero, servicio=self.servicio, fecha_hora=ahora, estado='completada')
+        self.client.force_authenticate(self.admin)
+
+        # Usuarios (con perfiles) y el resumen de todos los barberos
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/admin/usuarios/')
+
+        resumenes = [usuario['barber_summary'] for usuario in response.data if usuario['rol'] == 'barbero']
+        self.assertEqual(len(resumenes), 6)
+        for resumen in resumenes:
+            self.assertEqual(resumen, {'cortes_dia': 1, 'cortes_mes': 1, 'comision_dia': 60.0, 'comision_mes': 60.0})
+        self.assertEqual(BarberDailyStats.objects.get(barbero=self.barbero).fecha, hoy)
+
+
+class AdminGeneralStatsTests(APITestCase):
+    """Pruebas de la instantánea en caché de estadísticas generales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', rol='admin')
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def test_instantanea_en_cache_e_invalidacion(self):
+        # Una consulta agregada por tabla más las citas recientes (sin citas no hay prefetch)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/admin/estadisticas-generales/')
+        self.assertEqual(response.data['total_services'], 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/admin/estadisticas-generales/').data, response.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.create(nombre='Barba', descripcion='Barba', precio=100, duracion=30)
+        self.assertEqual(self.client.get('/api/admin/estadisticas-generales/').data['total_services'], 2)
+
+    def test_fresh_omite_la_cache(self):
+        self.client.get('/api/admin/estadisticas-generales/')
+        # Sin confirmar la transacción la caché no se invalida
+        Service.objects.create(nombre='Barba', descripcion='Barba', precio=100, duracion=30)
+        self.assertEqual(self.client.get('/api/admin/estadisticas-generales/').data['total_services'], 1)
+        self.assertEqual(self.client.get('/api/admin/estadisticas-generales/', {'fresh': 1}).data['total_services'], 2)
+
+
+class AdminSeriesTests(APITestCase):
+    """Pruebas de las series de tiempo del panel"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', rol='admin')
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+        cls.barbero = crear_barbero('barbero')
+        # Lunes 2026-03-02 y martes 2026-03-03 (la cita de las 23:30 sigue siendo del lunes en hora local)
+        completada = Appointment.objects.create(
+            barbero=cls.barbero, servicio=cls.servicio, fecha_hora=fecha_local(2026, 3, 2, 23, 30), estado='completada'
+        )
+        Survey.objects.create(appointment=completada, calificacion=4)
+        Appointment.objects.create(barbero=cls.barbero, servicio=cls.servicio, fecha_hora=fecha_local(2026, 3, 2, 10), estado='cancelada')
+        Appointment.objects.create(barbero=cls.barbero, servicio=cls.servicio, fecha_hora=fecha_local(2026, 3, 3, 10), estado='no_show')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def series(self, **params):
+        return self.client.get('/api/admin/series/', {'desde': '2026-03-02', 'hasta': '2026-03-08', **params}).data['series']
+
+    def test_periodos_diarios_y_semanales(self):
+        diaria = self.series()
+        self.assertEqual(len(diaria), 7)
+        self.assertEqual(diaria[0], {
+            'inicio': '2026-03-02', 'reservas': 2, 'completadas': 1, 'canceladas': 1, 'no_show': 0,
+            'ingresos': 150.0, 'calificacion_promedio': 4.0,
+        })
+        self.assertEqual(diaria[1]['no_show'], 1)
+
+        semanal = self.series(periodo='semana')
+        self.assertEqual([(item['inicio'], item['reservas']) for item in semanal], [('2026-03-02', 3)])
+
+    def test_periodos_cerrados_en_cache_e_invalidados_por_cambios(self):
+        self.series()
+        with self.assertNumQueries(0):
+            self.series()
+
+        cita = Appointment.objects.get(estado='no_show')
+        with self.captureOnCommitCallbacks(execute=True):
+            cita.estado = 'completada'
+            cita.save()
+        self.assertEqual(self.series()[1]['completadas'], 1)
+
+    def test_invalidacion_durante_el_calculo_no_deja_el_valor_viejo(self):
+        calcular = series._calcular
+
+        def calcular_mientras_cambia(periodo, inicios):
+            resultado = calcular(periodo, inicios)
+            # Otra transacción confirma un cambio del martes mientras esta solicitud calculaba
+            Appointment.objects.filter(estado='no_show').update(estado='completada')
+            series.invalidar_series([date(2026, 3, 3)])
+            return resultado
+
+        with mock.patch.object(series, '_calcular', calcular_mientras_cambia):
+            self.assertEqual(self.series()[1]['completadas'], 0)
+        self.assertEqual(self.series()[1]['completadas'], 1)
+
+    def test_ingresos_de_citas_de_paquete(self):
+        paquete = Package.objects.create(nombre='Combo', descripcion='Corte y barba', precio=250)
+        Appointment.objects.create(barbero=self.barbero, paquete=paquete, fecha_hora=fecha_local(2026, 3, 4, 10), estado='completada')
+        self.assertEqual(self.series()[2]['ingresos'], 250.0)
+
+    def test_check_deploy_avisa_de_la_cache_no_atomica(self):
+        en_disco = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'}}
+        with override_settings(CACHES=en_disco):
+            self.assertEqual([aviso.id for aviso in revisar_cache(None)], ['usuarios.W002'])
+        with override_settings(CACHES=redis):
+            self.assertEqual(revisar_cache(None), [])
+
+
+class PublicSiteBundleTests(APITestCase):
+    """Pruebas del paquete público del sitio"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+        Service.objects.create(nombre='Tinte', descripcion='Tinte', precio=300, duracion=90, activo=False)
+        WebsiteContent.objects.create(tipo_contenido='inicio_titulo', contenido='Bienvenido')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_paquete_en_cache_con_etag(self):
+        response = self.client.get('/api/publico/sitio/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([servicio['nombre'] for servicio in response.data['servicios']], ['Corte'])
+        self.assertEqual(response.data['contenido']['inicio_titulo']['contenido'], 'Bienvenido')
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/publico/sitio/').data, response.data)
+        self.assertEqual(self.client.get('/api/publico/sitio/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_cambios_renuevan_la_version(self):
+        etag = self.client.get('/api/publico/sitio/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.filter(nombre='Tinte').get().delete()
+
+        response = self.client.get('/api/publico/sitio/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_listado_anonimo_en_cache_por_version(self):
+        response = self.client.get('/api/servicios/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/servicios/').data, response.data)
+
+        # update() no emite señales; el save() posterior es el que renueva la versión
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.filter(nombre='Corte').update(precio=180)
+            Service.objects.get(nombre='Tinte').save()
+
+        response = self.client.get('/api/servicios/')
+        self.assertIn('180.00', [servicio['precio'] for servicio in response.data['results']])
+
+    def test_mapa_de_contenido_en_memoria(self):
+        response = self.client.get('/api/contenido/mapa/')
+        self.assertEqual(response.data['inicio_titulo']['contenido'], 'Bienvenido')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/contenido/mapa/').data, response.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WebsiteContent.objects.create(tipo_contenido='inicio_subtitulo', contenido='Cortes clásicos')
+        response = self.client.get('/api/contenido/mapa/')
+        self.assertEqual(sorted(response.data), ['inicio_subtitulo', 'inicio_titulo'])
+
+    def test_listado_condicional(self):
+        response = self.client.get('/api/servicios/')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        # Desde la caché anónima el 304 no consulta la base de datos
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/servicios/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        admin = CustomUser.objects.create(username='admin', rol='admin')
+        self.client.force_authenticate(admin)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/servicios/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Service.objects.create(nombre='Barba', descripcion='Arreglo de barba', precio=100, duracion=30)
+        response = self.client.get('/api/servicios/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ImageVariantsTests(APITestCase):
+    """Pruebas de las variantes redimensionadas de las imágenes subidas"""
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def imagen(self, nombre, ancho, alto):
+        contenido = BytesIO()
+        Image.new('RGB', (ancho, alto), 'red').save(contenido, format='JPEG')
+        return SimpleUploadedFile(nombre, contenido.getvalue(), content_type='image/jpeg')
+
+    def test_genera_variantes_sin_ampliar_y_las_expone_como_srcset(self):
+        grande = Product.objects.create(nombre='Cera', precio=120, imagen=self.imagen('cera.jpg', 3000, 2000))
+        chica = Product.objects.create(nombre='Peine', precio=50, imagen=self.imagen('peine.jpg', 500, 500))
+
+        call_command('generar_variantes_imagenes', stdout=StringIO())
+
+        grande.refresh_from_db()
+        self.assertEqual({nombre: datos['ancho'] for nombre, datos in grande.imagen_variantes.items()},
+                         {'thumbnail': 320, 'card': 800, 'full': 1600})
+        with default_storage.open(grande.imagen_variantes['card']['webp']) as archivo:
+            self.assertEqual(Image.open(archivo).size, (800, 533))
+
+        productos = {p['nombre']: p for p in self.client.get('/api/productos/').data['results']}
+        self.assertEqual(productos['Cera']['imagen_srcset']['webp'].count('w, '), 2)
+        self.assertRegex(productos['Peine']['imagen_srcset']['jpeg'], r'^http://testserver/media/variantes/productos/peine-thumbnail\.jpg 320w, \S+ 500w$')
+
+        # Quitar la imagen borra sus variantes
+        archivos = [datos['webp'] for datos in Product.objects.get(pk=chica.pk).imagen_variantes.values()]
+        Product.objects.filter(pk=chica.pk).update(imagen='')
+        self.assertEqual(generar_variantes(Product, chica.pk), {})
+        self.assertFalse(any(default_storage.exists(ruta) for ruta in archivos))
+
+
+class DayRangeFilterTests(TestCase):
+    """Pruebas de los filtros por rango de día local"""
+
+    def test_rango_del_dia_en_hora_local(self):
+        inicio, fin = rango_del_dia(date(2026, 3, 7))
+        self.assertEqual(inicio, fecha_local(2026, 3, 7))
+        self.assertEqual(fin, fecha_local(2026, 3, 8))
+        # Ciudad de México: medianoche local son las 06:00 UTC
+        self.assertEqual(inicio.utcoffset(), timedelta(hours=-6))
+
+    def test_dias_del_mes(self):
+        self.assertEqual(dias_del_mes(date(2026, 12, 15)), (date(2026, 12, 1), date(2026, 12, 31)))
+
+    def test_incluye_citas_nocturnas_del_dia_local(self):
+        barbero = crear_barbero('barbero')
+        # 23:30 local del día 7 ya es día 8 en UTC
+        cita = Appointment.objects.create(barbero=barbero, fecha_hora=fecha_local(2026, 3, 7, 23, 30))
+        Appointment.objects.create(barbero=barbero, fecha_hora=fecha_local(2026, 3, 8, 0, 0))
+
+        citas = Appointment.objects.filter(**filtro_rango(rango_del_dia(date(2026, 3, 7))))
+        self.assertEqual(list(citas), [cita])
+
+    def test_filtro_por_rango_usa_indice(self):
+        plan = plan_sin_seqscan(
+            Appointment.objects.filter(**filtro_rango(rango_del_dia(date(2026, 3, 7))))
+        )
+        self.assertIn('fecha_hora', plan)
+        self.assertRegex(plan, PATRON_INDICE)
+
+
+class AppointmentListTests(APITestCase):
+    """Pruebas del listado compacto de citas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', rol='admin')
+        servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+        paquete = Package.objects.create(nombre='Combo', descripcion='Corte y barba', precio=250)
+        paquete.servicios.add(servicio)
+        barbero = crear_barbero('barbero')
+        cliente = crear_cliente('cliente')
+        for dia in range(1, 21):
+            Appointment.objects.create(
+                barbero=barbero,
+                cliente=cliente.client_profile,
+                servicio=servicio if dia % 2 else None,
+                paquete=None if dia % 2 else paquete,
+                fecha_hora=fecha_local(2026, 3, dia, 10),
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def test_ids_y_nombres_con_consultas_constantes(self):
+        # Citas (con sus relaciones y encuesta) y productos; la paginación por cursor no cuenta filas
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/citas/')
+
+        cita = response.data['results'][0]
+        self.assertNotIn('cliente', cita)
+        self.assertEqual(cita['cliente_nombre'], 'Cliente')
+        self.assertEqual(cita['barbero_nombre'], 'Barbero')
+        self.assertEqual({cita['servicio_nombre'] or cita['paquete_nombre'] for cita in response.data['results']}, {'Corte', 'Combo'})
+
+    def test_fields_y_expand(self):
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/citas/', {'fields': 'id,estado', 'expand': 'paquete'})
+        cita = next(cita for cita in response.data['results'] if cita['paquete'])
+        self.assertEqual(set(cita), {'id', 'estado', 'paquete'})
+        self.assertEqual([servicio['nombre'] for servicio in cita['paquete']['servicios']], ['Corte'])
+
+
+    def test_paginacion_por_cursor(self):
+        cita = Appointment.objects.first()
+        for minuto in range(5):
+            # Misma fecha y hora que otra cita: el id desempata
+            Appointment.objects.create(barbero=crear_barbero(f'extra{minuto}'), fecha_hora=cita.fecha_hora)
+        esperados = list(Appointment.objects.order_by('fecha_hora', 'id').values_list('id', flat=True))
+
+        primera = self.client.get('/api/citas/', {'fields': 'id'}).data
+        self.assertNotIn('count', primera)
+        self.assertIsNone(primera['previous'])
+        with self.assertNumQueries(2):
+            segunda = self.client.get(primera['next']).data
+        self.assertIsNone(segunda['next'])
+        self.assertEqual([c['id'] for c in primera['results'] + segunda['results']], esperados)
+
+        anterior = self.client.get(segunda['previous']).data
+        self.assertEqual(anterior['results'], primera['results'])
+
+        numerada = self.client.get('/api/citas/', {'page': 2}).data
+        self.assertEqual(numerada['count'], 25)
+        self.assertEqual(len(numerada['results']), 5)
+
+        self.assertEqual(self.client.get('/api/citas/', {'cursor': 'no-es-un-cursor'}).status_code, 404)
+
+    def test_cambios_desde_la_ultima_sincronizacion(self):
+        Appointment.objects.update(fecha_actualizacion=timezone.now() - timedelta(hours=1))
+        desde = self.client.get('/api/citas/cambios/').data['cursor']
+        cita, borrada = Appointment.objects.all()[:2]
+        cita.estado = 'confirmada'
+        cita.save()
+        borrada_id = borrada.pk
+        borrada.delete()
+
+        # Citas cambiadas, sus productos y los borrados
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/citas/cambios/', {'desde': desde})
+        self.assertEqual([(c['id'], c['estado']) for c in response.data['citas']], [(cita.pk, 'confirmada')])
+        self.assertEqual(response.data['eliminadas'], [borrada_id])
+        self.assertFalse(response.data['hay_mas'])
+
+        otro_barbero = crear_barbero('otro')
+        self.client.force_authenticate(otro_barbero.user)
+        response = self.client.get('/api/citas/cambios/', {'desde': desde})
+        self.assertEqual((response.data['citas'], response.data['eliminadas']), ([], []))
+
+        antigua = (timezone.now() - timedelta(days=60)).isoformat()
+        self.assertEqual(self.client.get('/api/citas/cambios/', {'desde': antigua}).status_code, 410)
+        self.assertEqual(self.client.get('/api/citas/cambios/', {'desde': 'ayer'}).status_code, 400)
+
+    def test_cambios_retira_la_cita_del_barbero_anterior(self):
+        anterior = BarberProfile.objects.get(user__username='barbero')
+        nuevo = crear_barbero('nuevo')
+        desde = self.client.get('/api/citas/cambios/').data['cursor']
+        cita = Appointment.objects.first()
+        cita.barbero = nuevo
+        cita.save()
+
+        self.client.force_authenticate(anterior.user)
+        self.assertEqual(self.client.get('/api/citas/cambios/', {'desde': desde}).data['eliminadas'], [cita.pk])
+        self.client.force_authenticate(nuevo.user)
+        response = self.client.get('/api/citas/cambios/', {'desde': desde}).data
+        self.assertEqual(([c['id'] for c in response['citas']], response['eliminadas']), ([cita.pk], []))
+        # Quien todavía la ve no la recibe como eliminada
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/citas/cambios/', {'desde': desde}).data['eliminadas'], [])
+
+    def test_cambios_pagina_citas_con_la_misma_marca(self):
+        marca = timezone.now()
+        Appointment.objects.update(fecha_actualizacion=marca)
+        desde = (marca - timedelta(seconds=1)).isoformat()
+
+        recibidas = []
+        with mock.patch('usuarios.views.MAXIMO_CAMBIOS', 3):
+            for _ in range(10):
+                response = self.client.get('/api/citas/cambios/', {'desde': desde, 'fields': 'id'}).data
+                recibidas += [cita['id'] for cita in response['citas']]
+                desde = response['cursor']
+                if not response['hay_mas']:
+                    break
+        self.assertFalse(response['hay_mas'])
+        self.assertEqual(recibidas, sorted(Appointment.objects.values_list('id', flat=True)))
+
+    def test_purga_de_eliminadas_como_mucho_una_vez_por_intervalo(self):
+        cache.delete(CLAVE_PURGA_ELIMINADAS)
+        vencida = timezone.now() - RETENCION_ELIMINADAS - timedelta(days=1)
+        primera, segunda = Appointment.objects.all()[:2]
+        primera_id = primera.pk
+
+        DeletedAppointment.objects.create(cita_id=0)
+        DeletedAppointment.objects.update(fecha_eliminacion=vencida)
+        primera.delete()
+        self.assertEqual(list(DeletedAppointment.objects.values_list('cita_id', flat=True)), [primera_id])
+
+        # El siguiente borrado dentro del intervalo no vuelve a purgar
+        DeletedAppointment.objects.create(cita_id=0)
+        DeletedAppointment.objects.filter(cita_id=0).update(fecha_eliminacion=vencida)
+        segunda.delete()
+        self.assertEqual(DeletedAppointment.objects.filter(cita_id=0).count(), 1)
+
+
+class AppointmentIndexTests(TestCase):
+    """Las consultas frecuentes sobre citas deben resolverse con un índice"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.barbero = crear_barbero('barbero')
+        cls.cliente = ClientProfile.objects.create(user=CustomUser.objects.create(username='cliente'))
+
+    def assertUsaIndice(self, queryset, indice=None):
+        plan = plan_sin_seqscan(queryset)
+        self.assertRegex(plan, PATRON_INDICE)
+        if indice and connection.vendor == 'sqlite':
+            self.assertIn(indice, plan)
+
+    def test_disponibilidad_por_barbero(self):
+        self.assertUsaIndice(
+            Appointment.objects.filter(
+                barbero=self.barbero,
+                estado__in=Appointment.ESTADOS_ACTIVOS,
+                **filtro_rango(rango_del_dia(date(2026, 3, 7)))
+            ),
+            'cita_barbero_fecha_estado_idx'
+        )
+
+    def test_agenda_por_barbero_y_estado(self):
+        self.assertUsaIndice(
+            Appointment.objects.filter(
+                barbero=self.barbero,
+                estado='completada',
+                **filtro_rango(rango_de_dias(date(2026, 3, 1), date(2026, 3, 31)))
+            ),
+            'cita_barbero_fecha_estado_idx'
+        )
+
+    def test_rango_de_fechas_de_todos_los_barberos(self):
+        self.assertUsaIndice(Appointment.objects.filter(**filtro_rango(rango_del_dia(date(2026, 3, 7)))), 'cita_fecha_id_idx')
+
+    def test_encuestas_pendientes_del_cliente(self):
+        self.assertUsaIndice(
+            Appointment.objects.filter(cliente=self.cliente, estado='completada', encuesta_completada=False),
+            'cita_cliente_encuesta_idx'
+        )
+
+    def test_token_de_encuesta(self):
+        self.assertUsaIndice(Appointment.objects.filter(survey_token='abc123'), 'cita_survey_token_idx')
+
+
+class ScheduleAppointmentTests(APITestCase):
+    """Pruebas de agendado de citas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=60)
+        cls.barbero = crear_barbero('barbero')
+
+    def agendar(self, user, hora='10:00'):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/citas/agendar/', {
+            'servicio_id': self.servicio.id,
+            'barbero_id': self.barbero.id,
+            'fecha': '2026-03-07',
+            'hora': hora,
+        }, format='json')
+
+    def test_segunda_reserva_del_mismo_horario_es_rechazada(self):
+        self.assertEqual(self.agendar(crear_cliente('ana')).status_code, 201)
+        self.assertEqual(self.agendar(crear_cliente('luis'), hora='10:30').status_code, 409)
+        self.assertEqual(self.agendar(crear_cliente('eva'), hora='11:00').status_code, 201)
+        self.assertEqual(Appointment.objects.count(), 2)
+
+    def test_reintento_con_idempotency_key_repite_la_respuesta(self):
+        cliente = crear_cliente('ana')
+        self.client.credentials(HTTP_IDEMPOTENCY_KEY='reserva-1')
+        primera = self.agendar(cliente)
+        segunda = self.agendar(cliente)
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.data['cita']['id'], primera.data['cita']['id'])
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(AppointmentAlert.objects.count(), 1)
+
+        # La misma clave con otros datos se rechaza
+        self.assertEqual(self.agendar(cliente, hora='12:00').status_code, 422)
+        # ... salvo que la use otro cliente: las claves son por usuario
+        self.assertEqual(self.agendar(crear_cliente('luis'), hora='12:00').status_code, 201)
+
+    def test_reserva_abandonada_de_idempotency_key_se_retoma(self):
+        cliente = crear_cliente('ana')
+        self.client.credentials(HTTP_IDEMPOTENCY_KEY='reserva-1')
+        self.agendar(cliente)
+        # El proceso murió después de reservar la clave y antes de confirmar la cita
+        Appointment.objects.all().delete()
+        IdempotencyKey.objects.update(completada=False, codigo_estado=None, respuesta=None)
+
+        self.assertEqual(self.agendar(cliente).status_code, 409)
+
+        IdempotencyKey.objects.update(fecha_creacion=timezone.now() - IDEMPOTENCIA_EN_PROCESO_MAXIMO)
+        response = self.agendar(cliente)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(self.agendar(cliente)['Idempotent-Replayed'], 'true')
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_reintento_de_encuesta_publica_repite_la_respuesta(self):
+        cita = Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10), estado='completada')
+        datos = {'token': cita.survey_token, 'calificacion': 5}
+        self.client.credentials(HTTP_IDEMPOTENCY_KEY='encuesta-1')
+        primera = self.client.post('/api/encuestas/enviar/', datos, format='json')
+        # Si la vista volviera a ejecutarse sobrescribiría este cambio
+        Survey.objects.update(calificacion=2)
+        segunda = self.client.post('/api/encuestas/enviar/', datos, format='json')
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.data, primera.data)
+        self.assertEqual(list(Survey.objects.values_list('calificacion', flat=True)), [2])
+
+        # La misma clave de otro usuario no repite la respuesta del anónimo
+        self.client.force_authenticate(crear_cliente('ana'))
+        tercera = self.client.post('/api/encuestas/enviar/', datos, format='json')
+        self.assertEqual(tercera.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', tercera)
+        self.assertEqual(list(Survey.objects.values_list('calificacion', flat=True)), [5])
+
+
+class AppointmentEndTimeTests(TestCase):
+    """Pruebas de la hora de fin almacenada en las citas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+        cls.barbero = crear_barbero('barbero')
+
+    def test_fin_segun_servicio_duracion_o_paquete(self):
+        cita = Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10))
+        self.assertEqual(cita.fecha_hora_fin, fecha_local(2026, 3, 7, 10, 45))
+
+        cita = Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, duracion=90, fecha_hora=fecha_local(2026, 3, 7, 12))
+        self.assertEqual(cita.fecha_hora_fin, fecha_local(2026, 3, 7, 13, 30))
+
+        paquete = Package.objects.create(nombre='Combo', descripcion='Corte y barba', precio=250)
+        paquete.servicios.add(self.servicio, Service.objects.create(nombre='Barba', descripcion='Barba', precio=100, duracion=30))
+        cita = Appointment.objects.create(barbero=self.barbero, paquete=paquete, fecha_hora=fecha_local(2026, 3, 7, 15))
+        self.assertEqual(cita.fecha_hora_fin, fecha_local(2026, 3, 7, 16, 15))
+
+    def test_fin_se_recalcula_al_mover(self):
+        cita = Appointment.objects.create(barbero=self.barbero, servicio=self.servicio, fecha_hora=fecha_local(2026, 3, 7, 10))
+        cita.fecha_hora = fecha_local(2026, 3, 7, 11)
+        cita.save(update_fields=['fecha_hora'])
+        cita.refresh_from_db()
+        self.assertEqual(cita.fecha_hora_fin, fecha_local(2026, 3, 7, 11, 45))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere restricciones de exclusión de PostgreSQL')
+class OverlapConstraintTests(APITestCase):
+    """La base de datos rechaza citas solapadas aunque se creen fuera de la agenda pública"""
+
+    @classmethod
+    def setUpTestData(cls):
+        migracion = importlib.import_module('usuarios.migrations.0022_appointment_fin_and_overlap_constraint')
+        try:
+            with transaction.atomic(), connection.schema_editor() as schema_editor:
+                schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+                migracion.crear_restriccion(None, schema_editor)
+        except DatabaseError:
+            cls.restriccion = False
+        else:
+            cls.restriccion = True
+        cls.admin = CustomUser.objects.create(username='admin', rol='admin')
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=60)
+        cls.barbero = crear_barbero('barbero')
+
+    def setUp(self):
+        if not self.restriccion:
+            self.skipTest('La extensión btree_gist no está disponible')
+        self.client.force_authenticate(self.admin)
+
+    def crear(self, hora, **datos):
+        return self.client.post('/api/citas/', {
+            'barbero_id': self.barbero.id,
+            'servicio_id': self.servicio.id,
+            'fecha_hora': fecha_local(2026, 3, 7, *hora).isoformat(),
+            'estado': 'agendada',
+            **datos
+        }, format='json')
+
+    def test_solapamiento_responde_409(self):
+        self.assertEqual(self.crear((10,)).status_code, 201)
+        self.assertEqual(self.crear((10, 30)).status_code, 409)
+        self.assertEqual(self.crear((11,)).status_code, 201)
+        # Las citas canceladas no ocupan el horario
+        self.assertEqual(self.crear((10, 30), estado='cancelada').status_code, 201)
+
+
+class SlotHoldTests(APITestCase):
+    """Pruebas de reservas temporales de horarios"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=60)
+        cls.barbero = crear_barbero('barbero')
+        cls.ana = crear_cliente('ana')
+        cls.luis = crear_cliente('luis')
+
+    def apartar(self, user, hora='10:00'):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/citas/reservas-temporales/', {
+            'servicio_id': self.servicio.id,
+            'barbero_id': self.barbero.id,
+            'fecha': '2026-03-07',
+            'hora': hora,
+        }, format='json')
+
+    def horas_libres(self, **params):
+        response = self.client.get('/api/citas/horarios-disponibles/', {
+            'fecha': '2026-03-07', 'barbero_id': self.barbero.id, 'duracion': 60, **params
+        })
+        return [slot['hora'] for slot in response.data['horarios_disponibles']]
+
+    def test_horario_apartado_cuenta_como_ocupado(self):
+        response = self.apartar(self.ana)
+        self.assertEqual(response.status_code, 201)
+        token = response.data['reserva_token']
+
+        self.assertNotIn('10:00', self.horas_libres())
+        self.assertIn('10:00', self.horas_libres(reserva_token=token))
+        self.assertEqual(self.apartar(self.luis, hora='10:30').status_code, 409)
+
+        # Sólo quien apartó el horario puede agendarlo con su token
+        self.client.force_authenticate(self.ana)
+        response = self.client.post('/api/citas/agendar/', {
+            'servicio_id': self.servicio.id,
+            'barbero_id': self.barbero.id,
+            'fecha': '2026-03-07',
+            'hora': '10:00',
+            'reserva_token': token,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_reserva_vencida_no_bloquea_y_se_limpia(self):
+        self.apartar(self.ana)
+        SlotHold.objects.update(expira=timezone.now() - timedelta(seconds=1))
+
+        self.assertIn('10:00', self.horas_libres())
+        self.assertEqual(self.apartar(self.luis).status_code, 201)
+        self.assertEqual(list(SlotHold.objects.values_list('usuario', flat=True)), [self.luis.id])
+
+    def test_duracion_del_servicio_o_paquete_y_limites(self):
+        paquete = Package.objects.create(nombre='Combo', descripcion='Corte y barba', precio=250)
+        paquete.servicios.add(self.servicio, Service.objects.create(nombre='Barba', descripcion='Arreglo', precio=80, duracion=30))
+
+        def apartar(**datos):
+            return self.client.post('/api/citas/reservas-temporales/', {
+                'barbero_id': self.barbero.id, 'fecha': '2026-03-07', 'hora': '10:00', **datos
+            }, format='json')
+
+        self.client.force_authenticate(self.ana)
+        # La duración del cliente se ignora si hay servicio o paquete
+        response = apartar(servicio_id=self.servicio.id, duracion=5)
+        self.assertEqual(response.data['fecha_hora_fin'] - response.data['fecha_hora'], timedelta(minutes=60))
+        response = apartar(paquete_id=paquete.id, duracion=600)
+        self.assertEqual(response.data['fecha_hora_fin'] - response.data['fecha_hora'], timedelta(minutes=90))
+
+        for duracion in (5, 61, 'x'):
+            self.assertEqual(apartar(duracion=duracion).status_code, 400, duracion)
+        response = apartar(duracion=30)
+        self.assertEqual(response.data['fecha_hora_fin'] - response.data['fecha_hora'], timedelta(minutes=30))
+
+    def test_liberar_reserva(self):
+        token = self.apartar(self.ana).data['reserva_token']
+        self.client.force_authenticate(self.luis)
+        self.assertEqual(self.client.delete(f'/api/citas/reservas-temporales/{token}/').status_code, 404)
+        self.client.force_authenticate(self.ana)
+        self.assertEqual(self.client.delete(f'/api/citas/reservas-temporales/{token}/').status_code, 204)
+        self.assertIn('10:00', self.horas_libres())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere bloqueos de fila de PostgreSQL')
+class ConcurrentBookingTests(TransactionTestCase):
+    """Reservas simultáneas del mismo horario contra PostgreSQL: sólo una debe ganar"""
+
+    reservas_simultaneas = 12
+
+    def test_solo_una_reserva_gana(self):
+        servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=60)
+        barbero = crear_barbero('barbero')
+        clientes = [crear_cliente(f'cliente{i}') for i in range(self.reservas_simultaneas)]
+        barrera = threading.Barrier(len(clientes))
+        resultados = []
+
+        def reservar(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrera.wait()
+                response = client.post('/api/citas/agendar/', {
+                    'servicio_id': servicio.id,
+                    'barbero_id': barbero.id,
+                    'fecha': '2026-03-07',
+                    'hora': '10:00',
+                }, format='json')
+                resultados.append(response.status_code)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=reservar, args=(user,)) for user in clientes]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(sorted(resultados), [201] + [409] * (len(clientes) - 1))
+        self.assertEqual(Appointment.objects.filter(barbero=barbero).count(), 1)
+
+    def test_ocupacion_bloquea_el_dia_antes_de_leer(self):
+        """La segunda escritura espera el bloqueo del día y ve la cita de la primera"""
+        barbero = crear_barbero('barbero')
+        cliente = crear_cliente('cliente').client_profile
+        primera_creada = threading.Event()
+
+        def agendar(hora, esperar=None):
+            try:
+                if esperar:
+                    esperar.wait()
+                with transaction.atomic():
+                    Appointment.objects.create(barbero=barbero, cliente=cliente, fecha_hora=fecha_local(2026, 3, 7, hora))
+                    if not esperar:
+                        primera_creada.set()
+                        threading.Event().wait(0.3)
+            finally:
+                connection.close()
+
+        hilos = [
+            threading.Thread(target=agendar, args=(10,)),
+            threading.Thread(target=agendar, args=(12, primera_creada)),
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        ocupacion = BarberDayOccupancy.objects.get(barbero=barbero, fecha=date(2026, 3, 7))
+        self.assertEqual(ocupacion.intervalos, [[600, 660], [720, 780]])
+
+
+@override_settings(PRESUPUESTO_CONSULTAS_ESTRICTO=True)
+class QueryBudgetTests(APITestCase):
+    """Cada endpoint respeta su presupuesto de consultas con un conjunto de datos de varias filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username='admin', rol='admin')
+        servicios = [
+            Service.objects.create(nombre=f'Servicio {i}', descripcion='Servicio', precio=100 + i, duracion=30)
+            for i in range(3)
+        ]
+        producto = Product.objects.create(nombre='Cera', descripcion='Cera para cabello', precio=90)
+        paquete = Package.objects.create(nombre='Combo', descripcion='Corte y barba', precio=250)
+        paquete.servicios.set(servicios[:2])
+        paquete.productos.add(producto)
+        WebsiteContent.objects.create(tipo_contenido='inicio_titulo', contenido='Bienvenido')
+
+        cls.barberos = [crear_barbero(f'barbero{i}') for i in range(3)]
+        cls.clientes = [crear_cliente(f'cliente{i}') for i in range(3)]
+        for i in range(12):
+            cita = Appointment.objects.create(
+                barbero=cls.barberos[i % 3],
+                cliente=cls.clientes[i % 3].client_profile,
+                servicio=servicios[i % 3] if i % 2 else None,
+                paquete=None if i % 2 else paquete,
+                fecha_hora=fecha_local(2026, 3, 2 + i, 10),
+                estado='completada' if i < 8 else 'agendada',
+            )
+            cita.productos.add(producto)
+            AppointmentAlert.objects.create(appointment=cita)
+            if i < 6:
+                Survey.objects.create(appointment=cita, calificacion=5)
+        cls.cita = cita
+
+    def setUp(self):
+        cache.clear()
+
+    def assertDentroDelPresupuesto(self, usuario, url, params=None):
+        self.assertIsNotNone(presupuesto_de_vista(resolve(url).func, 'GET'), f'{url} no declara presupuesto')
+        self.client.force_authenticate(usuario)
+        # El middleware lanza PresupuestoExcedido si la vista supera su presupuesto
+        response = self.client.get(url, params or {})
+        self.assertLess(response.status_code, 400, url)
+
+    def test_endpoints_publicos(self):
+        barbero = self.barberos[0]
+        for url, params in [
+            ('/api/servicios/', None),
+            ('/api/productos/', None),
+            ('/api/paquetes/', None),
+            ('/api/galeria/', None),
+            ('/api/testimonios/', None),
+            ('/api/secciones/', None),
+            ('/api/contenido/', None),
+            ('/api/contenido/mapa/', None),
+            ('/api/publico/sitio/', None),
+            ('/api/citas/horarios-disponibles/', {'fecha': '2026-03-20', 'barbero_id': barbero.id}),
+            ('/api/citas/horarios-disponibles/rango/', {'desde': '2026-03-01', 'hasta': '2026-03-31', 'barbero_id': barbero.id}),
+            ('/api/encuestas/info/', {'token': self.cita.survey_token}),
+            (f'/api/qr/{barbero.qr_token}/', None),
+        ]:
+            with self.subTest(url=url):
+                self.assertDentroDelPresupuesto(None, url, params)
+
+    def test_endpoints_de_administrador(self):
+        for url, params in [
+            ('/api/citas/', None),
+            ('/api/citas/', {'expand': 'cliente,barbero,servicio,paquete,productos'}),
+            (f'/api/citas/{self.cita.id}/', None),
+            ('/api/citas/cambios/', {
+                'desde': (timezone.now() - timedelta(days=1)).isoformat(),
+                'expand': 'cliente,barbero,servicio,paquete,productos',
+            }),
+            ('/api/encuestas/', None),
+            ('/api/disponibilidad/', {'fecha': '2026-03-20'}),
+            ('/api/admin/estadisticas-generales/', {'fresh': '1'}),
+            ('/api/admin/series/', {'periodo': 'semana', 'desde': '2026-03-01', 'hasta': '2026-03-31'}),
+            ('/api/admin/usuarios/', None),
+            ('/api/admin/servicios/', None),
+            ('/api/admin/alertas/', None),
+            ('/api/admin/contenido-sitio/', None),
+        ]:
+            with self.subTest(url=url):
+                self.assertDentroDelPresupuesto(self.admin, url, params)
+
+    def test_endpoints_de_barbero_y_cliente(self):
+        barbero = self.barberos[0]
+        for usuario, url in [
+            (barbero.user, '/api/citas/'),
+            (barbero.user, '/api/estadisticas/'),
+            (self.clientes[0], '/api/citas/'),
+            (self.clientes[0], '/api/encuestas/'),
+            (self.clientes[0], '/api/promociones/'),
+            (self.clientes[0], f'/api/qr/{barbero.qr_token}/encuesta/'),
+        ]:
+            with self.subTest(url=url, rol=usuario.rol):
+                self.assertDentroDelPresupuesto(usuario, url)
+
+    @override_settings(DEBUG=True)
+    def test_cabeceras_en_debug(self):
+        response = self.client.get('/api/contenido/mapa/')
+        self.assertEqual(response['X-Consultas-SQL'], '1')
+        self.assertEqual(response['X-Presupuesto-Consultas'], '2')
+
+
+class WebSocketTests(TransactionTestCase):
+    """
+    Pruebas de los WebSocket de alertas y de agenda. Sin transacción envolvente:
+    los consumidores cierran las conexiones viejas y los avisos esperan al commit.
+    """
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create(username='admin', rol='admin')
+        self.barbero = crear_barbero('barbero')
+        servicio = Service.objects.create(nombre='Corte', descripcion='Corte clásico', precio=150, duracion=45)
+        self.cita = Appointment.objects.create(
+            barbero=self.barbero, servicio=servicio, fecha_hora=timezone.now() + timedelta(days=1),
+            nombre_cliente='Invitado', telefono_cliente='5512345678',
+        )
+        self.alerta = AppointmentAlert.objects.create(appointment=self.cita)
+
+    async def conectar(self, user, path='/ws/admin/alertas/'):
+        comunicador = ApplicationCommunicator(application, {
+            'type': 'websocket',
+            'path': path,
+            'query_string': f'token={AccessToken.for_user(user)}'.encode(),
+            'headers': [],
+            'subprotocols': [],
+        })
+        await comunicador.send_input({'type': 'websocket.connect'})
+        return comunicador
+
+    async def desconectar(self, comunicador):
+        await comunicador.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await comunicador.wait(timeout=1)
+
+    async def recibir(self, comunicador):
+        salida = await comunicador.receive_output(timeout=1)
+        self.assertEqual(salida['type'], 'websocket.send')
+        return json.loads(salida['text'])
+
+    def test_check_deploy_avisa_de_la_capa_en_memoria(self):
+        self.assertEqual([aviso.id for aviso in revisar_capa_de_canales(None)], ['usuarios.W001'])
+        redis = {'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer'}}
+        with override_settings(CHANNEL_LAYERS=redis):
+            self.assertEqual(revisar_capa_de_canales(None), [])
+
+    async def test_envia_pendientes_y_cambios_confirmados(self):
+        comunicador = await self.conectar(self.admin)
+        self.assertEqual((await comunicador.receive_output(timeout=1))['type'], 'websocket.accept')
+        inicial = await self.recibir(comunicador)
+        self.assertEqual([alerta['id'] for alerta in inicial['alertas']], [self.alerta.id])
+        self.assertEqual(inicial['alertas'][0]['cliente_nombre'], 'Invitado')
+
+        def cancelar():
+            self.cita.estado = 'cancelada'
+            self.cita.save()
+        await sync_to_async(cancelar)()
+        self.assertEqual(await self.recibir(comunicador), {'tipo': 'alerta_retirada', 'id': self.alerta.id})
+        await self.desconectar(comunicador)
+
+    async def test_solo_administradores(self):
+        comunicador = await self.conectar(self.barbero.user)
+        salida = await comunicador.receive_output(timeout=1)
+        self.assertEqual((salida['type'], salida['code']), ('websocket.close', 4403))
+        await self.desconectar(comunicador)
+
+    async def test_agenda_del_barbero(self):
+        comunicador = await self.conectar(self.barbero.user, '/ws/barbero/agenda/')
+        self.assertEqual((await comunicador.receive_output(timeout=1))['type'], 'websocket.accept')
+
+        cita = await sync_to_async(Appointment.objects.create)(
+            barbero=self.barbero, servicio=self.cita.servicio, fecha_hora=self.cita.fecha_hora + timedelta(hours=2),
+        )
+        creada = await self.recibir(comunicador)
+        self.assertEqual((creada['tipo'], creada['cita']['id']), ('cita_creada', cita.id))
+        self.assertEqual(creada['cita']['servicio']['nombre'], 'Corte')
+
+        def cancelar_y_borrar():
+            # Sin cambios visibles en la agenda no se publica nada
+            cita.survey_token = 'token-de-encuesta'
+            cita.save(update_fields=['survey_token'])
+            cita.estado = 'cancelada'
+            cita.save()
+            cita_id = cita.pk
+            cita.delete()
+            return cita_id
+        cita_id = await sync_to_async(cancelar_y_borrar)()
+        self.assertEqual((await self.recibir(comunicador))['tipo'], 'cita_cancelada')
+        self.assertEqual(await self.recibir(comunicador), {'tipo': 'cita_eliminada', 'id': cita_id})
+        await self.desconectar(comunicador)
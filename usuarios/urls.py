@@ -22,7 +22,10 @@ router.register(r'secciones', views.PageSectionViewSet)
 urlpatterns = [
     # Endpoints específicos que deben evaluarse antes del router
     path('citas/horarios-disponibles/', views.get_available_slots, name='available_slots'),
+    path('citas/horarios-disponibles/rango/', views.get_available_slots_range, name='available_slots_range'),
     path('citas/agendar/', views.schedule_appointment, name='schedule_appointment'),
+    path('citas/reservas-temporales/', views.create_slot_hold, name='create_slot_hold'),
+    path('citas/reservas-temporales/<str:token>/', views.release_slot_hold, name='release_slot_hold'),
     path('encuestas/info/', views.get_public_survey_info, name='public_survey_info'),
     path('encuestas/enviar/', views.submit_public_survey, name='public_survey_submit'),
 
@@ -40,9 +43,11 @@ urlpatterns = [
     path('disponibilidad/', views.get_barber_availability, name='barber_availability'),
     path('estadisticas/', views.get_barber_stats, name='barber_stats'),
     path('promociones/', views.check_promotions, name='check_promotions'),
+    path('publico/sitio/', views.public_site_bundle, name='public_site_bundle'),
 
     # Rutas de administración
     path('admin/estadisticas-generales/', views.admin_estadisticas_generales, name='admin_stats'),
+    path('admin/series/', views.admin_series, name='admin_series'),
     path('admin/dashboard/', views.admin_dashboard_data, name='admin_dashboard'),
     path('admin/contenido-sitio/', views.admin_contenido_sitio, name='admin_content'),
     path('admin/usuarios/', views.admin_users_management, name='admin_users'),
@@ -0,0 +1,122 @@
+"""
+Caché invalidada por versión de modelo.
+
+Cada modelo registrado tiene un contador de versión en la caché que las señales
+post_save, post_delete y m2m_changed incrementan al confirmar la transacción.
+Las claves de caché incluyen las versiones de los modelos de los que dependen,
+así que un cambio deja inaccesibles las entradas anteriores sin borrarlas una
+por una (expiran solas).
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.http import parse_http_date
+from rest_framework.response import Response
+
+from .condicional import agregar_validadores, respuesta_no_modificada
+
+TIEMPO_CACHE_VERSIONADA = 60 * 60 * 24
+
+
+def _clave_version(modelo):
+    return f'usuarios:version:{modelo._meta.label_lower}'
+
+
+def _version_inicial():
+    # Si la caché pierde el contador, el nuevo valor nunca repite uno anterior
+    return time.time_ns() // 1000
+
+
+def versiones(*modelos):
+    """Versiones actuales de los modelos (en una sola lectura de la caché)"""
+    claves = [_clave_version(modelo) for modelo in modelos]
+    actuales = cache.get_many(claves)
+    resultado = []
+    for clave in claves:
+        version = actuales.get(clave)
+        if version is None:
+            version = _version_inicial()
+            if not cache.add(clave, version, None):
+                version = cache.get(clave, version)
+        resultado.append(version)
+    return resultado
+
+
+def renovar_version(modelo):
+    clave = _clave_version(modelo)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, _version_inicial(), None)
+
+
+def clave_versionada(modelos, *partes):
+    """Clave de caché que cambia cuando cambia cualquiera de los modelos"""
+    firma = '.'.join(str(version) for version in versiones(*modelos))
+    detalle = hashlib.md5(':'.join(str(parte) for parte in partes).encode('utf-8')).hexdigest()
+    return f'usuarios:versionada:{firma}:{detalle}'
+
+
+def registrar_modelo_versionado(modelo):
+    """Conecta las señales que renuevan la versión del modelo (incluidas sus relaciones muchos a muchos)"""
+    def renovar(sender, **kwargs):
+        if kwargs.get('action', 'post_').startswith('pre_'):
+            return
+        transaction.on_commit(lambda: renovar_version(modelo))
+
+    uid = f'version_{modelo._meta.label_lower}'
+    post_save.connect(renovar, sender=modelo, weak=False, dispatch_uid=f'{uid}_guardar')
+    post_delete.connect(renovar, sender=modelo, weak=False, dispatch_uid=f'{uid}_borrar')
+    for campo in modelo._meta.local_many_to_many:
+        m2m_changed.connect(
+            renovar,
+            sender=campo.remote_field.through,
+            weak=False,
+            dispatch_uid=f'{uid}_{campo.name}'
+        )
+
+
+class ListaEnCacheMixin:
+    """
+    Sirve desde caché el listado de un ViewSet para visitantes anónimos.
+
+    La clave depende de la versión del modelo del queryset, de los modelos en
+    `modelos_cache` (p. ej. los anidados por el serializador) y de la URL
+    completa, de modo que cada página y filtro tiene su propia entrada. Si la
+    respuesta lleva ETag (ver condicional.py) se guarda con ella, y un acierto
+    en caché puede responder 304 sin tocar la base de datos.
+    """
+    modelos_cache = ()
+    tiempo_cache = TIEMPO_CACHE_VERSIONADA
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        modelos = (self.queryset.model, *self.modelos_cache)
+        clave = clave_versionada(modelos, 'listado', request.get_host(), request.get_full_path())
+        guardado = cache.get(clave)
+        if guardado is not None:
+            etag, ultima = guardado['etag'], guardado['ultima_modificacion']
+            if etag:
+                no_modificado = respuesta_no_modificada(request, etag, ultima)
+                if no_modificado is not None:
+                    return no_modificado
+            response = Response(guardado['datos'])
+            if etag:
+                agregar_validadores(response, etag, ultima)
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            ultima = response.get('Last-Modified')
+            cache.set(clave, {
+                'datos': response.data,
+                'etag': response.get('ETag'),
+                'ultima_modificacion': parse_http_date(ultima) if ultima else None,
+            }, self.tiempo_cache)
+        return response
@@ -1,6 +1,9 @@
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
-from django.db.models import Avg, Count, Q, Sum
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, Max, Q, Sum
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -24,11 +27,55 @@ from .models import (
     SystemSettings,
     PageSection,
     AppointmentAlert,
+    SlotHold,
+    BarberDailyStats,
 )
 from .serializers import (
     CustomUserSerializer, ClientProfileSerializer, BarberProfileSerializer,
-    ServiceSerializer, ProductSerializer, PackageSerializer, AppointmentSerializer, SurveySerializer, WebsiteContentSerializer,
-    GalleryImageSerializer, SystemSettingsSerializer, TestimonialSerializer, PageSectionSerializer
+    ServiceSerializer, ProductSerializer, PackageSerializer, AppointmentSerializer, AppointmentListSerializer,
+    SurveySerializer, WebsiteContentSerializer,
+    GalleryImageSerializer, SystemSettingsSerializer, TestimonialSerializer, PageSectionSerializer,
+    parametro_lista,
+)
+from .alertas import alertas_pendientes, datos_alerta
+from .condicional import ListaCondicionalMixin
+from .contenido import contenido_sitio
+from .idempotencia import idempotente
+from .paginacion import PaginacionCitas, PaginacionEncuestas
+from .presupuesto import presupuesto_consultas
+from .sincronizacion import (
+    MAXIMO_CAMBIOS,
+    CursorInvalido,
+    citas_eliminadas,
+    cursor_actual,
+    cursor_caducado,
+    cursor_desde,
+    despues_del_cursor,
+    leer_desde,
+)
+from .estadisticas import (
+    CLAVE_CACHE_ESTADISTICAS_GENERALES,
+    TIEMPO_CACHE_ESTADISTICAS_GENERALES,
+    resumen_por_barbero,
+    totales_de_barbero,
+)
+from .fechas import dias_del_mes
+from .series import MAX_PERIODOS_SERIE, PERIODOS, periodos_entre, serie
+from .sitio import paquete_sitio, version_sitio
+from .versiones import ListaEnCacheMixin, renovar_version, versiones
+from .disponibilidad import (
+    DURACION_POR_DEFECTO,
+    ESTADOS_ACTIVOS,
+    PASO_POR_DEFECTO,
+    bloquear_dia,
+    duracion_reserva_temporal,
+    es_solapamiento,
+    horarios_del_dia,
+    horarios_libres,
+    horarios_por_rango,
+    limpiar_reservas_vencidas,
+    ocupados_del_dia,
+    trabaja_el_dia,
 )
 
 # ViewSets para la API REST
@@ -62,14 +109,16 @@ class BarberProfileViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
+@presupuesto_consultas(list=4, retrieve=2)
+class ServiceViewSet(ListaEnCacheMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     """ViewSet para servicios"""
     queryset = Service.objects.filter(activo=True)
     serializer_class = ServiceSerializer
     permission_classes = [AllowAny]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+@presupuesto_consultas(list=4, retrieve=2)
+class ProductViewSet(ListaEnCacheMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     """ViewSet para productos"""
     queryset = Product.objects.all().order_by('-fecha_creacion')
     serializer_class = ProductSerializer
@@ -93,10 +142,14 @@ class ProductViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 
-class PackageViewSet(viewsets.ModelViewSet):
+@presupuesto_consultas(list=6, retrieve=4)
+class PackageViewSet(ListaEnCacheMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     """ViewSet para paquetes"""
     queryset = Package.objects.all().order_by('-fecha_creacion')
     serializer_class = PackageSerializer
+    # El serializador anida servicios y productos
+    modelos_cache = (Service, Product)
+    campos_actualizacion = ('fecha_actualizacion', 'servicios__fecha_actualizacion', 'productos__fecha_actualizacion')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -117,25 +170,55 @@ class PackageViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 
+@presupuesto_consultas(list=6, retrieve=5, cambios=6)
 class AppointmentViewSet(viewsets.ModelViewSet):
     """ViewSet para citas"""
     queryset = Appointment.objects.all().select_related(
         'cliente__user',
         'barbero__user',
-        'servicio'
+        'servicio',
+        'paquete',
+        'survey'
     ).prefetch_related('productos')
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginacionCitas
+
+    def get_serializer_class(self):
+        # Los listados usan la representación compacta (?fields= / ?expand=)
+        if self.action in ('list', 'cambios'):
+            return AppointmentListSerializer
+        return AppointmentSerializer
 
     def get_queryset(self):
         user = self.request.user
         base_queryset = super().get_queryset()
+        if self.action not in ('list', 'cambios') or 'paquete' in parametro_lista(self.request, 'expand'):
+            base_queryset = base_queryset.prefetch_related('paquete__servicios', 'paquete__productos')
         if user.rol == 'cliente':
             return base_queryset.filter(cliente__user=user)
         elif user.rol == 'barbero':
             return base_queryset.filter(barbero__user=user)
         return base_queryset
 
+    def create(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().create(request, *args, **kwargs)
+        except IntegrityError as error:
+            if not es_solapamiento(error):
+                raise
+            return Response({'error': 'El barbero ya tiene una cita en ese horario'}, status=status.HTTP_409_CONFLICT)
+
+    def update(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except IntegrityError as error:
+            if not es_solapamiento(error):
+                raise
+            return Response({'error': 'El barbero ya tiene una cita en ese horario'}, status=status.HTTP_409_CONFLICT)
+
     def perform_create(self, serializer):
         """Crear cita y actualizar contador de cortes del cliente"""
         appointment = serializer.save()
@@ -181,23 +264,75 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if not appointment.survey_token:
             appointment.save(update_fields=['survey_token'])
 
+    @action(detail=False, methods=['get'])
+    def cambios(self, request):
+        """
+        Citas creadas, modificadas o borradas desde el cursor `desde` (ver sincronizacion.py).
+        Acepta ?fields= y ?expand= como el listado.
+        """
+        if 'desde' not in request.query_params:
+            return Response({'cursor': cursor_desde(cursor_actual())})
+
+        try:
+            desde, ultimo_id = leer_desde(request.query_params['desde'])
+        except CursorInvalido:
+            return Response({'error': 'Parámetro desde inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        if cursor_caducado(desde):
+            return Response(
+                {'error': 'La última sincronización es demasiado antigua; vuelve a cargar las citas'},
+                status=status.HTTP_410_GONE
+            )
+
+        citas = list(
+            self.get_queryset()
+            .filter(despues_del_cursor(desde, ultimo_id))
+            .order_by('fecha_actualizacion', 'id')[:MAXIMO_CAMBIOS + 1]
+        )
+        hay_mas = len(citas) > MAXIMO_CAMBIOS
+        citas = citas[:MAXIMO_CAMBIOS]
+        # Con más cambios pendientes se continúa después de la última cita devuelta
+        if hay_mas:
+            cursor = cursor_desde(citas[-1].fecha_actualizacion, citas[-1].id)
+        else:
+            cursor = cursor_desde(cursor_actual(desde))
+
+        return Response({
+            'cursor': cursor,
+            'hay_mas': hay_mas,
+            'citas': self.get_serializer(citas, many=True).data,
+            'eliminadas': citas_eliminadas(request.user, desde, self.get_queryset()),
+        })
+
 
+@presupuesto_consultas(list=6, retrieve=5)
 class SurveyViewSet(viewsets.ModelViewSet):
     """ViewSet para encuestas"""
-    queryset = Survey.objects.all()
+    # La cita se serializa completa (cliente, barbero, servicio, paquete y productos)
+    queryset = Survey.objects.select_related(
+        'appointment__cliente__user',
+        'appointment__barbero__user',
+        'appointment__servicio',
+        'appointment__paquete'
+    ).prefetch_related(
+        'appointment__productos',
+        'appointment__paquete__servicios',
+        'appointment__paquete__productos'
+    )
     serializer_class = SurveySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginacionEncuestas
 
     def get_queryset(self):
         user = self.request.user
         if user.rol == 'cliente':
-            return Survey.objects.filter(appointment__cliente__user=user)
+            return self.queryset.filter(appointment__cliente__user=user)
         if user.rol == 'barbero':
-            return Survey.objects.filter(appointment__barbero__user=user)
-        return Survey.objects.all()
+            return self.queryset.filter(appointment__barbero__user=user)
+        return self.queryset.all()
 
 
-class WebsiteContentViewSet(viewsets.ModelViewSet):
+@presupuesto_consultas(list=4, retrieve=2, mapa=2)
+class WebsiteContentViewSet(ListaEnCacheMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     """ViewSet para contenido del sitio web"""
     queryset = WebsiteContent.objects.all()
     serializer_class = WebsiteContentSerializer
@@ -209,24 +344,29 @@ class WebsiteContentViewSet(viewsets.ModelViewSet):
         Si no está autenticado (web pública), solo muestra activos.
         """
         if self.request.user.is_authenticated:
-            queryset = WebsiteContent.objects.all().order_by('tipo_contenido')
-        else:
-            queryset = WebsiteContent.objects.filter(activo=True).order_by('tipo_contenido')
-            # Log para depuración
-            maps_url_item = queryset.filter(tipo_contenido='ubicacion_maps_url').first()
-            if maps_url_item:
-                print(f"[DEBUG] ubicacion_maps_url encontrado en queryset público: activo={maps_url_item.activo}, contenido={maps_url_item.contenido[:50] if maps_url_item.contenido else 'vacio'}")
-            else:
-                print(f"[DEBUG] ubicacion_maps_url NO encontrado en queryset público")
-                # Verificar si existe pero está inactivo
-                all_maps = WebsiteContent.objects.filter(tipo_contenido='ubicacion_maps_url')
-                print(f"[DEBUG] Total registros ubicacion_maps_url: {all_maps.count()}")
-                for item in all_maps:
-                    print(f"[DEBUG]   - ID: {item.id}, Activo: {item.activo}, Contenido: {item.contenido[:50] if item.contenido else 'vacio'}")
-        return queryset
-
-
-class TestimonialViewSet(viewsets.ModelViewSet):
+            return WebsiteContent.objects.all().order_by('tipo_contenido')
+        return WebsiteContent.objects.filter(activo=True).order_by('tipo_contenido')
+
+    @action(detail=False, methods=['get'])
+    def mapa(self, request):
+        """Todas las claves activas como {tipo_contenido: elemento}, sin paginar y sin consultar la base de datos"""
+        etag = f'"contenido-{versiones(WebsiteContent)[0]}"'
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            no_modificado['ETag'] = etag
+            return no_modificado
+
+        elementos = WebsiteContentSerializer(
+            list(contenido_sitio().values()), many=True, context={'request': request}
+        ).data
+        response = Response({item['tipo_contenido']: item for item in elementos})
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'
+        return response
+
+
+@presupuesto_consultas(list=3, retrieve=2)
+class TestimonialViewSet(ListaEnCacheMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     """ViewSet para testimonios"""
     queryset = Testimonial.objects.all()
     serializer_class = TestimonialSerializer
@@ -242,7 +382,8 @@ class TestimonialViewSet(viewsets.ModelViewSet):
         return Testimonial.objects.filter(activo=True).order_by('-fecha_creacion')
 
 
-class GalleryImageViewSet(viewsets.ModelViewSet):
+@presupuesto_consultas(list=3, retrieve=2)
+class GalleryImageViewSet(ListaEnCacheMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     """ViewSet para imágenes de galería"""
     queryset = GalleryImage.objects.all()
     serializer_class = GalleryImageSerializer
@@ -270,7 +411,8 @@ class SystemSettingsViewSet(viewsets.ModelViewSet):
         return SystemSettings.objects.none()
 
 
-class PageSectionViewSet(viewsets.ModelViewSet):
+@presupuesto_consultas(list=3, retrieve=2)
+class PageSectionViewSet(ListaEnCacheMixin, ListaCondicionalMixin, viewsets.ModelViewSet):
     """ViewSet para secciones de página"""
     queryset = PageSection.objects.all()
     serializer_class = PageSectionSerializer
@@ -283,6 +425,24 @@ class PageSectionViewSet(viewsets.ModelViewSet):
         return PageSection.objects.all().order_by('orden')
 
 
+@presupuesto_consultas(9)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def public_site_bundle(request):
+    """Contenido público del sitio en una sola respuesta, con ETag ligado a su versión"""
+    etag = f'"sitio-{version_sitio()}"'
+    no_modificado = get_conditional_response(request, etag=etag)
+    if no_modificado is not None:
+        no_modificado['ETag'] = etag
+        return no_modificado
+
+    version, datos = paquete_sitio(request)
+    response = Response(datos)
+    response['ETag'] = f'"sitio-{version}"'
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
 # Vista personalizada de login que acepta tanto username como email
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -337,6 +497,7 @@ def custom_login(request):
     })
 
 # Vistas personalizadas adicionales
+@presupuesto_consultas(5)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_barber_availability(request):
@@ -352,37 +513,34 @@ def get_barber_availability(request):
     except ValueError:
         return Response({'error': 'Formato de fecha inválido'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Obtener barberos activos
-    barberos = BarberProfile.objects.filter(activo=True)
-
-    disponibilidad = []
-    for barbero in barberos:
-        # Verificar si el barbero trabaja ese día
-        dia_semana = fecha.strftime('%A').lower()
-        if dia_semana not in [d.lower() for d in barbero.dias_laborales]:
-            continue
-
-        # Obtener citas existentes para ese día
-        citas_del_dia = Appointment.objects.filter(
-            barbero=barbero,
-            fecha_hora__date=fecha,
-            estado__in=['agendada', 'confirmada']
-        )
-
-        # Calcular horarios disponibles
-        horarios_disponibles = calcular_horarios_disponibles(
-            barbero, fecha, citas_del_dia, servicio_id
-        )
+    duracion = PASO_POR_DEFECTO
+    if servicio_id and str(servicio_id).isdigit():
+        servicio = Service.objects.filter(id=servicio_id).only('duracion').first()
+        if servicio:
+            duracion = servicio.duracion
 
-        disponibilidad.append({
-            'barbero_id': barbero.id,
-            'barbero_nombre': barbero.user.get_full_name(),
-            'horarios_disponibles': horarios_disponibles
-        })
+    # Barberos activos que trabajan ese día (una sola consulta con su usuario)
+    barberos = [
+        barbero
+        for barbero in BarberProfile.objects.filter(activo=True).select_related('user')
+        if trabaja_el_dia(barbero, fecha)
+    ]
+    if not barberos:
+        return Response([])
+
+    disponibilidad = [
+        {
+            'barbero_id': item['barbero']['id'],
+            'barbero_nombre': item['barbero']['nombre'],
+            'horarios_disponibles': item['dias'][0]['horarios_disponibles']
+        }
+        for item in horarios_por_rango(barberos, fecha, fecha, duracion)
+    ]
 
     return Response(disponibilidad)
 
 
+@presupuesto_consultas(4)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_barber_stats(request):
@@ -393,31 +551,18 @@ def get_barber_stats(request):
 
     barbero = get_object_or_404(BarberProfile, user=user)
 
-    # Estadísticas del mes actual
-    fecha_actual = timezone.now()
-    inicio_mes = fecha_actual.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-    citas_mes = Appointment.objects.filter(
-        barbero=barbero,
-        fecha_hora__gte=inicio_mes,
-        estado='completada'
-    )
-
-    # Estadísticas generales
-    citas_totales = Appointment.objects.filter(barbero=barbero, estado='completada').count()
-    calificacion_promedio = Survey.objects.filter(
-        appointment__barbero=barbero
-    ).aggregate(Avg('calificacion'))['calificacion__avg'] or 0
+    # Cortes del mes, totales y calificación promedio desde el resumen diario
+    totales = totales_de_barbero(barbero.id, timezone.localdate())
 
     # Comentarios recientes
     comentarios_recientes = Survey.objects.filter(
         appointment__barbero=barbero
-    ).order_by('-fecha_creacion')[:5]
+    ).select_related('appointment__cliente__user').order_by('-fecha_creacion')[:5]
 
     stats = {
-        'citas_mes_actual': citas_mes.count(),
-        'citas_totales': citas_totales,
-        'calificacion_promedio': round(calificacion_promedio, 1),
+        'citas_mes_actual': totales['cortes_mes'],
+        'citas_totales': totales['cortes_totales'],
+        'calificacion_promedio': round(totales['calificacion_promedio'], 1),
         'comentarios_recientes': [
             {
                 'cliente': (
@@ -436,6 +581,7 @@ def get_barber_stats(request):
     return Response(stats)
 
 
+@presupuesto_consultas(2)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def check_promotions(request):
@@ -454,6 +600,7 @@ def check_promotions(request):
     })
 
 
+@presupuesto_consultas(6)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_available_slots(request):
@@ -474,36 +621,14 @@ def get_available_slots(request):
     barbero = get_object_or_404(BarberProfile, id=barbero_id, activo=True)
 
     # Verificar día laboral (dias_laborales es array de números: 0=Domingo, 1=Lunes, etc.)
-    dia_semana_num = str(fecha.weekday() + 1)  # Python usa 0=Lun, ajustamos a 1=Lun
-    if dia_semana_num == '7':
-        dia_semana_num = '0'  # Domingo
-    
-    dias_laborales = barbero.dias_laborales or []
-    if isinstance(dias_laborales, str):
-        import json
-        try:
-            dias_laborales = json.loads(dias_laborales)
-        except:
-            dias_laborales = []
-    
-    # Convertir a strings para comparación
-    dias_laborales = [str(d) for d in dias_laborales]
-    
-    if dia_semana_num not in dias_laborales:
+    if not trabaja_el_dia(barbero, fecha):
         return Response({
             'fecha': fecha_str,
             'horarios_disponibles': [],
             'mensaje': 'El barbero no trabaja este día'
         })
 
-    # Obtener citas existentes
-    citas_del_dia = Appointment.objects.filter(
-        barbero=barbero,
-        fecha_hora__date=fecha,
-        estado__in=['pendiente', 'agendada', 'confirmada', 'en_progreso']
-    )
-
-    horarios = calcular_horarios_disponibles(barbero, fecha, citas_del_dia, duracion)
+    horarios = horarios_del_dia(barbero, fecha, duracion, excluir_reserva=request.GET.get('reserva_token'))
 
     return Response({
         'fecha': fecha_str,
@@ -515,8 +640,159 @@ def get_available_slots(request):
     })
 
 
+# Máximo de días que puede abarcar una consulta de disponibilidad por rango
+MAX_DIAS_RANGO_DISPONIBILIDAD = 31
+
+
+@presupuesto_consultas(4)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_available_slots_range(request):
+    """Obtener horarios disponibles por día para uno o varios barberos en un rango de fechas"""
+    desde_str = request.GET.get('desde')
+    hasta_str = request.GET.get('hasta')
+    barbero_ids = [
+        valor.strip()
+        for parametro in request.GET.getlist('barbero_id')
+        for valor in parametro.split(',')
+        if valor.strip()
+    ]
+
+    if not all([desde_str, hasta_str, barbero_ids]):
+        return Response({'error': 'Fechas desde/hasta y al menos un barbero son requeridos'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        desde = datetime.strptime(desde_str, '%Y-%m-%d').date()
+        hasta = datetime.strptime(hasta_str, '%Y-%m-%d').date()
+        barbero_ids = [int(barbero_id) for barbero_id in barbero_ids]
+        duracion = int(request.GET.get('duracion', 30))
+    except ValueError:
+        return Response({'error': 'Parámetros inválidos'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if hasta < desde:
+        return Response({'error': 'La fecha final debe ser posterior a la inicial'}, status=status.HTTP_400_BAD_REQUEST)
+    if (hasta - desde).days >= MAX_DIAS_RANGO_DISPONIBILIDAD:
+        return Response(
+            {'error': f'El rango no puede exceder {MAX_DIAS_RANGO_DISPONIBILIDAD} días'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    barberos = list(
+        BarberProfile.objects.filter(id__in=barbero_ids, activo=True).select_related('user')
+    )
+    if not barberos:
+        return Response({'error': 'Barbero no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'desde': desde_str,
+        'hasta': hasta_str,
+        'barberos': horarios_por_rango(barberos, desde, hasta, duracion, excluir_reserva=request.GET.get('reserva_token')),
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+def create_slot_hold(request):
+    """Apartar un horario por unos minutos mientras el cliente completa el agendado"""
+    if getattr(request.user, 'rol', None) != 'cliente':
+        return Response(
+            {'error': 'Debes iniciar sesión como cliente para apartar un horario'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    data = request.data
+    barbero_id = data.get('barbero_id') or data.get('barbero')
+    servicio_id = data.get('servicio_id') or data.get('servicio')
+    paquete_id = data.get('paquete_id') or data.get('paquete')
+    fecha = data.get('fecha')
+    hora = data.get('hora')
+
+    if not all([barbero_id, fecha, hora]):
+        return Response({'error': 'Barbero, fecha y hora son obligatorios'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        barbero = BarberProfile.objects.get(id=barbero_id, activo=True)
+    except (BarberProfile.DoesNotExist, ValueError):
+        return Response({'error': 'Barbero no encontrado o inactivo'}, status=status.HTTP_404_NOT_FOUND)
+
+    # Con servicio o paquete la duración es la suya (como en Appointment.calcular_duracion);
+    # la que envía el cliente sólo se acepta sin ellos y dentro de un rango razonable
+    if servicio_id:
+        servicio = Service.objects.filter(id=servicio_id, activo=True).only('duracion').first()
+        if not servicio:
+            return Response({'error': 'Servicio no encontrado o inactivo'}, status=status.HTTP_404_NOT_FOUND)
+        duracion = servicio.duracion
+    elif paquete_id:
+        paquete = Package.objects.filter(id=paquete_id, activo=True).annotate(
+            duracion_total=Sum('servicios__duracion')
+        ).only('id').first()
+        if not paquete:
+            return Response({'error': 'Paquete no encontrado o inactivo'}, status=status.HTTP_404_NOT_FOUND)
+        duracion = paquete.duracion_total or DURACION_POR_DEFECTO
+    else:
+        try:
+            duracion = int(data.get('duracion') or DURACION_POR_DEFECTO)
+        except (TypeError, ValueError):
+            return Response({'error': 'Duración inválida'}, status=status.HTTP_400_BAD_REQUEST)
+        maxima = Service.objects.filter(activo=True).aggregate(maxima=Max('duracion'))['maxima'] or DURACION_POR_DEFECTO
+        if not PASO_POR_DEFECTO <= duracion <= maxima:
+            return Response(
+                {'error': f'La duración debe estar entre {PASO_POR_DEFECTO} y {maxima} minutos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    try:
+        fecha_hora = datetime.strptime(f"{fecha} {hora}", '%Y-%m-%d %H:%M')
+    except ValueError:
+        return Response({'error': 'Formato de fecha u hora inválido'}, status=status.HTTP_400_BAD_REQUEST)
+    fecha_hora = timezone.make_aware(fecha_hora, timezone.get_current_timezone())
+
+    if not trabaja_el_dia(barbero, fecha_hora.date()):
+        return Response({'error': 'El barbero no labora durante la fecha seleccionada'}, status=status.HTTP_400_BAD_REQUEST)
+
+    limpiar_reservas_vencidas()
+
+    with transaction.atomic():
+        ocupacion = bloquear_dia(barbero.id, fecha_hora.date())
+
+        # Un cliente sólo aparta un horario a la vez: la reserva anterior se libera
+        SlotHold.objects.filter(usuario=request.user).delete()
+
+        ocupados = ocupados_del_dia(barbero.id, fecha_hora.date(), ocupacion.intervalos)
+        slots_disponibles = horarios_libres(barbero, ocupados, duracion)
+        if not any(slot['hora'] == fecha_hora.strftime('%H:%M') for slot in slots_disponibles):
+            return Response({'error': 'El horario seleccionado ya no está disponible'}, status=status.HTTP_409_CONFLICT)
+
+        reserva = SlotHold.objects.create(
+            barbero=barbero,
+            usuario=request.user,
+            fecha_hora=fecha_hora,
+            fecha_hora_fin=fecha_hora + timedelta(minutes=duracion),
+            expira=timezone.now() + duracion_reserva_temporal()
+        )
+
+    return Response({
+        'reserva_token': reserva.token,
+        'barbero_id': barbero.id,
+        'fecha_hora': reserva.fecha_hora,
+        'fecha_hora_fin': reserva.fecha_hora_fin,
+        'expira': reserva.expira,
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def release_slot_hold(request, token):
+    """Liberar un horario apartado"""
+    eliminadas, _ = SlotHold.objects.filter(token=token, usuario=request.user).delete()
+    if not eliminadas:
+        return Response({'error': 'Reserva no encontrada o vencida'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotente
 def schedule_appointment(request):
     """Crear una cita respetando disponibilidad de barbero y servicio - Requiere login obligatorio"""
     # Validar que el usuario sea cliente
@@ -539,6 +815,7 @@ def schedule_appointment(request):
     contacto = data.get('contacto', {}) or {}
     cliente_id = data.get('cliente_id')
     producto_ids = data.get('productos', [])
+    reserva_token = data.get('reserva_token')
 
     if not (servicio_id or paquete_id) or not all([barbero_id, fecha, hora]):
         return Response(
@@ -634,35 +911,9 @@ def schedule_appointment(request):
         fecha_hora = timezone.make_aware(fecha_hora, timezone.get_current_timezone())
 
     # Verificar que el barbero trabaje ese día
-    dia_semana_num = str(fecha_hora.weekday() + 1)
-    if dia_semana_num == '7':
-        dia_semana_num = '0'
-
-    dias_laborales = barbero.dias_laborales or []
-    if isinstance(dias_laborales, str):
-        import json
-        try:
-            dias_laborales = json.loads(dias_laborales)
-        except json.JSONDecodeError:
-            dias_laborales = []
-
-    dias_laborales = [str(d) for d in dias_laborales]
-    if dia_semana_num not in dias_laborales:
+    if not trabaja_el_dia(barbero, fecha_hora.date()):
         return Response({'error': 'El barbero no labora durante la fecha seleccionada'}, status=status.HTTP_400_BAD_REQUEST)
 
-    citas_existentes = Appointment.objects.filter(
-        barbero=barbero,
-        fecha_hora__date=fecha_hora.date(),
-        estado__in=['pendiente', 'agendada', 'confirmada', 'en_progreso']
-    )
-
-    # Validar que el horario esté libre
-    slots_disponibles = calcular_horarios_disponibles(barbero, fecha_hora.date(), citas_existentes, duracion)
-    slot_seleccionado = next((slot for slot in slots_disponibles if slot['hora'] == fecha_hora.strftime('%H:%M')), None)
-
-    if not slot_seleccionado:
-        return Response({'error': 'El horario seleccionado ya no está disponible'}, status=status.HTTP_409_CONFLICT)
-
     # Obtener datos del cliente autenticado
     user = request.user
     nombre_contacto = user.get_full_name() or user.username
@@ -679,48 +930,72 @@ def schedule_appointment(request):
     
     es_cliente_registrado = True
 
-    # Validar que no exista otra cita del mismo cliente en el mismo horario
-    if cliente_profile:
-        conflicto_cliente = Appointment.objects.filter(
-            cliente=cliente_profile,
-            fecha_hora=fecha_hora,
-            estado__in=['pendiente', 'agendada', 'confirmada', 'en_progreso']
-        ).exists()
-        if conflicto_cliente:
-            return Response({'error': 'Ya tienes una cita agendada en este horario'}, status=status.HTTP_409_CONFLICT)
-
-    # Verificar si el cliente es elegible para promoción (corte gratuito)
-    # Solo aplica a servicios, no a paquetes
-    es_elegible = cliente_profile.es_elegible_para_promocion and servicio and not paquete
-    
-    appointment = Appointment.objects.create(
-        cliente=cliente_profile,
-        barbero=barbero,
-        servicio=servicio,
-        paquete=paquete,
-        fecha_hora=fecha_hora,
-        estado=estado if estado in dict(Appointment.STATUS_CHOICES) else 'agendada',
-        notas=notas,
-        nombre_cliente=nombre_contacto,
-        telefono_cliente=telefono_contacto,
-        email_cliente=email_contacto or None,
-        es_cliente_registrado=es_cliente_registrado,
-    )
-    
-    # Si el cliente usó su corte gratuito, reiniciar el contador
-    if es_elegible:
-        cliente_profile.cortes_realizados = 0
-        cliente_profile.save()
-
-    if producto_ids:
-        productos = Product.objects.filter(id__in=producto_ids, activo=True)
-        appointment.productos.set(productos)
-    
-    # Crear alerta para el admin
-    AppointmentAlert.objects.create(
-        appointment=appointment,
-        mensaje_enviado=False
-    )
+    # Verificación e inserción atómicas: las reservas concurrentes del mismo
+    # barbero/día esperan el bloqueo de la fila de ocupación del día
+    with transaction.atomic():
+        ocupacion = bloquear_dia(barbero.id, fecha_hora.date())
+
+        # Validar que el horario esté libre (la ocupación del día ya está materializada;
+        # la reserva temporal del propio cliente no cuenta como ocupada)
+        ocupados = ocupados_del_dia(barbero.id, fecha_hora.date(), ocupacion.intervalos, reserva_token)
+        slots_disponibles = horarios_libres(barbero, ocupados, duracion)
+        slot_seleccionado = next((slot for slot in slots_disponibles if slot['hora'] == fecha_hora.strftime('%H:%M')), None)
+
+        if not slot_seleccionado:
+            return Response({'error': 'El horario seleccionado ya no está disponible'}, status=status.HTTP_409_CONFLICT)
+
+        # Validar que no exista otra cita del mismo cliente en el mismo horario
+        if cliente_profile:
+            conflicto_cliente = Appointment.objects.filter(
+                cliente=cliente_profile,
+                fecha_hora=fecha_hora,
+                estado__in=ESTADOS_ACTIVOS
+            ).exists()
+            if conflicto_cliente:
+                return Response({'error': 'Ya tienes una cita agendada en este horario'}, status=status.HTTP_409_CONFLICT)
+
+        # Verificar si el cliente es elegible para promoción (corte gratuito)
+        # Solo aplica a servicios, no a paquetes
+        es_elegible = cliente_profile.es_elegible_para_promocion and servicio and not paquete
+
+        try:
+            with transaction.atomic():
+                appointment = Appointment.objects.create(
+                    cliente=cliente_profile,
+                    barbero=barbero,
+                    servicio=servicio,
+                    paquete=paquete,
+                    fecha_hora=fecha_hora,
+                    duracion=duracion,
+                    estado=estado if estado in dict(Appointment.STATUS_CHOICES) else 'agendada',
+                    notas=notas,
+                    nombre_cliente=nombre_contacto,
+                    telefono_cliente=telefono_contacto,
+                    email_cliente=email_contacto or None,
+                    es_cliente_registrado=es_cliente_registrado,
+                )
+        except IntegrityError as error:
+            if not es_solapamiento(error):
+                raise
+            return Response({'error': 'El horario seleccionado ya no está disponible'}, status=status.HTTP_409_CONFLICT)
+
+        if reserva_token:
+            SlotHold.objects.filter(token=reserva_token, usuario=request.user).delete()
+
+        # Si el cliente usó su corte gratuito, reiniciar el contador
+        if es_elegible:
+            cliente_profile.cortes_realizados = 0
+            cliente_profile.save()
+
+        if producto_ids:
+            productos = Product.objects.filter(id__in=producto_ids, activo=True)
+            appointment.productos.set(productos)
+
+        # Crear alerta para el admin
+        AppointmentAlert.objects.create(
+            appointment=appointment,
+            mensaje_enviado=False
+        )
 
     return Response({
         'message': 'Cita agendada correctamente',
@@ -757,52 +1032,8 @@ def schedule_appointment(request):
     }, status=status.HTTP_201_CREATED)
 
 
-def calcular_horarios_disponibles(barbero, fecha, citas_existentes, duracion=30):
-    """Calcular horarios disponibles para un barbero en una fecha específica"""
-    horarios_disponibles = []
-
-    # Crear lista de horarios ocupados
-    horarios_ocupados = []
-    for cita in citas_existentes:
-        inicio = cita.fecha_hora.time()
-        fin = (datetime.combine(fecha, inicio) + timedelta(minutes=cita.servicio.duracion)).time()
-        horarios_ocupados.append((inicio, fin))
-
-    # Generar horarios disponibles en el día laboral del barbero
-    hora_actual = barbero.horario_inicio
-    hora_fin = barbero.horario_fin
-
-    while hora_actual < hora_fin:
-        # Calcular fin del slot con la duración del servicio
-        hora_fin_slot = (datetime.combine(fecha, hora_actual) + timedelta(minutes=duracion)).time()
-
-        # Verificar que el slot completo cabe en el horario laboral
-        if hora_fin_slot > hora_fin:
-            break
-
-        # Verificar si el slot está disponible (no se solapa con citas existentes)
-        slot_libre = True
-        for ocupado_inicio, ocupado_fin in horarios_ocupados:
-            # Hay solapamiento si el slot empieza antes de que termine una cita
-            # Y termina después de que empieza una cita
-            if hora_actual < ocupado_fin and hora_fin_slot > ocupado_inicio:
-                slot_libre = False
-                break
-
-        if slot_libre:
-            horarios_disponibles.append({
-                'hora': hora_actual.strftime('%H:%M'),
-                'hora_fin': hora_fin_slot.strftime('%H:%M'),
-                'disponible': True
-            })
-
-        # Avanzar 30 minutos para el siguiente slot
-        hora_actual = (datetime.combine(fecha, hora_actual) + timedelta(minutes=30)).time()
-
-    return horarios_disponibles
-
-
 # Endpoints públicos para encuestas de satisfacción
+@presupuesto_consultas(3)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_public_survey_info(request):
@@ -859,6 +1090,7 @@ def get_public_survey_info(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotente
 def submit_public_survey(request):
     token = request.data.get('token')
 
@@ -935,30 +1167,31 @@ from django.db.models import Count, Avg, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def admin_estadisticas_generales(request):
-    """Obtener estadísticas generales para el panel de administración"""
-    if request.user.rol != 'admin':
-        return Response({'error': 'Solo para administradores'}, status=status.HTTP_403_FORBIDDEN)
-
+def _estadisticas_generales():
+    """Calcula la instantánea de estadísticas generales (una consulta agregada por tabla)"""
     # Estadísticas básicas
-    total_users = CustomUser.objects.count()
-    total_clients = CustomUser.objects.filter(rol='cliente').count()
-    total_barbers = CustomUser.objects.filter(rol='barbero').count()
+    usuarios = CustomUser.objects.aggregate(
+        total=Count('id'),
+        clientes=Count('id', filter=Q(rol='cliente')),
+        barberos=Count('id', filter=Q(rol='barbero')),
+    )
     total_services = Service.objects.filter(activo=True).count()
 
-    # Estadísticas de citas
-    current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    # Estadísticas de citas (completadas y calificaciones desde el resumen diario)
     total_appointments = Appointment.objects.count()
-    completed_appointments = Appointment.objects.filter(estado='completada').count()
-    appointments_this_month = Appointment.objects.filter(
-        fecha_hora__gte=current_month,
-        estado='completada'
-    ).count()
+    primer_dia, ultimo_dia = dias_del_mes(timezone.localdate())
+    resumen = BarberDailyStats.objects.aggregate(
+        completadas=Sum('cortes'),
+        completadas_mes=Sum('cortes', filter=Q(fecha__range=(primer_dia, ultimo_dia))),
+        suma_calificaciones=Sum('suma_calificaciones'),
+        num_calificaciones=Sum('num_calificaciones'),
+    )
+    completed_appointments = resumen['completadas'] or 0
+    appointments_this_month = resumen['completadas_mes'] or 0
 
     # Calificación promedio
-    avg_rating = Survey.objects.aggregate(Avg('calificacion'))['calificacion__avg'] or 0
+    num_calificaciones = resumen['num_calificaciones'] or 0
+    avg_rating = resumen['suma_calificaciones'] / num_calificaciones if num_calificaciones else 0
 
     # Citas recientes (últimas 10)
     recent_appointments_qs = Appointment.objects.select_related(
@@ -997,10 +1230,10 @@ def admin_estadisticas_generales(request):
             ],
         })
 
-    stats = {
-        'total_users': total_users,
-        'total_clients': total_clients,
-        'total_barbers': total_barbers,
+    return {
+        'total_users': usuarios['total'],
+        'total_clients': usuarios['clientes'],
+        'total_barbers': usuarios['barberos'],
         'total_services': total_services,
         'total_appointments': total_appointments,
         'completed_appointments': completed_appointments,
@@ -1009,9 +1242,60 @@ def admin_estadisticas_generales(request):
         'recent_appointments': recent_appointments
     }
 
+
+@presupuesto_consultas(7)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_estadisticas_generales(request):
+    """Obtener estadísticas generales para el panel de administración (?fresh=1 omite la caché)"""
+    if request.user.rol != 'admin':
+        return Response({'error': 'Solo para administradores'}, status=status.HTTP_403_FORBIDDEN)
+
+    stats = None
+    if request.GET.get('fresh') not in ('1', 'true'):
+        stats = cache.get(CLAVE_CACHE_ESTADISTICAS_GENERALES)
+    if stats is None:
+        stats = _estadisticas_generales()
+        cache.set(CLAVE_CACHE_ESTADISTICAS_GENERALES, stats, TIEMPO_CACHE_ESTADISTICAS_GENERALES)
+
     return Response(stats)
 
 
+@presupuesto_consultas(2)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_series(request):
+    """Series de reservas, completadas, cancelaciones, inasistencias, ingresos y calificación por periodo"""
+    if request.user.rol != 'admin':
+        return Response({'error': 'Solo para administradores'}, status=status.HTTP_403_FORBIDDEN)
+
+    periodo = request.GET.get('periodo', 'dia')
+    if periodo not in PERIODOS:
+        return Response({'error': 'Periodo inválido, usa dia, semana o mes'}, status=status.HTTP_400_BAD_REQUEST)
+
+    hoy = timezone.localdate()
+    try:
+        hasta = datetime.strptime(request.GET['hasta'], '%Y-%m-%d').date() if request.GET.get('hasta') else hoy
+        desde = datetime.strptime(request.GET['desde'], '%Y-%m-%d').date() if request.GET.get('desde') else hasta - timedelta(days=29)
+    except ValueError:
+        return Response({'error': 'Formato de fecha inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if desde > hasta:
+        return Response({'error': 'La fecha inicial debe ser anterior a la final'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(periodos_entre(desde, hasta, periodo)) > MAX_PERIODOS_SERIE:
+        return Response(
+            {'error': f'El rango no puede abarcar más de {MAX_PERIODOS_SERIE} periodos'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        'periodo': periodo,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'series': serie(periodo, desde, hasta),
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_dashboard_data(request):
@@ -1039,6 +1323,7 @@ def admin_dashboard_data(request):
     return Response(dashboard_data)
 
 
+@presupuesto_consultas(get=2)
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
 def admin_contenido_sitio(request):
@@ -1064,13 +1349,17 @@ def admin_contenido_sitio(request):
             contenido = update.get('contenido')
 
             if tipo_contenido and contenido is not None:
+                # update() no dispara auto_now ni las señales de versión
                 WebsiteContent.objects.filter(tipo_contenido=tipo_contenido).update(
-                    contenido=contenido
+                    contenido=contenido,
+                    fecha_actualizacion=timezone.now()
                 )
+        transaction.on_commit(lambda: renovar_version(WebsiteContent))
 
         return Response({'message': 'Contenido actualizado correctamente'})
 
 
+@presupuesto_consultas(get=3)
 @api_view(['GET', 'POST', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def admin_users_management(request, user_id=None):
@@ -1087,7 +1376,9 @@ def admin_users_management(request, user_id=None):
                 return None
             return f"https://wa.me/{digits}?text=Hola,%20te%20saludamos%20desde%20Barber%C3%ADa%20Elite"
 
-        def build_user_payload(user: CustomUser) -> dict:
+        today = timezone.localdate()
+
+        def build_user_payload(user: CustomUser, barber_summaries: dict) -> dict:
             client_profile = getattr(user, 'client_profile', None)
             barber_profile = getattr(user, 'barber_profile', None)
             last_visit_iso = None
@@ -1114,29 +1405,12 @@ def admin_users_management(request, user_id=None):
             }
 
             if user.rol == 'barbero' and barber_profile:
-                today = timezone.localdate()
-                citas_dia = Appointment.objects.filter(
-                    barbero=barber_profile,
-                    estado='completada',
-                    fecha_hora__date=today,
-                )
-                citas_mes = Appointment.objects.filter(
-                    barbero=barber_profile,
-                    estado='completada',
-                    fecha_hora__year=today.year,
-                    fecha_hora__month=today.month,
-                )
-
-                total_dia = citas_dia.count()
-                total_mes = citas_mes.count()
-                comision_dia = citas_dia.aggregate(total=Sum('servicio__comision_barbero'))['total'] or 0
-                comision_mes = citas_mes.aggregate(total=Sum('servicio__comision_barbero'))['total'] or 0
-
+                summary = barber_summaries.get(barber_profile.id, {})
                 payload['barber_summary'] = {
-                    'cortes_dia': total_dia,
-                    'cortes_mes': total_mes,
-                    'comision_dia': float(comision_dia),
-                    'comision_mes': float(comision_mes),
+                    'cortes_dia': summary.get('cortes_dia', 0),
+                    'cortes_mes': summary.get('cortes_mes', 0),
+                    'comision_dia': float(summary.get('comision_dia', 0)),
+                    'comision_mes': float(summary.get('comision_mes', 0)),
                 }
 
             return payload
@@ -1147,13 +1421,17 @@ def admin_users_management(request, user_id=None):
                 user = CustomUser.objects.select_related('client_profile', 'barber_profile').get(id=user_id)
             except CustomUser.DoesNotExist:
                 return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
-            return Response(build_user_payload(user))
+            barber_profile = getattr(user, 'barber_profile', None)
+            barber_summaries = resumen_por_barbero(today, [barber_profile.id]) if barber_profile else {}
+            return Response(build_user_payload(user, barber_summaries))
 
         users = (
             CustomUser.objects.all()
             .select_related('client_profile', 'barber_profile')
         )
-        data = [build_user_payload(user) for user in users]
+        # Día y mes de todos los barberos en una sola consulta agrupada
+        barber_summaries = resumen_por_barbero(today)
+        data = [build_user_payload(user, barber_summaries) for user in users]
         return Response(data)
 
     elif request.method == 'POST':
@@ -1251,6 +1529,7 @@ def admin_users_management(request, user_id=None):
             return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 
+@presupuesto_consultas(get=2)
 @api_view(['GET', 'POST', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def admin_services_management(request, service_id=None):
@@ -1376,6 +1655,7 @@ def get_barber_qr(request, barbero_id):
     })
 
 
+@presupuesto_consultas(3)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def scan_qr_code(request, qr_token):
@@ -1396,6 +1676,7 @@ def scan_qr_code(request, qr_token):
     })
 
 
+@presupuesto_consultas(5)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_pending_survey_by_qr(request, qr_token):
@@ -1419,7 +1700,7 @@ def get_pending_survey_by_qr(request, qr_token):
         barbero=barbero,
         estado='completada',
         encuesta_completada=False
-    ).order_by('-fecha_hora').first()
+    ).select_related('servicio', 'paquete').order_by('-fecha_hora').first()
     
     if not cita_pendiente:
         return Response({
@@ -1432,7 +1713,9 @@ def get_pending_survey_by_qr(request, qr_token):
         'cita': {
             'id': cita_pendiente.id,
             'fecha_hora': cita_pendiente.fecha_hora,
-            'servicio': cita_pendiente.servicio.nombre,
+            'servicio': cita_pendiente.servicio.nombre if cita_pendiente.servicio else (
+                cita_pendiente.paquete.nombre if cita_pendiente.paquete else ''
+            ),
             'barbero': f"{barbero.user.first_name} {barbero.user.last_name}".strip() or barbero.user.username,
             'encuesta_token': cita_pendiente.survey_token
         }
@@ -1440,6 +1723,7 @@ def get_pending_survey_by_qr(request, qr_token):
 
 
 # Endpoints para alertas de admin
+@presupuesto_consultas(2)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_appointment_alerts(request):
@@ -1447,40 +1731,8 @@ def get_appointment_alerts(request):
     if request.user.rol != 'admin':
         return Response({'error': 'Solo para administradores'}, status=status.HTTP_403_FORBIDDEN)
     
-    # Solo mostrar alertas para citas activas (no completadas ni canceladas)
-    from django.utils import timezone
-    alerts = AppointmentAlert.objects.filter(
-        mensaje_enviado=False,
-        appointment__estado__in=['pendiente', 'agendada', 'confirmada', 'en_progreso'],
-        appointment__fecha_hora__gte=timezone.now() - timedelta(days=1)  # Solo citas futuras o del último día
-    ).select_related(
-        'appointment__cliente__user',
-        'appointment__barbero__user',
-        'appointment__servicio'
-    ).order_by('-fecha_creacion')
-    
-    alerts_data = []
-    for alert in alerts:
-        appointment = alert.appointment
-        cliente_nombre = ''
-        if appointment.cliente and appointment.cliente.user:
-            cliente_nombre = appointment.cliente.user.get_full_name() or appointment.cliente.user.username
-        else:
-            cliente_nombre = appointment.nombre_cliente or 'Cliente'
-        
-        alerts_data.append({
-            'id': alert.id,
-            'appointment_id': appointment.id,
-            'cliente_nombre': cliente_nombre,
-            'cliente_telefono': appointment.telefono_cliente,
-            'barbero': f"{appointment.barbero.user.first_name} {appointment.barbero.user.last_name}".strip() or appointment.barbero.user.username,
-            'servicio': appointment.servicio.nombre,
-            'fecha_hora': appointment.fecha_hora,
-            'whatsapp_url': alert.whatsapp_url,
-            'fecha_creacion': alert.fecha_creacion
-        })
-    
-    return Response(alerts_data)
+    # Solo alertas sin enviar de citas activas (ver alertas.py; también se envían por WebSocket)
+    return Response([datos_alerta(alert) for alert in alertas_pendientes()])
 
 
 @api_view(['POST'])